@@ -1,4 +1,3 @@
-import random
 import sys
 import time
 import threading
@@ -6,6 +5,11 @@ import os
 import MalmoPython
 from collections import deque
 import tkinter as tk 
+import numpy as np
+from generador_laberintos import generar_laberinto_dfs
+from compilador_xml import compilar_ocupacion, imprimir_reporte, reporte_compresion
+from planificador import planificar
+from orquestador import AgenteRuta, BusPosiciones, Orquestador, crear_client_pool
 
 print("Script de Agentes Multi-Laberinto con GUI 2D (PID=%d)" % os.getpid())
 
@@ -20,20 +24,17 @@ END_X, END_Z = SIZE - 2, SIZE - 2
 
 CLIENT_PORTS = [10000, 10001]
 START_RETRY_TIMEOUT = 60.0 
-START_RETRY_INTERVAL = 1.5
 
-# Diccionario compartido para la posición actual de los agentes (Thread-safe logic)
-CURRENT_POSITIONS = {
-    "AgentA": (START_X, START_Z),
-    "AgentB": (END_X, END_Z)
-}
+# Planificador de ruta: "bidireccional" (busqueda_bidireccional) o uno de planificador.METODOS
+PLANIFICADOR = "campo"
 
 # ======================================================================
 # CLASE PARA LA INTERFAZ GRÁFICA (VISUALIZADOR)
 # ======================================================================
 class MazeVisualizer:
-    def __init__(self, root, matrix, cell_size=30):
+    def __init__(self, root, matrix, bus, cell_size=30):
         self.root = root
+        self.bus = bus
         self.matrix = matrix
         self.cell_size = cell_size
         self.rows = len(matrix)
@@ -72,9 +73,10 @@ class MazeVisualizer:
                 self.canvas.create_rectangle(x*s, z*s, (x+1)*s, (z+1)*s, fill=color, outline="")
 
     def update_positions(self):
-        # Leer posiciones globales
-        pos_a = CURRENT_POSITIONS.get("AgentA", (START_X, START_Z))
-        pos_b = CURRENT_POSITIONS.get("AgentB", (END_X, END_Z))
+        # Leer las últimas posiciones publicadas por el orquestador
+        posiciones = self.bus.ultimas()
+        pos_a = posiciones.get("AgentA", (START_X, START_Z))
+        pos_b = posiciones.get("AgentB", (END_X, END_Z))
         
         # Mover Agente A
         self.move_circle(self.agent_a_id, pos_a[0], pos_a[1])
@@ -97,28 +99,6 @@ class MazeVisualizer:
 # 1. ALGORITMOS DE BÚSQUEDA
 # ======================================================================
 
-def generar_laberinto_dfs(size):
-    laberinto = [[1] * size for _ in range(size)]
-    pila = [(START_X, START_Z)]
-    laberinto[START_Z][START_X] = 0 
-    direcciones = [(0, 2), (0, -2), (2, 0), (-2, 0)]
-
-    while pila:
-        cx, cz = pila[-1] 
-        vecinos_no_visitados = []
-        for dx, dz in direcciones:
-            nx, nz = cx + dx, cz + dz 
-            if 1 <= nx < size - 1 and 1 <= nz < size - 1 and laberinto[nz][nx] == 1:
-                vecinos_no_visitados.append((nx, nz, dx, dz))
-        if vecinos_no_visitados:
-            nx, nz, dx, dz = random.choice(vecinos_no_visitados)
-            laberinto[nz][nx] = 0
-            laberinto[cz + dz // 2][cx + dx // 2] = 0
-            pila.append((nx, nz))
-        else:
-            pila.pop()
-    return laberinto
-
 def busqueda_bidireccional(grid, start, end):
     if start == end: return [start]
     q_start = deque([start])
@@ -214,18 +194,16 @@ def generar_acciones_con_coords(path, start_yaw):
 # ======================================================================
 
 def generar_xml_laberinto(laberinto):
-    dibujo_xml = ""
-    for z in range(SIZE):
-        for x in range(SIZE):
-            if laberinto[z][x] == 1:
-                is_start = (START_X-1 <= x <= START_X+1 and START_Z-1 <= z <= START_Z+1)
-                is_end = (END_X-1 <= x <= END_X+1 and END_Z-1 <= z <= END_Z+1)
-                if not is_start and not is_end:
-                    dibujo_xml += f'<DrawBlock x="{x}" y="{Y_LEVEL}" z="{z}" type="stonebrick"/>\n'
-                    dibujo_xml += f'<DrawBlock x="{x}" y="{Y_LEVEL + 1}" z="{z}" type="stonebrick"/>\n'
-    dibujo_xml += f'<DrawBlock x="{START_X}" y="{Y_LEVEL - 1}" z="{START_Z}" type="grass"/>\n'
-    dibujo_xml += f'<DrawBlock x="{END_X}" y="{Y_LEVEL - 1}" z="{END_Z}" type="emerald_block"/>\n'
-    return dibujo_xml
+    # Paredes de 2 bloques de alto fusionadas en DrawCuboid (ver compilador_xml.py)
+    paredes = np.asarray(laberinto)[:SIZE, :SIZE] == 1
+    paredes[max(START_Z-1, 0):START_Z+2, max(START_X-1, 0):START_X+2] = False
+    paredes[max(END_Z-1, 0):END_Z+2, max(END_X-1, 0):END_X+2] = False
+    muros = compilar_ocupacion(paredes, "stonebrick", y=Y_LEVEL, alto=2)
+    imprimir_reporte(reporte_compresion(paredes, "stonebrick", y=Y_LEVEL, alto=2, compilado=muros))
+    partes = [muros]
+    partes.append(f'<DrawBlock x="{START_X}" y="{Y_LEVEL - 1}" z="{START_Z}" type="grass"/>\n')
+    partes.append(f'<DrawBlock x="{END_X}" y="{Y_LEVEL - 1}" z="{END_Z}" type="emerald_block"/>\n')
+    return ''.join(partes)
 
 def get_mission_xml(dibujo_xml):
     return f'''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
@@ -245,75 +223,25 @@ def get_mission_xml(dibujo_xml):
   <AgentSection mode="Survival">
     <Name>AgentA</Name>
     <AgentStart><Placement x="{START_X}.5" y="{Y_LEVEL}.0" z="{START_Z}.5" yaw="0"/></AgentStart>
-    <AgentHandlers><DiscreteMovementCommands/></AgentHandlers>
+    <AgentHandlers><ObservationFromFullStats/><DiscreteMovementCommands/></AgentHandlers>
   </AgentSection>
   <AgentSection mode="Survival">
     <Name>AgentB</Name>
     <AgentStart><Placement x="{END_X}.5" y="{Y_LEVEL}.0" z="{END_Z}.5" yaw="180"/></AgentStart>
-    <AgentHandlers><DiscreteMovementCommands/></AgentHandlers>
+    <AgentHandlers><ObservationFromFullStats/><DiscreteMovementCommands/></AgentHandlers>
   </AgentSection>
 </Mission>'''
 
-laberinto_matrix = generar_laberinto_dfs(SIZE)
+laberinto_matrix = generar_laberinto_dfs(SIZE, inicio=(START_X, START_Z))
 xml_dibujo = generar_xml_laberinto(laberinto_matrix)
 mission_spec = MalmoPython.MissionSpec(get_mission_xml(xml_dibujo), True)
 
-def run_agent_moving(role, agent_name, experiment_id, client_pool, action_data):
-    print(f"[{agent_name}] Iniciando...")
-    agent_host = MalmoPython.AgentHost()
-    mr = MalmoPython.MissionRecordSpec()
-
-    try:
-        start_deadline = time.time() + START_RETRY_TIMEOUT
-        while True:
-            try:
-                agent_host.startMission(mission_spec, client_pool, mr, role, experiment_id)
-                break
-            except RuntimeError as e:
-                if time.time() > start_deadline: raise e
-                time.sleep(START_RETRY_INTERVAL)
-
-        print(f"[{agent_name}] Esperando servidor...")
-        world_state = agent_host.getWorldState()
-        while not world_state.has_mission_begun:
-            time.sleep(0.1)
-            world_state = agent_host.getWorldState()
-
-        print(f"[{agent_name}] GO! Ejecutando ruta...")
-        time.sleep(1)
-
-        # Iteramos sobre (comando, (x, z))
-        for cmd, (nx, nz) in action_data:
-            agent_host.sendCommand(cmd)
-            
-            # ACTUALIZAR GUI (Global Dictionary)
-            CURRENT_POSITIONS[agent_name] = (nx, nz)
-            
-            if not agent_host.getWorldState().is_mission_running: break
-            time.sleep(0.2) # Velocidad de movimiento
-
-        print(f"[{agent_name}] Destino alcanzado. Terminando misión...")
-        
-        # --- CORRECCIÓN AQUÍ ---
-        time.sleep(0.5) # Pequeña pausa para ver la posición final
-        agent_host.sendCommand("quit") # Enviamos QUIT explícitamente al terminar la ruta
-        # -----------------------
-
-        # Ahora sí podemos esperar a que el servidor cierre la sesión
-        while world_state.is_mission_running:
-            time.sleep(0.5)
-            world_state = agent_host.getWorldState()
-
-    except Exception as e:
-        print(f"[{agent_name}] Error: {e}")
-    
-    # El finally queda solo como seguridad por si el programa crashea antes
-    finally:
-        pass
-
 def main():
-    print("--- Calculando ruta bidireccional ---")
-    ruta_completa = busqueda_bidireccional(laberinto_matrix, (START_X, START_Z), (END_X, END_Z))
+    print(f"--- Calculando ruta ({PLANIFICADOR}) ---")
+    if PLANIFICADOR == "bidireccional":
+        ruta_completa = busqueda_bidireccional(laberinto_matrix, (START_X, START_Z), (END_X, END_Z))
+    else:
+        ruta_completa = planificar(laberinto_matrix, (START_X, START_Z), (END_X, END_Z), PLANIFICADOR)
     
     if not ruta_completa:
         print("No hay camino.")
@@ -328,29 +256,28 @@ def main():
     cmds_b = generar_acciones_con_coords(path_b, start_yaw=180)
 
     shared_mission_id = f"mision_vis_{int(time.time())}"
-    client_pool = MalmoPython.ClientPool()
-    for p in CLIENT_PORTS:
-        client_pool.add(MalmoPython.ClientInfo("127.0.0.1", p))
-
-    # Lanzar hilos de Malmo
-    tA = threading.Thread(target=run_agent_moving, args=(0, "AgentA", shared_mission_id, client_pool, cmds_a))
-    tB = threading.Thread(target=run_agent_moving, args=(1, "AgentB", shared_mission_id, client_pool, cmds_b))
-    
-    tA.start()
-    time.sleep(1)
-    tB.start()
+    client_pool = crear_client_pool(CLIENT_PORTS)
+
+    # Un solo hilo planificador maneja a todos los agentes; cada comando se confirma
+    # con las observaciones y las posiciones llegan a la GUI por el bus
+    bus = BusPosiciones({"AgentA": (START_X, START_Z), "AgentB": (END_X, END_Z)})
+    orquestador = Orquestador(mission_spec, client_pool, shared_mission_id, bus=bus,
+                              timeout_inicio=START_RETRY_TIMEOUT)
+    orquestador.agregar(AgenteRuta("AgentA", 0, MalmoPython.AgentHost(), cmds_a, (START_X, START_Z)))
+    orquestador.agregar(AgenteRuta("AgentB", 1, MalmoPython.AgentHost(), cmds_b, (END_X, END_Z)))
+    hilo_agentes = threading.Thread(target=orquestador.ejecutar)
+    hilo_agentes.start()
 
     # --- INICIAR GUI EN EL HILO PRINCIPAL ---
-    # Esto bloqueará 'main' hasta que cierres la ventana, pero los hilos seguirán corriendo
+    # Esto bloqueará 'main' hasta que cierres la ventana, pero el orquestador seguirá corriendo
     print("Iniciando Ventana Gráfica (Cierra la ventana para terminar el script)...")
     root = tk.Tk()
-    app = MazeVisualizer(root, laberinto_matrix, cell_size=25)
+    app = MazeVisualizer(root, laberinto_matrix, bus, cell_size=25)
     root.mainloop()
     
     # Al cerrar ventana:
     print("Cerrando...")
-    tA.join()
-    tB.join()
+    hilo_agentes.join()
     print("Fin.")
 
 if __name__ == "__main__":
@@ -41,6 +41,10 @@ import time
 import uuid
 import errno
 
+import numpy as np
+import image_analysis
+import video_frames
+
 if sys.version_info[0] == 2:
     sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', 0)  # flush print output immediately
 else:
@@ -199,111 +203,34 @@ def processFrame(width, height, pixels, agent, mission_count):
     # background (sky) pixels, and foreground (agent) pixels. A bit of thresholding should suffice to provide a
     # fairly reliable way of counting the visible agents.
     global root, bitmaps, failed_frame_count
-    channels = 3    # Following code assumes this to be true.
-    
-    # 1. Extract a narrow strip of the middle from the middle up:
-    y1 = int(height * 0.45)
-    y2 = int(height * 0.5)
-    if y2 == y1:
-        y1 -= 1
-    num_rows = y2 - y1
-    middle_strip = pixels[y1*width*channels:y2*width*channels]
-
-    if SHOW_GUI:
-        image_original = Image.frombytes('RGB', (width, num_rows), str(middle_strip))
-        photo_original = ImageTk.PhotoImage(image_original)
-        if bitmaps[agent][bmp_original][1] != None:
-            canvas.delete(bitmaps[agent][bmp_original][0])
-        handle = canvas.create_image(old_div(width,2), ((4*agent)+0.5)*(num_rows+5), image=photo_original)
-        bitmaps[agent][bmp_original] = (handle, photo_original)
-
-    # 2. Convert RGB to luminance. Build up a histogram as we go - this will be useful for finding a threshold point.
-    hist = [0 for x in range(256)]
-    for col in range(0, width*channels, channels):
-        for row in range(0, num_rows):
-            pix = col + row * width * channels
-            lum = int(0.2126 * middle_strip[pix] + 0.7152 * middle_strip[pix + 1] + 0.0722 * middle_strip[pix + 2])
-            hist[lum] += 1
-            middle_strip[pix] = middle_strip[pix+1] = middle_strip[pix+2] = lum # assuming channels == 3
 
-    if SHOW_GUI:
-        image_greyscale = Image.frombytes('RGB', (width, num_rows), str(middle_strip))
-        photo_greyscale = ImageTk.PhotoImage(image_greyscale)
-        if bitmaps[agent][bmp_luminance][1] != None:
-            canvas.delete(bitmaps[agent][bmp_luminance][0])
-        handle = canvas.create_image(old_div(width,2), ((4*agent+1)+0.5)*(num_rows+5), image=photo_greyscale)
-        bitmaps[agent][bmp_luminance] = (handle, photo_greyscale)
-
-    # 3. Calculate a suitable threshold, using the Otsu method
-    total_pixels = width * num_rows
-    total_sum = 0.
-    for t in range(256):
-        total_sum += t * hist[t]
-    sum_background = 0.
-    weight_background = 0.
-    weight_foreground = 0.
-    max_variation = 0.
-    threshold = 0
-    for t in range(256):
-        weight_background += hist[t]
-        if weight_background == 0:
-            continue
-        weight_foreground = total_pixels - weight_background
-        if weight_foreground == 0:
-            break
-        sum_background += t * hist[t]
-        mean_background = old_div(sum_background, weight_background)
-        mean_foreground = old_div((total_sum - sum_background), weight_foreground)
-        # Between class variance:
-        var = weight_background * weight_foreground * (mean_background - mean_foreground) * (mean_background - mean_foreground)
-        if var > max_variation:
-            max_variation = var
-            threshold = t
-
-    # 4. Apply this threshold
-    for pix in range(len(middle_strip)):
-        if middle_strip[pix] <= threshold:
-            middle_strip[pix] = 255
-        else:
-            middle_strip[pix] = 0
-
-    # 5. OR together all the rows. This helps to de-noise the image.
-    # At the same time, we count the number of changes (from foreground to background, or background to foreground)
-    # that occur across the scanline. Assuming that there are no partial agents at the sides of the view - ie the scanline
-    # starts and ends with background - this count should result in two changes per visible agent.
-    pixelvalue = lambda col: sum(middle_strip[x] for x in range(col, len(middle_strip), width * channels))
-    lastval = 255
-    changes = 0
-    for col in range(0, width * channels, channels):
-        val = 0 if pixelvalue(col) > 0 else 255
-        if lastval != val:
-            changes += 1
-        lastval = val
-        if SHOW_GUI:
-            # Update the bitmap so the user can see what we see.
-            for row in range(num_rows):
-                middle_strip[col + row*width*channels] = val
-                middle_strip[1 + col + row*width*channels] = val
-                middle_strip[2 + col + row*width*channels] = 0  # blue channel always 0 (will simplify recolouring later)
+    # 1. Extract a narrow strip of the middle from the middle up, 2. convert RGB to luminance,
+    # 3. calculate a suitable threshold using the Otsu method, 4./5. apply it, OR together all the
+    # rows (this helps to de-noise the image) and count the number of changes (from foreground to
+    # background, or background to foreground) that occur across the scanline. Assuming that there
+    # are no partial agents at the sides of the view - ie the scanline starts and ends with
+    # background - this count should result in two changes per visible agent.
+    result = image_analysis.detect_agents(pixels, width, height)
+    num_rows = result.strip.shape[0]
 
     # 6. Perform the actual test.
-    agents_detected = old_div(changes, 2)
+    agents_detected = result.agents
     test_passed = agents_detected == NUM_AGENTS - 1
 
-    # 7. If we're displaying the gui, recolour the final image - turn the background red for error or green for success.
-    # (At the moment all background pixels have both red and green values set to 255, so all we need to do is remove
-    # the relevant channel.)
+    # 7. If we're displaying the gui, show each step. In the final image the background is green
+    # for success or red for error.
     if SHOW_GUI:
-        channel_mask = 0 if test_passed else 1  # Remove red channel for success, remove green for failure
-        for pixel in range(channel_mask, len(middle_strip), channels):
-            middle_strip[pixel] = 0
-        # And add this to the GUI:
-        image_threshold = Image.frombytes('RGB', (width, num_rows), str(middle_strip))
-        photo_threshold = ImageTk.PhotoImage(image_threshold)
-        if bitmaps[agent][bmp_thresholded][1] != None:
-            canvas.delete(bitmaps[agent][bmp_thresholded][0])
-        handle = canvas.create_image(old_div(width,2), ((4*agent+2)+0.5)*(num_rows+5), image=photo_threshold)
-        bitmaps[agent][bmp_thresholded] = (handle, photo_threshold)
+        thresholded = np.zeros(result.strip.shape, dtype=np.uint8)
+        thresholded[:, ~result.foreground, 1 if test_passed else 0] = 255
+        images = [Image.fromarray(np.ascontiguousarray(result.strip), 'RGB'),
+                  Image.fromarray(result.luminance, 'L'),
+                  Image.fromarray(thresholded, 'RGB')]
+        for bmp_type, image in zip([bmp_original, bmp_luminance, bmp_thresholded], images):
+            photo = ImageTk.PhotoImage(image)
+            if bitmaps[agent][bmp_type][1] != None:
+                canvas.delete(bitmaps[agent][bmp_type][0])
+            handle = canvas.create_image(old_div(width,2), ((4*agent+bmp_type)+0.5)*(num_rows+5), image=photo)
+            bitmaps[agent][bmp_type] = (handle, photo)
         # Update the canvas:
         root.update()
     
@@ -311,7 +238,7 @@ def processFrame(width, height, pixels, agent, mission_count):
         # The threshold is not entirely bullet-proof - sometimes there are drawing artifacts that can result in
         # false negatives.
         # So we save a copy of the failing frames for manual inspection:
-        image_failed = Image.frombytes('RGB', (width, height), str(pixels))
+        image_failed = Image.fromarray(image_analysis.frame_array(pixels, width, height), 'RGB')
         image_failed.save(FAILED_FRAME_DIR + "/failed_frame_agent_" + str(agent) + "_mission_" + str(mission_count) + "_" + str(failed_frame_count) + ".png")
         failed_frame_count += 1
     return test_passed
@@ -415,7 +342,7 @@ for mission_no in range(1,missions_to_run+1):
                 timed_out = True
             if world_state.is_mission_running and world_state.number_of_video_frames_since_last_state > 0:
                 frame = world_state.video_frames[-1]
-                can_see_agent = processFrame(frame.width, frame.height, frame.pixels, i, mission_no)
+                can_see_agent = processFrame(frame.width, frame.height, video_frames.frame_view(frame), i, mission_no)
                 if not can_see_agent:
                     failed_frames[i] += 1
     print()
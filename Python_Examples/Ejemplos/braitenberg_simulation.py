@@ -26,6 +26,7 @@ import json
 import random
 import math
 import malmoutils
+import sensor_extraction
 import xml.etree.ElementTree
 
 if sys.version_info[0] == 2:
@@ -94,6 +95,14 @@ def draw_ui(left_signal, right_signal, yaw, speed, x, z):
     arena_canvas.create_oval(x - 3, z - 3, x + 3, z + 3, width=0, fill="#ffa930")
     root.update()
 
+_sensors = {}
+
+def get_sensors(width, height):
+    # The sensor regions only depend on the frame size, so build them once per size.
+    if (width, height) not in _sensors:
+        _sensors[(width, height)] = sensor_extraction.SensorArray(width, height, n_sensors=2)
+    return _sensors[(width, height)]
+
 def processFrame(frame):
     """Simulate a left and right sensor output (from 0 to 1) given the input image."""
     # The pixels are grey-scale values from 0-255 - white = 255, black = 0
@@ -126,36 +135,13 @@ def processFrame(frame):
         # A better approach would be to consider more pixels.
         # You could take the average of all the pixels - it's slower but better.
         # Or you could use the median value, which is less noisy than the mean.
-        # Here we calculate both, and estimate the median using histograms:
-        left_total = 0
-        right_total = 0
-        left_hist = [0 for i in range(256)]
-        right_hist = [0 for i in range(256)]
-        # Create a histogram for each half of the image:
-        for y in range(height):
-            for x in range(int(width/2)):
-                i = pixels[x + y*width]
-                left_hist[i] += 1
-                left_total += float(i)/255.0
-            for x in range(int(width/2), width):
-                i = pixels[x + y*width]
-                right_hist[i] += 1
-                right_total += float(i)/255.0
-        # Calculate the mean values:
-        left_mean, right_mean = left_total / (width*height/2), right_total / (width*height/2)
-        # Now use the histogram to estimate the median value
-        left_total, right_total = 0, 0
-        pixels_per_half = width * height / 2
-        cut_off_value = pixels_per_half / 2
-        left_cut_off_point, right_cut_off_point = 0, 0
-        while (left_total < cut_off_value):
-            left_total += left_hist[left_cut_off_point]
-            left_cut_off_point += 1
-        while(right_total < cut_off_value):
-            right_total += right_hist[right_cut_off_point]
-            right_cut_off_point += 1
-        left_median, right_median = left_cut_off_point / 255.0, right_cut_off_point / 255.0
-        
+        # Here we calculate both, estimating the median from a histogram of each half of the image
+        # (see sensor_extraction.py - it can also split the image into more sensors, or look only at
+        # a region of interest):
+        reading = get_sensors(width, height).read(pixels)
+        left_mean, right_mean = reading.means
+        left_median, right_median = reading.medians
+
         # Use the median values:
         left_sensor, right_sensor = left_median, right_median
         # Or uncomment this line to use the mean values:
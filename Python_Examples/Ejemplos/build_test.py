@@ -51,6 +51,7 @@ import errno
 import math
 import xml.etree.ElementTree
 import malmoutils
+import voxel_world
 
 malmoutils.fix_print()
 
@@ -258,7 +259,7 @@ class CopyAgent(object):
 
     def init_scan(self, ah, ob):
         self.current_target = 0
-        self.world = {}
+        self.world = voxel_world.WorldMap()
         self.replay_mask = []
         return True
 
@@ -271,13 +272,12 @@ class CopyAgent(object):
             hotkey_value = -1
             if u'LineOfSight' in ob:
                 los = ob[u'LineOfSight']
-                x = int(math.floor(los["x"]))
-                y = int(math.floor(los["y"]-0.0001))
-                z = int(math.floor(los["z"]))
-                key = str(x+self.size_x+1)+":"+str(y)+":"+str(z)
+                x, y, z = voxel_world.block_position(los["x"], los["y"]-0.0001, los["z"])
+                # Store the block where it should go in the destination grid:
+                x += self.size_x+1
                 type=los["type"]
-                if y == 1 and not key in self.world:
-                    self.world[key] = type
+                if y == 1 and self.world.get_block(x, y, z) is None:
+                    self.world.set_block(x, y, z, type)
                     hotkey_value = self.findHotKeyForBlockType(ob, type)
             self.current_target += 1
             self.replay_mask.append(hotkey_value)
@@ -326,11 +326,8 @@ class CopyAgent(object):
                 self.replay_accuracy = 5    # Once we've honed in on the first point, we can be less accurate with the rest.
             if u'LineOfSight' in ob:
                 los = ob[u'LineOfSight']
-                x = int(math.floor(los["x"]))
-                y = int(math.floor(los["y"]-0.0001))
-                z = int(math.floor(los["z"]))
-                key=str(x)+":"+str(y+1)+":"+str(z)
-                type = self.world.pop(key, None)
+                x, y, z = voxel_world.block_position(los["x"], los["y"]-0.0001, los["z"])
+                type = self.world.pop_block(x, y+1, z)
                 if type:
                     ah.sendCommand("use")
                     proceed = True
@@ -41,13 +41,15 @@ import random
 import sys
 import time
 import json
-import copy
 import malmoutils
+import voxel_generation
+import grid_observation
 
 malmoutils.fix_print()
 
 # Create default Malmo objects:
 agent_host = MalmoPython.AgentHost()
+agent_host.addOptionalIntArgument("size", "Edge length of the test structure (eg 64-128 to stress-test chunk observations)", 21)
 malmoutils.parse_command_line(agent_host)
 recordingsDirectory = malmoutils.get_recordings_directory(agent_host)
 
@@ -63,76 +65,21 @@ sponge=["sponge", "glass", "sponge", "glass", "sponge", "glass"]
 palletes = [colourful, fiery, oresome, frilly, icepalace, volatile, oak, sponge]
 
 # dimensions of the test structure:
-SIZE_X = 21
-SIZE_Y = 21
-SIZE_Z = 21
+SIZE_X = SIZE_Y = SIZE_Z = agent_host.getIntArgument("size")
+# The volume the grid observer returns (relative to the agent), in front of the player:
+GRID_SPEC = grid_observation.GridSpec((-(old_div(SIZE_X, 2)), 0, 1), (SIZE_X - 1 - old_div(SIZE_X, 2), SIZE_Y - 1, SIZE_Z))
 
 def createTestStructure(sx, sy, sz):
     # Obviously we could just plonk random blocks around the place, but this is much prettier...
-    r = 0.5
-    # Initialise our structure matrix, and an empty copy:
-    s = [[[(1 if random.random() >= r else 0) for x in range(sx)] for y in range(sy)] for z in range(sz)]
-    t = [[[0 for x in range(sx)] for y in range(sy)] for z in range(sz)]
-    # Some useful lambdas:
-    xtrim = lambda x: x % sx if x > 0 else x
-    ytrim = lambda y: y % sy if y > 0 else y
-    ztrim = lambda z: z % sz if z > 0 else z
-    neighbours = lambda x,y,z: [s[xtrim(a)][ytrim(b)][ztrim(c)] for a in range(x-1, x+2) for b in range(y-1, y+2) for c in range(z-1, z+2)]
-
-    colour = False
-    iterations = random.randint(10,25)
-
-    # Run a cellular automata for a few iterations:
-    for i in range(iterations):
-        if i == iterations - 1:
-            colour = True   # Final iteration: don't apply the CA, just colour the cell.
-        for x in range(sx):
-            for y in range(sy):
-                for z in range(sz):
-                    tot = sum(neighbours(x,y,z)) - s[x][y][z]
-                    result = s[x][y][z]
-                    if colour:
-                        # 'colour' the cell according to how many neighbours it has.
-                        result = tot
-                    else:
-                        # CA rules:
-                        #   cell is born if it has 13,14,17,18 or 19 neighbours.
-                        #   cell survives if it has 13 or more neighbours. 
-                        if result == 0:
-                            if tot == 13 or tot == 14 or (tot >= 17 and tot <= 19):
-                                result = 1
-                        else:
-                            if tot < 13:
-                                result = 0
-                    t[x][y][z] = result
-        # copy next generation into source matrix.
-        s = copy.deepcopy(t)
-    return s
+    # Run a cellular automata for 10-25 iterations, then 'colour' each cell according to how many neighbours
+    # it has (see voxel_generation.py). Returns a uint8 array indexed [x, y, z].
+    return voxel_generation.create_structure(sx, sy, sz)
 
 def structureToXMLAndJson(structure, xorg, yorg, zorg):
     # Take the structure and create both a drawing decorator, and a grid json array from it.
     pallette = random.choice(palletes)
-    drawing = ""
-    json = []
-    for y in range(SIZE_Y):
-        for z in range(SIZE_Z):
-            for x in range(SIZE_X):
-                value = structure[x][y][z]
-                if value > 0:
-                    type = pallette[old_div(value,5)]
-                    parts = type.split()
-                    type_string = ' type="' + parts[0] + '"'
-                    if len(parts) > 1:
-                        type_string += ' colour="' + parts[1] + '"'
-                    drawing += '<DrawBlock x="' + str(x + xorg) + '" y="' + str(y + yorg) + '" z="' + str(z + zorg) + '" ' + type_string + '/>'
-                    json.append(u"" + parts[0])
-                else:
-                    json.append(u"air")
-    drawingdecorator = "<DrawingDecorator>"
-    # "Blank out" the volume, in case if overlaps with old structures and throws the test.
-    drawingdecorator += '<DrawCuboid x1="' + str(xorg) + '" y1="' + str(yorg) + '" z1="' + str(zorg) + '" x2="' + str(xorg + SIZE_X) + '" y2="' + str(yorg + SIZE_Y) + '" z2="' + str(zorg + SIZE_Z) + '" type="air"/>'
-    drawingdecorator += drawing + "</DrawingDecorator>"
-    return drawingdecorator, json
+    return (voxel_generation.drawing_decorator(structure, xorg, yorg, zorg, pallette),
+            voxel_generation.grid_block_types(structure, pallette))
 
 def getMissionXMLAndJson(forceReset, structure):
     # Choose a random starting position.
@@ -166,8 +113,8 @@ def getMissionXMLAndJson(forceReset, structure):
             <MissionQuitCommands />
             <ObservationFromGrid>
                 <Grid name="structure">
-                    <min x="''' + str(-(old_div(SIZE_X, 2))) + '''" y="0" z="1"/>
-                    <max x="''' + str(old_div(SIZE_X, 2)) + '''" y="''' + str(SIZE_Y-1) + '''" z="''' + str(SIZE_Z) + '''"/>
+                    <min x="''' + str(GRID_SPEC.min[0]) + '''" y="''' + str(GRID_SPEC.min[1]) + '''" z="''' + str(GRID_SPEC.min[2]) + '''"/>
+                    <max x="''' + str(GRID_SPEC.max[0]) + '''" y="''' + str(GRID_SPEC.max[1]) + '''" z="''' + str(GRID_SPEC.max[2]) + '''"/>
                 </Grid>
             </ObservationFromGrid>
             <VideoProducer viewpoint="1">
@@ -198,6 +145,8 @@ for i in range(num_iterations):
         my_mission_record.setDestination(recordingsDirectory + "//" + "Mission_" + str(i + 1) + ".tgz")
 
     missionXML, gridJson = getMissionXMLAndJson('"false"', structure)
+    # Block names -> interned ids, so each observation can be checked as one array comparison:
+    expectedGrid = grid_observation.decode(gridJson, GRID_SPEC)
     my_mission = MalmoPython.MissionSpec(missionXML, True)
 
     max_retries = 3
@@ -227,8 +176,8 @@ for i in range(num_iterations):
         if world_state.number_of_observations_since_last_state > 0:
             obs = json.loads( world_state.observations[-1].text )
             if "structure" in obs:
-                struct = obs[u"structure"]
-                if struct == gridJson:
+                struct = grid_observation.decode(obs[u"structure"], GRID_SPEC)
+                if grid_observation.equal(expectedGrid, struct):
                     print()
                     print("MATCHING - moving to next mission.")
                     print()
@@ -239,15 +188,8 @@ for i in range(num_iterations):
                     print()
                     print("No match - test failed on iteration " + str(i))
                     # Find the discrepancies:
-                    index = 0
-                    for y in range(SIZE_Y):
-                        for z in range(SIZE_Z):
-                            for x in range(SIZE_X):
-                                expected = gridJson[index]
-                                actual = struct[index]
-                                if expected != actual:
-                                    print("(" + str(x) + "," + str(y) + "," + str(z) + "), -" + actual + " +" + expected)
-                                index += 1
+                    for (x, y, z), expected, actual in grid_observation.differences(expectedGrid, struct):
+                        print("(" + str(x) + "," + str(y) + "," + str(z) + "), -" + actual + " +" + expected)
                     agent_host.sendCommand("quit")
                     if agent_host.receivedArgument("test"):
                         exit(1) # Fail the test.
@@ -31,6 +31,7 @@ import random
 import math
 from io import open
 import malmoutils
+import decision_tree
 
 malmoutils.fix_print()
 
@@ -129,52 +130,19 @@ identifiable_objects = []       # Where the item gets its own leaf in the tree.
 semi_identifiable_objects = []  # Where the item shares a leaf with < 4 other item types.
 unidentifiable_objects = []     # Where four or more items all end up in the same leaf.
 
-def split_on_attribute(data, attribute):
-    '''Return two sets, one where attribute is true, one where attribute is false.'''
-    return [d for d in data if item_table[d][attribute]], [d for d in data if not item_table[d][attribute]]
-
-def calc_entropy(data):
-    '''Calculate the entropy in this data set.'''
-    if len(data) == 0:
-        return 0
-    ent = 0
-    counts = {item:0 for item in item_types}
-    for d in data:
-        counts[d] += 1
-    for item in item_types:
-        p_item = counts[item] / len(data)
-        if p_item != 0:
-            ent += p_item * math.log(p_item)
-    return -ent
-
-def perform_split(data, unused_attributes):
-    '''Split data on the best attribute, and recurse, building a tree as we go.'''
-    # First, calculate the entropy of our data set:
-    ent = calc_entropy(data)
-    # Now, find the best attribute for splitting:
-    gains = {att:0 for att in unused_attributes}
-    for att in unused_attributes:
-        # Not all attributes are shared by every item, so only use this attribute
-        # if all items in the data possess it.
-        attribute_present = [att in item_table[d] for d in data]
-        if not all(attribute_present):
-            continue
-        # Trial split on this attribute:
-        x, y = split_on_attribute(data, att)
-        # Calculate the entropy for each subset, and hence the information gain from
-        # performing this split:
-        ent_x = calc_entropy(x)
-        ent_y = calc_entropy(y)
-        px = len(x) / len(data)
-        py = len(y) / len(data)
-        information_gain = ent - ((px * ent_x) + (py * ent_y))
-        gains[att] = information_gain
-    # Which attribute produced the greatest information gain?
-    split_attribute = max(gains.keys(), key=(lambda key: gains[key]))
-
-    if gains[split_attribute] == 0:
+# Items x attributes as boolean matrices, for fast information-gain splitting (see decision_tree.py):
+splitter = decision_tree.InformationGainSplitter(item_types, attributes, item_table)
+
+def perform_split(rows, unused_attributes):
+    '''Split the rows (item indices) on the best attribute (column index), and recurse, building a tree as we go.'''
+    # Find the attribute that gives the greatest information gain. Attributes that not
+    # all of these items possess are skipped, and subset entropies are cached.
+    split_attribute, gain = splitter.best_split(rows, unused_attributes)
+
+    if gain == 0:
         # We actually gain nothing from performing this split, so don't do it.
         # Instead, add a leaf to our tree.
+        data = splitter.names(rows)
         if len(data) == 1:
             # Best case - item uniquely identified.
             identifiable_objects.append(data[0])
@@ -191,18 +159,18 @@ def perform_split(data, unused_attributes):
             return node("/".join(data), blocktype=("redstone_block" if len(data) > 4 else "diamond_block") )
 
     # The split is worth performing, so create a decision node and recurse.
-    nd = node(split_attribute + "?//&lt;-TRUE FALSE-&gt;", blocktype="iron_block")
+    nd = node(attributes[split_attribute] + "?//&lt;-TRUE FALSE-&gt;", blocktype="iron_block")
     # Track which attributes we've used, for curiosity's sake.
-    used_attributes.append(split_attribute)
+    used_attributes.append(attributes[split_attribute])
 
     # Copy the attributes we were passed in, and remove the attribute we've just split on.
-    attributes = unused_attributes[:]
-    attributes.remove(split_attribute)
+    remaining = unused_attributes[:]
+    remaining.remove(split_attribute)
     # And pass this new list of attributes down the tree to perform the next splits.
-    x, y = split_on_attribute(data, split_attribute)
+    x, y = splitter.split(rows, split_attribute)
     # Add these subtrees as children to our node:
-    nd.setLeft(perform_split(x, attributes))
-    nd.setRight(perform_split(y, attributes))
+    nd.setLeft(perform_split(x, remaining))
+    nd.setRight(perform_split(y, remaining))
     # And return:
     return nd
 
@@ -316,8 +284,7 @@ def drawTree(rootNode, x, y, z, isLeft):
     
 def createTree():
     # Just use the full list of types to create our tree:
-    sample = list(item_types)
-    nd = perform_split(sample, attributes)
+    nd = perform_split(splitter.all_rows(), list(range(len(attributes))))
     return nd
 
 def generateText(x, y, z, text):
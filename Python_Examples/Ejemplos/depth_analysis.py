@@ -0,0 +1,177 @@
+# Depth-map analysis helpers for depth_map_runner.py
+#
+# The video frame's pixel buffer (RGBD, 4 bytes per pixel) is wrapped with
+# np.frombuffer and reshaped, so the depth channel of a row or a band of rows is
+# a strided view of the original buffer - nothing is copied until the profile is
+# differentiated.
+
+from collections import namedtuple
+import time
+
+import numpy as np
+
+DepthAnalysis = namedtuple("DepthAnalysis", [
+    "v", "dv", "d2v",                               # profile and its first/second differences
+    "v_max", "v_max_pos", "v_min", "v_min_pos",
+    "dv_max", "dv_max_pos", "dv_max_sign",
+    "d2v_max", "d2v_max_pos", "d2v_max_sign",
+])
+
+
+def as_uint8(pixels):
+    '''Flat uint8 view of a frame's pixels (zero-copy when they support the buffer protocol).'''
+    if isinstance(pixels, np.ndarray):
+        return pixels.reshape(-1)
+    try:
+        return np.frombuffer(pixels, dtype=np.uint8)
+    except TypeError:
+        return np.fromiter(pixels, dtype=np.uint8)
+
+
+def depth_image(pixels, width, height, channels=4):
+    '''(height, width) strided view of the depth channel (the last one).'''
+    return as_uint8(pixels)[:width * height * channels].reshape(height, width, channels)[:, :, channels - 1]
+
+
+def depth_profile(pixels, width, height, rows=1, channels=4):
+    '''
+    Depth along the middle of the image. With rows=1 this is exactly the middle
+    row (as int32, like the values the original loop worked with); with rows > 1
+    it is the mean of a band of rows centred on it, which smooths out noise.
+    '''
+    depth = depth_image(pixels, width, height, channels)
+    y = height // 2
+    if rows <= 1:
+        return depth[y].astype(np.int32)
+    top = max(0, y - rows // 2)
+    band = depth[top:min(height, top + rows)]
+    return band.mean(axis=0, dtype=np.float64)
+
+
+def analyse_profile(profile):
+    '''
+    Same quantities the original per-pixel loop tracked. dv[i] belongs to pixel
+    i + 1 and d2v[i] to pixel i + 2, and ties resolve to the leftmost pixel.
+    '''
+    v = np.asarray(profile)
+    if v.shape[0] < 3:
+        raise ValueError("Depth profile needs at least 3 pixels")
+    dv = np.diff(v)
+    d2v = np.diff(dv)
+    v_max_pos = int(np.argmax(v))
+    v_min_pos = int(np.argmin(v))
+    dv_i = int(np.argmax(np.abs(dv)))
+    d2v_i = int(np.argmax(np.abs(d2v)))
+    return DepthAnalysis(
+        v, dv, d2v,
+        v[v_max_pos], v_max_pos, v[v_min_pos], v_min_pos,
+        abs(dv[dv_i]), dv_i + 1, bool(dv[dv_i] > 0),
+        abs(d2v[d2v_i]), d2v_i + 2, bool(d2v[d2v_i] > 0),
+    )
+
+
+def discontinuities(analysis, threshold=8):
+    '''Pixel positions where the gradient of the depth jumps by more than threshold.'''
+    return np.flatnonzero(np.abs(analysis.d2v) > threshold) + 2
+
+
+def steering_yaw(analysis, width, previous_yaw, threshold=8):
+    '''The yaw decision depth_map_runner makes from an analysed profile.'''
+    # Put a close-to-far edge in the left quarter of the screen and a far-to-close edge in the right quarter.
+    if analysis.dv_max_sign:
+        edge = width // 4
+    else:
+        edge = 3 * width / 4
+    if analysis.d2v_max > threshold:
+        return float(analysis.d2v_max_pos - edge) / width
+    # Nothing obvious to aim for, so aim for the farthest point:
+    if analysis.v_max < 255:
+        return float(analysis.v_max_pos) / width - 0.5
+    # No real data, so keep turning the way we already were:
+    return -1 if previous_yaw < 0 else 1
+
+
+def analyse_frame(pixels, width, height, rows=1, channels=4):
+    return analyse_profile(depth_profile(pixels, width, height, rows, channels))
+
+
+#-------------------------------------------------------------------------------------------------
+# Benchmark against the original per-pixel loop
+#-------------------------------------------------------------------------------------------------
+
+def _process_frame_loop(frame, video_width, video_height, current_yaw_delta_from_depth):
+    # Copy of the original depth_map_runner.processFrame, for comparison only
+    y = int(video_height // 2)
+    rowstart = y * video_width
+    v = dv = 0
+    v_max = v_max_pos = 0
+    dv_max = dv_max_sign = 0
+    d2v_max = d2v_max_pos = 0
+    for x in range(0, video_width):
+        nv = frame[(rowstart + x) * 4 + 3]
+        ndv = nv - v
+        nd2v = ndv - dv
+        if nv > v_max or x == 0:
+            v_max = nv
+            v_max_pos = x
+        if abs(ndv) > dv_max or x == 1:
+            dv_max = abs(ndv)
+            dv_max_sign = ndv > 0
+        if abs(nd2v) > d2v_max or x == 2:
+            d2v_max = abs(nd2v)
+            d2v_max_pos = x
+        dv = ndv
+        v = nv
+    if dv_max_sign:
+        edge = video_width // 4
+    else:
+        edge = 3 * video_width / 4
+    if d2v_max > 8:
+        return float(d2v_max_pos - edge) / video_width
+    if v_max < 255:
+        return float(v_max_pos) / video_width - 0.5
+    return -1 if current_yaw_delta_from_depth < 0 else 1
+
+
+def synthetic_frame(width, height, rng):
+    '''RGBD frame with a few flat walls at random depths plus noise, as bytes.'''
+    cuts = np.sort(rng.choice(np.arange(1, width), rng.integers(0, 6), replace=False))
+    depth = np.repeat(rng.integers(0, 256, len(cuts) + 1), np.diff(np.concatenate(([0], cuts, [width]))))
+    depth = np.clip(depth + rng.integers(-3, 4, width), 0, 255)
+    if rng.random() < 0.1:
+        depth[:] = 255
+    frame = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+    frame[:, :, 3] = np.clip(depth[None, :] + rng.integers(-2, 3, (height, width)), 0, 255)
+    return frame.tobytes()
+
+
+def benchmark(resolutions=((432, 240), (860, 480)), frames=200, rows=8, seed=0):
+    rng = np.random.default_rng(seed)
+    for width, height in resolutions:
+        data = [synthetic_frame(width, height, rng) for _ in range(frames)]
+        previous = [rng.choice([-0.3, 0.3]) for _ in range(frames)]
+
+        t0 = time.perf_counter()
+        legacy = [_process_frame_loop(f, width, height, p) for f, p in zip(data, previous)]
+        t1 = time.perf_counter()
+        vectorized = [steering_yaw(analyse_frame(f, width, height), width, p) for f, p in zip(data, previous)]
+        t2 = time.perf_counter()
+        for f, p in zip(data, previous):
+            steering_yaw(analyse_frame(f, width, height, rows), width, p)
+        t3 = time.perf_counter()
+
+        mismatches = sum(a != b for a, b in zip(legacy, vectorized))
+        print(f"{width}x{height}: loop {1e3 * (t1 - t0) / frames:.3f} ms/frame, "
+              f"numpy {1e3 * (t2 - t1) / frames:.3f} ms/frame, "
+              f"numpy {rows} rows {1e3 * (t3 - t2) / frames:.3f} ms/frame, "
+              f"{mismatches} different decisions")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Per-frame latency of the depth-map steering")
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark(frames=args.frames, rows=args.rows, seed=args.seed)
@@ -20,7 +20,6 @@ from __future__ import division
 # ------------------------------------------------------------------------------------------------
 
 from builtins import range
-from past.utils import old_div
 import MalmoPython
 import random
 import time
@@ -30,10 +29,12 @@ import socket
 import os
 import sys
 import malmoutils
+import depth_analysis
 
 malmoutils.fix_print()
 
 agent_host = MalmoPython.AgentHost()
+agent_host.addOptionalIntArgument( "depth_rows", "Number of middle rows of the depth map to average (1 = middle line only)", 1 )
 malmoutils.parse_command_line(agent_host)
 recordingsDirectory = malmoutils.get_recordings_directory(agent_host)
 
@@ -56,84 +57,24 @@ logger.setLevel(logging.DEBUG) # set to INFO if you want fewer messages
 #-------------------------------------------------------------------------------------------------------------------------------------
 
 def processFrame( frame ):
-    '''Track through the middle line of the depth data and find the max discontinuities'''
+    '''Analyse the middle line (or band) of the depth data and steer towards the biggest discontinuity'''
     global current_yaw_delta_from_depth
 
-    y = int(old_div(video_height, 2))
-    rowstart = y * video_width
-    
-    v = 0
-    v_max = 0
-    v_max_pos = 0
-    v_min = 0
-    v_min_pos = 0
-    
-    dv = 0
-    dv_max = 0
-    dv_max_pos = 0
-    dv_max_sign = 0
-    
-    d2v = 0
-    d2v_max = 0
-    d2v_max_pos = 0
-    d2v_max_sign = 0
-    
-    for x in range(0, video_width):
-        nv = frame[(rowstart + x) * 4 + 3]
-        ndv = nv - v
-        nd2v = ndv - dv
-
-        if nv > v_max or x == 0:
-            v_max = nv
-            v_max_pos = x
-            
-        if nv < v_min or x == 0:
-            v_min = nv
-            v_min_pos = x
-
-        if abs(ndv) > dv_max or x == 1:
-            dv_max = abs(ndv)
-            dv_max_pos = x
-            dv_max_sign = ndv > 0
-            
-        if abs(nd2v) > d2v_max or x == 2:
-            d2v_max = abs(nd2v)
-            d2v_max_pos = x
-            d2v_max_sign = nd2v > 0
-            
-        d2v = nd2v
-        dv = ndv
-        v = nv
-    
-    logger.info("d2v, dv, v: " + str(d2v) + ", " + str(dv) + ", " + str(v))
+    analysis = depth_analysis.analyse_frame(frame, video_width, video_height, rows=depth_rows)
+    logger.info("d2v, dv, v: " + str(analysis.d2v[-1]) + ", " + str(analysis.dv[-1]) + ", " + str(analysis.v[-1]))
 
     # We want to steer towards the greatest d2v (ie the biggest discontinuity in the gradient of the depth map).
     # If it's a possitive value, then it represents a rapid change from close to far - eg the left-hand edge of a gap.
     # Aiming to put this point in the leftmost quarter of the screen will cause us to aim for the gap.
     # If it's a negative value, it represents a rapid change from far to close - eg the right-hand edge of a gap.
     # Aiming to put this point in the rightmost quarter of the screen will cause us to aim for the gap.
-    if dv_max_sign:
-        edge = old_div(video_width, 4)
-    else:
-        edge = 3 * video_width / 4
-
-    # Now, if there is something noteworthy in d2v, steer according to the above comment:
-    if d2v_max > 8:
-        current_yaw_delta_from_depth = (old_div(float(d2v_max_pos - edge), video_width))
-    else:
-        # Nothing obvious to aim for, so aim for the farthest point:
-        if v_max < 255:
-            current_yaw_delta_from_depth = (old_div(float(v_max_pos), video_width)) - 0.5
-        else:
-            # No real data to be had in d2v or v, so just go by the direction we were already travelling in:
-            if current_yaw_delta_from_depth < 0:
-                current_yaw_delta_from_depth = -1
-            else:
-                current_yaw_delta_from_depth = 1
+    # Failing that, aim for the farthest point, or keep turning the way we were.
+    current_yaw_delta_from_depth = depth_analysis.steering_yaw(analysis, video_width, current_yaw_delta_from_depth)
     
 #----------------------------------------------------------------------------------------------------------------------------------
 
 current_yaw_delta_from_depth = 0
+depth_rows = agent_host.getIntArgument("depth_rows")
 video_width = 432
 video_height = 240
    
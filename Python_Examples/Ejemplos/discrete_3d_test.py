@@ -43,11 +43,11 @@ import random
 import sys
 import time
 import json
-import copy
 import errno
 import xml.etree.ElementTree
-from collections import deque
 import malmoutils
+import voxel_generation
+import voxel_navigation
 
 malmoutils.fix_print()
 
@@ -82,155 +82,21 @@ MovementModes = Enum(['Continuous', 'Discrete_NSEW', 'Discrete_NSEW_autojump', '
 PathTypes = Enum(['Silly', 'Sensible'])
 
 def createTestStructure(sx, sy, sz):
-    # Adapted from chunk_test.py
-    r = 0.5
-    # Initialise our structure matrix, and an empty copy:
-    s = [[[(1 if random.random() >= r else 0) for x in range(sx)] for y in range(sy)] for z in range(sz)]
-    t = [[[0 for x in range(sx)] for y in range(sy)] for z in range(sz)]
-    # Some useful lambdas:
-    xtrim = lambda x: x % sx if x > 0 else x
-    ytrim = lambda y: y % sy if y > 0 else y
-    ztrim = lambda z: z % sz if z > 0 else z
-    neighbours = lambda x,y,z: [s[xtrim(a)][ytrim(b)][ztrim(c)] for a in range(x-1, x+2) for b in range(y-1, y+2) for c in range(z-1, z+2)]
-
-    colour = False
-    iterations = random.randint(20,25)
-
-    # Run a cellular automata for a few iterations:
-    for i in range(iterations):
-        if i == iterations - 1:
-            colour = True   # Final iteration: don't apply the CA, just colour the cell.
-        for x in range(sx):
-            for y in range(sy):
-                for z in range(sz):
-                    tot = sum(neighbours(x,y,z)) - s[x][y][z]
-                    result = s[x][y][z]
-                    if colour:
-                        # 'colour' the cell according to how many neighbours it has.
-                        result = tot
-                    else:
-                        # CA rules:
-                        #   cell is born if it has 13,14,17,18 or 19 neighbours.
-                        #   cell survives if it has 13 or more neighbours. 
-                        if result == 0:
-                            if tot == 13 or tot == 14 or (tot >= 17 and tot <= 19):
-                                result = 1
-                        else:
-                            if tot < 13:
-                                result = 0
-                    t[x][y][z] = result
-        # copy next generation into source matrix.
-        s = copy.deepcopy(t)
+    # Adapted from chunk_test.py - see voxel_generation.py
+    s = voxel_generation.create_structure(sx, sy, sz, iterations=random.randint(20,25))
     # Give it a floor:
-    for x in range(sx):
-        for z in range(sz):
-            s[x][0][z] = 26
-
+    s[:, 0, :] = 26
     return s
 
 def makePath(s, xorg, yorg, zorg, path_type):
     # Build a graph of the structure, and attempt to find a nice path through it, to the lowest reachable point.
-
-    # First create some lambdas that will help assess the reachability of each block:
-    standable = lambda x,y,z: True if (x < 0 or x >= SIZE_X or z < 0 or z >= SIZE_Z) else (s[x][y][z] > 0 and (y + 1 >= SIZE_Y or s[x][y+1][z] == 0) and (y + 2 >= SIZE_Y or s[x][y+2][z] == 0))
-    hoverable = lambda x,y,z: True if (x < 0 or x >= SIZE_X or z < 0 or z >= SIZE_Z) else ((y + 1 >= SIZE_Y or s[x][y+1][z] == 0) and (y + 2 >= SIZE_Y or s[x][y+2][z] == 0))
-    jumpable = lambda x,y,z: True if (x < 0 or x >= SIZE_X or z < 0 or z >= SIZE_Z) else (s[x][y][z] > 0 and (y + 1 >= SIZE_Y or s[x][y+1][z] == 0) and (y + 2 >= SIZE_Y or s[x][y+2][z] == 0) and (y + 3 >= SIZE_Y or s[x][y+3][z] == 0))
-    safeblock = lambda x,y,z: (x,y,z) if s[x][y][z] > 0 else (x,y-1,z) if s[x][y-1][z] > 0 else (x,y-2,z) if s[x][y-2][z] > 0 else (x,y-3,z) if s[x][y-3][z] > 0 else None
-    neighbour = lambda x,y,z,dx,dz: safeblock(x+dx,y,z+dz) if (x+dx < SIZE_X and x+dx >= 0 and z+dz < SIZE_Z and z+dz >= 0) else None
-    index = lambda x,y,z: x + (y * SIZE_X * SIZE_Z) + (z * SIZE_X)
-
-    links = [[[[] for x in range(SIZE_X)] for y in range(SIZE_Y)] for z in range(SIZE_Z)]
-    startpos = (0,0,0)
-
-    # Build the graph:
-    for x in range(SIZE_X):
-        for y in range(SIZE_Y):
-            for z in range(SIZE_Z):
-                # Can we stand on this block?
-                if not standable(x,y,z):
-                    continue
-                if y > startpos[1]:
-                    startpos = (x,y,z)
-                jumpy = jumpable(x,y,z) and y < SIZE_Y - 1
-                # Enumerate accessible neighbours:
-                for dx in range(-1,2):
-                    for dz in range(-1,2):
-                        if dx==0 and dz==0:
-                            continue
-                        if dx != 0 and dz != 0:
-                            continue
-                        if hoverable(x+dx,y,z+dz):
-                            n = neighbour(x,y,z,dx,dz)
-                            if n != None and standable(n[0],n[1],n[2]):
-                                links[x][y][z].append(n)
-                        if jumpy:
-                            nu = neighbour(x,y+1,z,dx,dz)
-                            if nu != None and nu[1] > y and standable(nu[0],nu[1],nu[2]):
-                                links[x][y][z].append(nu)
-
-    # Now search to lowest reachable point:
-    queue = deque([startpos])
-    points = [(False,0) for i in range(SIZE_X * SIZE_Y * SIZE_Z)]
-    start_ind = index(startpos[0], startpos[1], startpos[2])
-    points[start_ind] = (True,0)
-    node = startpos
-    endpos = startpos
-    while len(queue):
-        node = queue.popleft()
-        x = node[0]
-        y = node[1]
-        z = node[2]
-        if y < endpos[1] or (y == endpos[1] and abs(endpos[0]-startpos[0]) + abs(endpos[2]-startpos[2]) < abs(x-startpos[0]) + abs(z-startpos[2])):
-            endpos = (x,y,z)    # Either deeper, or same level but further away.
-        if y == 0:
-            break
-
-        ind = index(x,y,z)
-        if x >= 0 and x < SIZE_X and y >= 0 and y < SIZE_Y and z >= 0 and z < SIZE_Z:
-            neighbours = links[x][y][z]
-            for n in neighbours:
-                n_ind = index(n[0],n[1],n[2])
-                if not points[n_ind][0]:
-                    if path_type == PathTypes.Sensible:
-                        queue.append(n) # Breadth-first.
-                    else:    # PathTypes.Silly
-                        queue.appendleft(n) # Depth-first - much less efficient, much more fun.
-                    points[n_ind]=(True,ind)
-
-    # Work backwards from end point to build path:
-    path = []
-    ind = index(endpos[0], endpos[1], endpos[2])
-    while ind != start_ind:
-        i = ind
-        y = old_div(i, (SIZE_X * SIZE_Z))
-        i -= y * SIZE_X * SIZE_Z
-        z = old_div(i, SIZE_X)
-        i -= z * SIZE_X
-        x = i
-        path.append((x + xorg, y + yorg, z + zorg))
-        ind = points[ind][1]
-    path.append((startpos[0] + xorg, startpos[1] + yorg, startpos[2] + zorg))
-    return path
+    # Sensible paths are the shortest (A*); silly paths come from a depth-first search - much less efficient,
+    # much more fun. See voxel_navigation.py.
+    return voxel_navigation.find_path(s > 0, xorg, yorg, zorg, depth_first=(path_type == PathTypes.Silly))
 
 def structureToXML(structure, xorg, yorg, zorg, pallette):
     # Take the structure and create a drawing decorator for it.
-    drawing = ""
-    for y in range(SIZE_Y):
-        for z in range(SIZE_Z):
-            for x in range(SIZE_X):
-                value = structure[x][y][z]
-                if value > 0:
-                    type = pallette[old_div(value,5)]
-                    parts = type.split()
-                    type_string = ' type="' + parts[0] + '"'
-                    if len(parts) > 1:
-                        type_string += ' colour="' + parts[1] + '"'
-                    drawing += '<DrawBlock x="' + str(x + xorg) + '" y="' + str(y + yorg) + '" z="' + str(z + zorg) + '" ' + type_string + '/>'
-    drawingdecorator = "<DrawingDecorator>"
-    # "Blank out" the volume, in case if overlaps with old structures and throws the test.
-    drawingdecorator += '<DrawCuboid x1="' + str(xorg) + '" y1="' + str(yorg) + '" z1="' + str(zorg) + '" x2="' + str(xorg + SIZE_X) + '" y2="' + str(yorg + SIZE_Y) + '" z2="' + str(zorg + SIZE_Z) + '" type="air"/>'
-    drawingdecorator += drawing + "</DrawingDecorator>"
-    return drawingdecorator
+    return voxel_generation.drawing_decorator(structure, xorg, yorg, zorg, pallette)
 
 def getAnnotationAndTolerance(current, next, mode):
     # Depending on the movement mode, return an annotation that will help the agent know how to reach the next subgoal.
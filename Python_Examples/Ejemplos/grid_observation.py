@@ -0,0 +1,166 @@
+# Decoding ObservationFromGrid observations into NumPy arrays
+#
+# A grid observation arrives as a flat JSON list of block names, in y, then z,
+# then x order over the <min>/<max> box of the <Grid> spec. Block names are
+# interned into small integer ids through a shared vocabulary (a dict whose
+# __missing__ hands out the next id, so lookups of known names are a single dict
+# access and unseen types are added on the fly), and the list becomes a
+# (y, z, x) uint16 array. Comparing, diffing and counting blocks are then array
+# operations instead of walks over lists of strings.
+
+from collections import namedtuple
+import time
+
+import numpy as np
+
+UNKNOWN = np.iinfo(np.uint16).max     # id reserved for blocks that have not been observed
+MAX_BLOCK_TYPES = UNKNOWN
+
+
+class _Interner(dict):
+    # name -> id; a name not seen before is given the next id
+    def __init__(self, names):
+        dict.__init__(self)
+        self.names = names
+
+    def __missing__(self, name):
+        if len(self.names) >= MAX_BLOCK_TYPES:
+            raise ValueError("More than %d block types in the vocabulary" % MAX_BLOCK_TYPES)
+        block_id = self[name] = len(self.names)
+        self.names.append(name)
+        return block_id
+
+
+class BlockVocabulary(object):
+    '''Interned block names <-> uint16 ids. "air" is always id 0.'''
+
+    def __init__(self, names=()):
+        self.names = []
+        self._ids = _Interner(self.names)
+        self._ids["air"]
+        for name in names:
+            self._ids[name]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return dict.__contains__(self._ids, name)
+
+    def id(self, name):
+        return self._ids[name]
+
+    def ids(self, names):
+        '''uint16 array of the ids of a sequence of block names.'''
+        return np.fromiter(map(self._ids.__getitem__, names), dtype=np.uint16, count=len(names))
+
+    def name(self, block_id):
+        return self.names[block_id]
+
+    def decode(self, ids):
+        '''Block names of an array of ids, as a nested list of the same shape.'''
+        return np.array(self.names, dtype=object)[ids].tolist()
+
+
+# Shared by every grid decoded in this process, so ids are comparable between grids:
+VOCABULARY = BlockVocabulary(["stone", "grass", "dirt", "cobblestone", "planks", "bedrock", "water", "lava",
+                              "sand", "gravel", "log", "leaves", "glass", "sandstone", "wool", "snow", "ice"])
+
+
+class GridSpec(namedtuple("GridSpec", ["min", "max"])):
+    '''The <min>/<max> (x, y, z) corners of a <Grid>, inclusive, relative to the agent.'''
+    __slots__ = ()
+
+    @property
+    def shape(self):
+        '''(y, z, x) shape of the decoded grid.'''
+        return (self.max[1] - self.min[1] + 1, self.max[2] - self.min[2] + 1, self.max[0] - self.min[0] + 1)
+
+    @property
+    def size(self):
+        y, z, x = self.shape
+        return x * y * z
+
+    def position(self, y, z, x):
+        '''Offset from the agent of the block at decoded index (y, z, x).'''
+        return (self.min[0] + x, self.min[1] + y, self.min[2] + z)
+
+
+def decode(names, spec, vocabulary=VOCABULARY):
+    '''(y, z, x) uint16 array of block ids from an ObservationFromGrid list of block names.'''
+    if len(names) != spec.size:
+        raise ValueError("Grid observation has %d blocks, expected %d for %s" % (len(names), spec.size, spec))
+    return vocabulary.ids(names).reshape(spec.shape)
+
+
+def equal(expected, actual):
+    return expected.shape == actual.shape and bool((expected == actual).all())
+
+
+def differences(expected, actual, vocabulary=VOCABULARY):
+    '''
+    The blocks where two decoded grids differ, in observation order, as
+    ((x, y, z) position in the grid, expected name, actual name) tuples.
+    '''
+    ys, zs, xs = np.nonzero(expected != actual)
+    return [((x, y, z), vocabulary.names[expected[y, z, x]], vocabulary.names[actual[y, z, x]])
+            for y, z, x in zip(ys.tolist(), zs.tolist(), xs.tolist())]
+
+
+def counts(grid, vocabulary=VOCABULARY):
+    '''Number of blocks of each type present in a decoded grid, as a dict of name -> count.'''
+    totals = np.bincount(grid.ravel(), minlength=len(vocabulary))
+    return {vocabulary.names[i]: int(totals[i]) for i in np.flatnonzero(totals).tolist()}
+
+
+def count(grid, name, vocabulary=VOCABULARY):
+    '''Number of blocks of one type in a decoded grid.'''
+    if name not in vocabulary:
+        return 0
+    return int(np.count_nonzero(grid == vocabulary.id(name)))
+
+
+#-------------------------------------------------------------------------------------------------
+# Benchmark: decoding and comparing against the list-of-strings handling it replaces
+#-------------------------------------------------------------------------------------------------
+
+def _synthetic_observation(spec, rng, types=("air", "stone", "dirt", "grass", "glowstone", "netherrack", "slime")):
+    return [types[i] for i in rng.integers(0, len(types), spec.size).tolist()]
+
+
+def benchmark(extents=(5, 21, 41), ticks=20, seed=0):
+    import json
+    rng = np.random.default_rng(seed)
+    for extent in extents:
+        spec = GridSpec((-(extent // 2), 0, 1), (extent - 1 - extent // 2, extent - 1, extent))
+        expected_names = _synthetic_observation(spec, rng)
+        observed_names = list(expected_names)
+        observed_names[len(observed_names) // 2] = "lapis_block"
+        text = json.dumps({"structure": observed_names})
+        expected = decode(expected_names, spec)
+
+        t0 = time.perf_counter()
+        for tick in range(ticks):
+            struct = json.loads(text)["structure"]
+            list_diffs = [(i, e, a) for i, (e, a) in enumerate(zip(expected_names, struct)) if e != a] if struct != expected_names else []
+            list_counts = {}
+            for name in struct:
+                list_counts[name] = list_counts.get(name, 0) + 1
+        t1 = time.perf_counter()
+        for tick in range(ticks):
+            grid = decode(json.loads(text)["structure"], spec)
+            grid_diffs = differences(expected, grid) if not equal(expected, grid) else []
+            grid_counts = counts(grid)
+        t2 = time.perf_counter()
+        same = len(list_diffs) == len(grid_diffs) and list_counts == grid_counts
+        print("%d blocks: lists %.2f ms/tick, decoded %.2f ms/tick (json.loads included), same answers: %s"
+              % (spec.size, 1000 * (t1 - t0) / ticks, 1000 * (t2 - t1) / ticks, same))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Time grid observation decoding")
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark(ticks=args.ticks, seed=args.seed)
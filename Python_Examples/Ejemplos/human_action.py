@@ -40,6 +40,7 @@ else:
     import tkinter.messagebox
 from PIL import Image
 from PIL import ImageTk
+import video_frames
 
 class HumanAgentHost(object):
 
@@ -142,7 +143,7 @@ class HumanAgentHost(object):
                 self.observation.config(text = self.world_state.observations[0].text )
             if mission_spec.isVideoRequested(0) and self.world_state.number_of_video_frames_since_last_state > 0:
                 frame = self.world_state.video_frames[-1]
-                image = Image.frombytes('RGB', (frame.width,frame.height), bytes(frame.pixels) )
+                image = Image.fromarray(video_frames.frame_view(frame), 'RGB')
                 photo = ImageTk.PhotoImage(image)
                 self.canvas.delete("all")
                 self.canvas.create_image(old_div(frame.width,2), old_div(frame.height,2), image=photo)
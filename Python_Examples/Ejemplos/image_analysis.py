@@ -0,0 +1,204 @@
+# Image analysis helpers for agent_visibility_test.py
+#
+# Frames are wrapped with np.frombuffer (no copy), the strip around the horizon is
+# a slice of that view, and luminance, histogram, Otsu threshold and the row-OR /
+# edge count are all done with NumPy. The arithmetic follows the original
+# per-pixel code operation by operation, so thresholds and agent counts are
+# bit-for-bit identical.
+
+from collections import namedtuple
+import time
+
+import numpy as np
+
+Visibility = namedtuple("Visibility", ["strip", "luminance", "threshold", "foreground", "agents"])
+
+
+def frame_array(pixels, width, height, channels=3):
+    '''(height, width, channels) uint8 view of a frame's pixels (zero-copy for buffer-protocol objects).'''
+    if isinstance(pixels, np.ndarray):
+        flat = pixels.reshape(-1)
+    else:
+        try:
+            flat = np.frombuffer(pixels, dtype=np.uint8)
+        except TypeError:
+            flat = np.fromiter(pixels, dtype=np.uint8)
+    return flat[:width * height * channels].reshape(height, width, channels)
+
+
+def horizon_rows(height):
+    '''Rows y1:y2 of the narrow strip just above the middle of the image.'''
+    y1 = int(height * 0.45)
+    y2 = int(height * 0.5)
+    if y2 == y1:
+        y1 -= 1
+    return y1, y2
+
+
+def luminance(rgb):
+    '''Rec. 709 luminance, truncated to uint8 like int() in the original loop.'''
+    r = rgb[..., 0].astype(np.float64)
+    g = rgb[..., 1].astype(np.float64)
+    b = rgb[..., 2].astype(np.float64)
+    return (0.2126 * r + 0.7152 * g + 0.0722 * b).astype(np.uint8)
+
+
+def histogram(lum):
+    return np.bincount(lum.ravel(), minlength=256)
+
+
+def otsu_threshold(hist):
+    '''
+    Otsu threshold from cumulative sums: the first t that maximises the
+    between-class variance, or 0 if no split has positive variance.
+    '''
+    hist = np.asarray(hist, dtype=np.int64)
+    t = np.arange(len(hist), dtype=np.int64)
+    weight_background = np.cumsum(hist)
+    sum_background = np.cumsum(t * hist)
+    total_pixels = weight_background[-1]
+    weight_foreground = total_pixels - weight_background
+    valid = (weight_background > 0) & (weight_foreground > 0)
+    if not valid.any():
+        return 0
+    wb = weight_background[valid].astype(np.float64)
+    wf = weight_foreground[valid].astype(np.float64)
+    sb = sum_background[valid].astype(np.float64)
+    mean_background = sb / wb
+    mean_foreground = (float(sum_background[-1]) - sb) / wf
+    diff = mean_background - mean_foreground
+    var = wb * wf * diff * diff
+    best = int(np.argmax(var))
+    if not var[best] > 0:
+        return 0
+    return int(t[valid][best])
+
+
+def count_edges(lum, threshold):
+    '''
+    OR the thresholded rows together and count background/foreground changes
+    across the scanline, which starts as background. Returns (columns, changes)
+    where columns is True for columns containing any pixel <= threshold.
+    '''
+    columns = (lum <= threshold).any(axis=0)
+    changes = int(np.count_nonzero(columns[1:] != columns[:-1])) + int(columns[0])
+    return columns, changes
+
+
+def detect_agents(pixels, width, height, channels=3):
+    '''Full pipeline of agent_visibility_test.processFrame: how many agents jut above the horizon.'''
+    y1, y2 = horizon_rows(height)
+    strip = frame_array(pixels, width, height, channels)[y1:y2]
+    lum = luminance(strip)
+    threshold = otsu_threshold(histogram(lum))
+    columns, changes = count_edges(lum, threshold)
+    return Visibility(strip, lum, threshold, columns, changes // 2)
+
+
+#-------------------------------------------------------------------------------------------------
+# Verification / benchmark against the original per-pixel code
+#-------------------------------------------------------------------------------------------------
+
+def _process_frame_loop(width, height, pixels):
+    # Copy of the non-gui part of the original processFrame; returns (threshold, agents)
+    channels = 3
+    y1, y2 = horizon_rows(height)
+    num_rows = y2 - y1
+    middle_strip = bytearray(pixels[y1*width*channels:y2*width*channels])
+    hist = [0 for x in range(256)]
+    for col in range(0, width*channels, channels):
+        for row in range(0, num_rows):
+            pix = col + row * width * channels
+            lum = int(0.2126 * middle_strip[pix] + 0.7152 * middle_strip[pix + 1] + 0.0722 * middle_strip[pix + 2])
+            hist[lum] += 1
+            middle_strip[pix] = middle_strip[pix+1] = middle_strip[pix+2] = lum
+    total_pixels = width * num_rows
+    total_sum = 0.
+    for t in range(256):
+        total_sum += t * hist[t]
+    sum_background = 0.
+    weight_background = 0.
+    max_variation = 0.
+    threshold = 0
+    for t in range(256):
+        weight_background += hist[t]
+        if weight_background == 0:
+            continue
+        weight_foreground = total_pixels - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += t * hist[t]
+        mean_background = sum_background / weight_background
+        mean_foreground = (total_sum - sum_background) / weight_foreground
+        var = weight_background * weight_foreground * (mean_background - mean_foreground) * (mean_background - mean_foreground)
+        if var > max_variation:
+            max_variation = var
+            threshold = t
+    for pix in range(len(middle_strip)):
+        middle_strip[pix] = 255 if middle_strip[pix] <= threshold else 0
+    pixelvalue = lambda col: sum(middle_strip[x] for x in range(col, len(middle_strip), width * channels))
+    lastval = 255
+    changes = 0
+    for col in range(0, width * channels, channels):
+        val = 0 if pixelvalue(col) > 0 else 255
+        if lastval != val:
+            changes += 1
+        lastval = val
+    return threshold, changes // 2
+
+
+def synthetic_frame(width, height, rng, agents=3):
+    '''Bright sky over dark ground with a few dark "agents" jutting above the horizon.'''
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:height // 2] = rng.integers(150, 230, 3, dtype=np.uint8)
+    frame[height // 2:] = rng.integers(20, 90, 3, dtype=np.uint8)
+    for _ in range(agents):
+        x = int(rng.integers(10, width - 40))
+        frame[int(height * 0.42):height // 2 + 10, x:x + int(rng.integers(8, 30))] = rng.integers(0, 120, 3, dtype=np.uint8)
+    noise = rng.integers(-6, 7, frame.shape)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8).tobytes()
+
+
+def load_recorded_frames(directory):
+    '''Frames saved by agent_visibility_test (PNG files) as (width, height, bytes).'''
+    import glob
+    import os
+    from PIL import Image
+    frames = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.png"))):
+        image = Image.open(path).convert("RGB")
+        frames.append((image.width, image.height, image.tobytes()))
+    return frames
+
+
+def benchmark(frames):
+    t0 = time.perf_counter()
+    legacy = [_process_frame_loop(w, h, p) for w, h, p in frames]
+    t1 = time.perf_counter()
+    vectorised = []
+    for w, h, p in frames:
+        result = detect_agents(p, w, h)
+        vectorised.append((result.threshold, result.agents))
+    t2 = time.perf_counter()
+    mismatches = sum(a != b for a, b in zip(legacy, vectorised))
+    n = len(frames)
+    print(f"{n} frames: loop {1e3 * (t1 - t0) / n:.2f} ms/frame, numpy {1e3 * (t2 - t1) / n:.3f} ms/frame, "
+          f"{mismatches} mismatches (threshold, agents)")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Compare the NumPy visibility pipeline with the original loop")
+    parser.add_argument('--recorded', default="", help="Directory of recorded PNG frames (eg VisibilityTest_FailedFrames)")
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--width', type=int, default=860)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if args.recorded:
+        data = load_recorded_frames(args.recorded)
+    else:
+        rng = np.random.default_rng(args.seed)
+        data = [(args.width, args.height, synthetic_frame(args.width, args.height, rng, int(rng.integers(0, 4))))
+                for _ in range(args.frames)]
+    benchmark(data)
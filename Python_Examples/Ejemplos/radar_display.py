@@ -0,0 +1,190 @@
+# Panorama and radar-blip rendering for radar_test.py
+#
+# PanoramaBuffer keeps the panorama in a preallocated (height, width, 3) NumPy
+# array. Each colour frame's centre slice is slice-assigned into it, and only the
+# columns written since the last flush are pushed to the Tk photo image.
+# BlipRing keeps the radar blips in fixed-size ring arrays; their fading is
+# computed for all of them at once, and only the blips whose colour actually
+# changed (or that expired) touch the canvas.
+# So the per-frame cost depends on neither the panorama width nor the blip history.
+
+import time
+
+import numpy as np
+
+
+def frame_array(pixels, width, height, channels=3):
+    '''(height, width, channels) uint8 view of a frame's pixels (zero-copy for buffer-protocol objects).'''
+    if isinstance(pixels, np.ndarray):
+        flat = pixels.reshape(-1)
+    else:
+        try:
+            flat = np.frombuffer(pixels, dtype=np.uint8)
+        except TypeError:
+            flat = np.fromiter(pixels, dtype=np.uint8)
+    return flat[:width * height * channels].reshape(height, width, channels)
+
+
+def tk_photo_data(block):
+    '''Tk photo "put" data ("{#rrggbb #rrggbb ...} {...}") for a (h, w, 3) uint8 block.'''
+    h, w, _ = block.shape
+    hex_digits = np.frombuffer(np.ascontiguousarray(block).tobytes().hex().encode('ascii'), dtype=np.uint8)
+    pixels = np.empty((h, w, 8), dtype=np.uint8)
+    pixels[:, :, 0] = ord('#')
+    pixels[:, :, 1:7] = hex_digits.reshape(h, w, 6)
+    pixels[:, :, 7] = ord(' ')
+    rows = np.empty((h, w * 8 + 2), dtype=np.uint8)
+    rows[:, 0] = ord('{')
+    rows[:, 1:-1] = pixels.reshape(h, w * 8)
+    rows[:, -2] = ord('}')     # replaces the last pixel's trailing space
+    rows[:, -1] = ord(' ')
+    return rows.tobytes().decode('ascii')
+
+
+class PanoramaBuffer(object):
+    """Panorama assembled from the centre slice of each frame, placed by yaw."""
+
+    def __init__(self, width, height, slice_width=8):
+        self.width = width
+        self.height = height
+        self.slice_width = slice_width
+        self.buffer = np.zeros((height, width, 3), dtype=np.uint8)
+        self._dirty = []
+
+    def clear(self):
+        self.buffer[:] = 0
+        self._dirty = [(0, self.width)]
+
+    def add_frame(self, pixels, frame_width, frame_height, yaw):
+        '''Paste the centre slice of an RGB frame at the panorama column for this yaw.'''
+        frame = frame_array(pixels, frame_width, frame_height)
+        left = frame_width // 2 - self.slice_width // 2
+        x = int((int(yaw) % 360) * self.width / 360.0)
+        w = min(self.slice_width, self.width - x)
+        h = min(self.height, frame_height)
+        self.buffer[:h, x:x + w] = frame[:h, left:left + w]
+        self._dirty.append((x, x + w))
+
+    def flush(self, photo):
+        '''Push the columns changed since the last flush into a Tk PhotoImage; returns columns pushed.'''
+        pushed = 0
+        for x1, x2 in self._dirty:
+            photo.put(tk_photo_data(self.buffer[:, x1:x2]), to=(x1, 0))
+            pushed += x2 - x1
+        self._dirty = []
+        return pushed
+
+
+class BlipRing(object):
+    """
+    Radar blips that fade from full brightness to nothing over `fade` frames.
+    Colours are quantised into `levels` steps (levels = fade + 1 recolours
+    every blip on every frame, as the original per-dot loop did).
+    """
+
+    def __init__(self, canvas, fade=100, levels=20, radius=3):
+        self.canvas = canvas
+        self.fade = fade
+        self.levels = min(levels, fade + 1)
+        self.radius = radius
+        capacity = fade + 1
+        self._items = np.zeros(capacity, dtype=np.int64)    # canvas ids; 0 = empty slot
+        self._births = np.zeros(capacity, dtype=np.int64)
+        self._shown = np.zeros(capacity, dtype=np.int64)    # colour level currently on the canvas
+        self._head = 0
+
+    def _colour(self, brightness):
+        return "#{0:02x}{1:02x}{2:02x}".format(100, int(brightness * (255.0 / float(self.fade))), 80)
+
+    def __len__(self):
+        return int(np.count_nonzero(self._items))
+
+    def clear(self):
+        for item in self._items[self._items != 0].tolist():
+            self.canvas.delete(item)
+        self._items[:] = 0
+
+    def add(self, x, y, frame):
+        slot = self._head
+        if self._items[slot]:
+            self.canvas.delete(int(self._items[slot]))
+        r = self.radius
+        self._items[slot] = self.canvas.create_oval(x - r, y - r, x + r, y + r, width=0, fill=self._colour(self.fade))
+        self._births[slot] = frame
+        self._shown[slot] = 0
+        self._head = (slot + 1) % len(self._items)
+
+    def decay(self, frame):
+        '''Fade every blip to its brightness at `frame`; blips older than `fade` frames are removed.'''
+        live = self._items != 0
+        age = frame - self._births
+        expired = live & (age > self.fade)
+        for i in np.flatnonzero(expired).tolist():
+            self.canvas.delete(int(self._items[i]))
+        self._items[expired] = 0
+
+        level = np.minimum(age, self.fade) * self.levels // (self.fade + 1)
+        changed = live & ~expired & (level != self._shown)
+        for i in np.flatnonzero(changed).tolist():
+            self.canvas.itemconfig(int(self._items[i]), fill=self._colour(self.fade - int(age[i])))
+        self._shown[changed] = level[changed]
+
+
+#-------------------------------------------------------------------------------------------------
+# Benchmark (no display needed): per-frame cost against panorama width and blip history
+#-------------------------------------------------------------------------------------------------
+
+class _CountingCanvas(object):
+    # Stands in for a Tk canvas / photo and counts the calls that would reach Tk
+    def __init__(self):
+        self.calls = 0
+        self._next = 0
+
+    def create_oval(self, *args, **kwargs):
+        self.calls += 1
+        self._next += 1
+        return self._next
+
+    def delete(self, item):
+        self.calls += 1
+
+    def itemconfig(self, item, **kwargs):
+        self.calls += 1
+
+    def put(self, data, to=None):
+        self.calls += 1
+
+
+def benchmark(frames=500, video_width=432, video_height=240, widths=(432, 1728, 6912), fades=(100, 1000, 10000)):
+    rng = np.random.default_rng(0)
+    colour = [rng.integers(0, 256, video_width * video_height * 3, dtype=np.uint8).tobytes() for _ in range(4)]
+    for width in widths:
+        panorama = PanoramaBuffer(width, video_height)
+        photo = _CountingCanvas()
+        t0 = time.perf_counter()
+        for f in range(frames):
+            panorama.add_frame(colour[f % 4], video_width, video_height, yaw=f * 1.5)
+            panorama.flush(photo)
+        dt = time.perf_counter() - t0
+        print("panorama %5d px wide: %.3f ms/frame" % (width, 1e3 * dt / frames))
+    for fade in fades:
+        canvas = _CountingCanvas()
+        blips = BlipRing(canvas, fade=fade)
+        for f in range(fade + 1):     # fill the history first
+            blips.add(0, 0, f)
+            blips.decay(f)
+        canvas.calls = 0
+        t0 = time.perf_counter()
+        for f in range(fade + 1, fade + 1 + frames):
+            blips.add(0, 0, f)
+            blips.decay(f)
+        dt = time.perf_counter() - t0
+        print("blip history %5d: %.3f ms/frame, %.1f canvas calls/frame" % (fade, 1e3 * dt / frames, canvas.calls / frames))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Per-frame cost of the radar_test panorama and blips")
+    parser.add_argument('--frames', type=int, default=500)
+    args = parser.parse_args()
+    benchmark(args.frames)
@@ -27,7 +27,6 @@ from __future__ import division
 
 from future import standard_library
 standard_library.install_aliases()
-from builtins import bytes
 from builtins import range
 from builtins import object
 from past.utils import old_div
@@ -35,7 +34,6 @@ import MalmoPython
 import random
 import time
 import logging
-import struct
 import socket
 import os
 import sys
@@ -55,8 +53,9 @@ if sys.version_info[0] == 2:
 else:
     from tkinter import *
 
-from PIL import ImageTk
-from PIL import Image
+import numpy as np
+import radar_display
+import video_frames
 
 video_width = 432
 video_height = 240
@@ -75,17 +74,20 @@ root_frame.pack()
 class draw_helper(object):
     def __init__(self, canvas):
         self._canvas = canvas
-        self.reset()
         self._line_fade = 9
         self._blip_fade = 100
+        self.reset()
 
     def reset(self):
         self._canvas.delete("all")
-        self._dots = []
+        self._blips = radar_display.BlipRing(self._canvas, fade=self._blip_fade)
         self._segments = []
-        self._panorama_image = Image.new('RGB', (WIDTH, video_height))
-        self._panorama_photo = None
-        self._image_handle = None
+        # The panorama lives in a NumPy buffer; only the columns that change are pushed to this photo:
+        self._panorama = radar_display.PanoramaBuffer(WIDTH, video_height)
+        self._panorama_photo = PhotoImage(width=WIDTH, height=video_height)
+        self._panorama.clear()
+        self._panorama.flush(self._panorama_photo)
+        self._image_handle = self._canvas.create_image(old_div(WIDTH, 2), HEIGHT - (old_div(video_height, 2)), image=self._panorama_photo)
         self._current_frame = 0
         self._last_angle = 0
 
@@ -108,12 +110,12 @@ class draw_helper(object):
 
             # Get the depth value from the centre of the map:
             mid_pix = 2 * video_width * (video_height + 1)  # flattened index of middle pixel
-            depth = scale * struct.unpack('f', bytes(frame.pixels[mid_pix:mid_pix + 4]))[0]   # unpack 32bit float
+            depth = scale * float(video_frames.buffer_view(frame.pixels, np.float32, mid_pix, 1)[0])   # 32bit float, read in place
 
             # Draw the "blip":
             x = cx + depth * math.cos(angle)
             y = cy + depth * math.sin(angle)
-            self._dots.append((self._canvas.create_oval(x - 3, y - 3, x + 3, y + 3, width=0, fill="#ffa930"), self._current_frame))
+            self._blips.add(x, y, self._current_frame)
 
             # Fade the lines and the blips:
             for i, seg in enumerate(self._segments):
@@ -122,34 +124,14 @@ class draw_helper(object):
             if len(self._segments) >= self._line_fade:
                 self._canvas.delete(self._segments.pop(0))
 
-            for i, dot in enumerate(self._dots):
-                brightness = self._blip_fade - (self._current_frame - dot[1])
-                if brightness < 0:
-                    self._canvas.delete(dot[0])
-                else:
-                    fillstr = "#{0:02x}{1:02x}{2:02x}".format(100, int(brightness * (old_div(255.0, float(self._blip_fade)))), 80)
-                    self._canvas.itemconfig(dot[0], fill=fillstr)
-                self._dots = [dot for dot in self._dots if self._current_frame - dot[1] <= self._blip_fade]
+            self._blips.decay(self._current_frame)
             self._current_frame += 1
         elif frame.frametype == MalmoPython.FrameType.COLOUR_MAP:
-            # Use the centre slice of the colourmap to create a panaramic image
-            # First create image from this frame:
-            cmap = Image.frombytes('RGB', (video_width, video_height), bytes(frame.pixels))
-            # Now crop just the centre slice:
-            left = (old_div(video_width, 2)) - 4
-            cmap = cmap.crop((left, 0, left + 8, video_height))
-            cmap.load()
-            # Where does this slice belong in the panorama?
-            x = int((int(frame.yaw) % 360) * WIDTH / 360.0)
-            # Paste it in:
-            self._panorama_image.paste(cmap, (x, 0, x + 8, video_height))
-            # Convert to a photo for canvas use:
-            self._panorama_photo = ImageTk.PhotoImage(self._panorama_image)
-            # And update/create the canvas image:
-            if self._image_handle is None:
-                self._image_handle = canvas.create_image(old_div(WIDTH, 2), HEIGHT - (old_div(video_height, 2)), image=self._panorama_photo)
-            else:
-                canvas.itemconfig(self._image_handle, image=self._panorama_photo)
+            # Use the centre slice of the colourmap to create a panaramic image:
+            # the 8-pixel centre slice goes into the panorama at the position given by the yaw,
+            # and only those columns are sent to the canvas photo.
+            self._panorama.add_frame(frame.pixels, video_width, video_height, frame.yaw)
+            self._panorama.flush(self._panorama_photo)
 
 def draw_environment():
     xml = '<DrawCuboid x1="-12" y1="227" z1="-12" x2="12" y2="237" z2="12" type="air"/>'
@@ -39,6 +39,7 @@ import random
 import sys
 import time
 import malmoutils
+import video_frames
 if sys.version_info[0] == 2:
     # Workaround for https://github.com/PythonCharmers/python-future/issues/262
     import Tkinter as tk
@@ -88,7 +89,7 @@ class RandomAgent(object):
             if save_images:
                 # save the frame, for debugging
                 frame = world_state.video_frames[-1]
-                image = Image.frombytes('RGB', (frame.width, frame.height), bytes(frame.pixels) )
+                image = Image.fromarray(video_frames.frame_view(frame), 'RGB')
                 self.iFrame = 0
                 self.rep = self.rep + 1
                 image.save( 'rep_' + str(self.rep).zfill(3) + '_saved_frame_' + str(self.iFrame).zfill(4) + '.png' )
@@ -158,7 +159,7 @@ class RandomAgent(object):
             if world_state.is_mission_running:
                 assert len(world_state.video_frames) > 0, 'No video frames!?'
                 frame = world_state.video_frames[-1]
-                image = Image.frombytes('RGB', (frame.width, frame.height), bytes(frame.pixels) )
+                image = Image.fromarray(video_frames.frame_view(frame), 'RGB')
                 self.iFrame = self.iFrame + 1
                 image.save( 'rep_' + str(self.rep).zfill(3) + '_saved_frame_' + str(self.iFrame).zfill(4) + '.png' )
             
@@ -0,0 +1,175 @@
+# Sensor extraction for braitenberg_simulation.py
+#
+# A luminance frame (one byte per pixel) is wrapped with np.frombuffer and split
+# into N vertical strips ("sensors"), optionally restricted to a region of
+# interest. Each strip gets a 256-bin histogram from np.bincount, and the mean and
+# median come from that histogram: the median search is a cumulative sum plus
+# searchsorted instead of a walk over the bins.
+
+from collections import namedtuple
+import time
+
+import numpy as np
+
+SensorReading = namedtuple("SensorReading", ["means", "medians", "histograms"])
+
+_LEVELS = np.arange(256, dtype=np.float64)
+
+
+def luminance_array(pixels, width, height):
+    '''(height, width) uint8 view of a single-channel frame (zero-copy for buffer-protocol objects).'''
+    if isinstance(pixels, np.ndarray):
+        flat = pixels.reshape(-1)
+    else:
+        try:
+            flat = np.frombuffer(pixels, dtype=np.uint8)
+        except TypeError:
+            flat = np.fromiter(pixels, dtype=np.uint8)
+    return flat[:width * height].reshape(height, width)
+
+
+def histogram_means(histograms, counts=None):
+    '''Mean value (0-1) of each histogram row (dividing by counts if given, else by the row totals).'''
+    histograms = np.atleast_2d(histograms)
+    if counts is None:
+        counts = histograms.sum(axis=1)
+    return (histograms @ _LEVELS) / np.maximum(counts, 1) / 255.0
+
+
+def histogram_medians(histograms, cut_offs=None):
+    '''
+    Median estimate (0-1) of each histogram row, as the original loop computed
+    it: one past the first bin at which the running count reaches the cut-off
+    (by default half the row's pixels), divided by 255.
+    '''
+    histograms = np.atleast_2d(histograms)
+    cumulative = np.cumsum(histograms, axis=1)
+    cut_off = cumulative[:, -1] / 2.0 if cut_offs is None else np.broadcast_to(cut_offs, len(histograms))
+    medians = np.empty(len(histograms), dtype=np.float64)
+    for i, (row, c) in enumerate(zip(cumulative, cut_off)):
+        medians[i] = 0 if c <= 0 else int(np.searchsorted(row, c, side='left')) + 1
+    return medians / 255.0
+
+
+class SensorArray(object):
+    """
+    N sensors side by side across a frame. roi is None (whole frame), a box
+    (x1, y1, x2, y2) in pixels (end-exclusive), or a boolean (height, width)
+    mask; the sensors split the ROI's columns into n_sensors equal strips.
+    Each sensor's mean and median are taken over its own strip's pixels, except
+    for the unmasked left/right pair of the original processFrame, which reads
+    both halves against half the ROI's pixels (so an odd frame width gives the
+    same readings as before).
+    """
+
+    def __init__(self, width, height, n_sensors=2, roi=None):
+        self.width = width
+        self.height = height
+        self.n_sensors = n_sensors
+        mask = None
+        if roi is None:
+            x1, y1, x2, y2 = 0, 0, width, height
+        elif isinstance(roi, np.ndarray):
+            mask = np.asarray(roi, dtype=bool)
+            if mask.shape != (height, width):
+                raise ValueError("ROI mask must have shape (height, width)")
+            rows = np.flatnonzero(mask.any(axis=1))
+            cols = np.flatnonzero(mask.any(axis=0))
+            if not len(rows):
+                raise ValueError("ROI mask is empty")
+            x1, y1, x2, y2 = cols[0], rows[0], cols[-1] + 1, rows[-1] + 1
+        else:
+            x1, y1, x2, y2 = roi
+        if not (0 <= x1 < x2 <= width and 0 <= y1 < y2 <= height) or x2 - x1 < n_sensors:
+            raise ValueError("ROI (%d, %d, %d, %d) does not fit %d sensors in a %dx%d frame"
+                             % (x1, y1, x2, y2, n_sensors, width, height))
+        # Strip k covers columns [x1 + floor(k * w / n), x1 + floor((k + 1) * w / n))
+        bounds = [x1 + (k * (x2 - x1)) // n_sensors for k in range(n_sensors + 1)]
+        self.regions = []
+        counts = []
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            region_mask = None if mask is None else mask[y1:y2, a:b]
+            self.regions.append((slice(y1, y2), slice(a, b), region_mask))
+            counts.append((b - a) * (y2 - y1) if region_mask is None else int(region_mask.sum()))
+        self.counts = np.array(counts, dtype=np.float64)
+        if mask is None and n_sensors == 2:
+            self.counts[:] = (x2 - x1) * (y2 - y1) / 2.0    # width * height / 2, as the original divided both halves
+        self.cut_offs = self.counts / 2
+
+    def histograms(self, pixels):
+        image = luminance_array(pixels, self.width, self.height)
+        hist = np.empty((self.n_sensors, 256), dtype=np.int64)
+        for i, (rows, cols, region_mask) in enumerate(self.regions):
+            region = image[rows, cols]
+            values = region.ravel() if region_mask is None else region[region_mask]
+            hist[i] = np.bincount(values, minlength=256)
+        return hist
+
+    def read(self, pixels):
+        hist = self.histograms(pixels)
+        return SensorReading(histogram_means(hist, self.counts), histogram_medians(hist, self.cut_offs), hist)
+
+
+#-------------------------------------------------------------------------------------------------
+# Benchmark against the original per-pixel loop
+#-------------------------------------------------------------------------------------------------
+
+def _left_right_loop(pixels, width, height):
+    # Copy of the histogram branch of the original processFrame; returns (left_median, right_median)
+    left_hist = [0 for i in range(256)]
+    right_hist = [0 for i in range(256)]
+    for y in range(height):
+        for x in range(int(width/2)):
+            left_hist[pixels[x + y*width]] += 1
+        for x in range(int(width/2), width):
+            right_hist[pixels[x + y*width]] += 1
+    left_total, right_total = 0, 0
+    cut_off_value = width * height / 2 / 2
+    left_cut_off_point, right_cut_off_point = 0, 0
+    while (left_total < cut_off_value):
+        left_total += left_hist[left_cut_off_point]
+        left_cut_off_point += 1
+    while(right_total < cut_off_value):
+        right_total += right_hist[right_cut_off_point]
+        right_cut_off_point += 1
+    return left_cut_off_point / 255.0, right_cut_off_point / 255.0
+
+
+def benchmark(resolutions=((860, 480), (432, 240), (431, 241)), frames=20, seed=0):
+    rng = np.random.default_rng(seed)
+    for width, height in resolutions:
+        data = []
+        for _ in range(frames):
+            image = rng.normal(rng.uniform(20, 120), 25, (height, width))
+            x = int(rng.integers(0, width - 40))
+            image[:, x:x + 40] += 100   # a lit pillar
+            data.append(np.clip(image, 0, 255).astype(np.uint8).tobytes())
+        sensors = SensorArray(width, height, 2)
+        band = SensorArray(width, height, 5, roi=(0, height // 4, width, 3 * height // 4))
+        # A triangular mask, so the strips hold very different numbers of pixels:
+        wedge = SensorArray(width, height, 2, roi=np.tri(height, width, dtype=bool))
+
+        t0 = time.perf_counter()
+        legacy = [_left_right_loop(p, width, height) for p in data]
+        t1 = time.perf_counter()
+        vectorised = [tuple(sensors.read(p).medians) for p in data]
+        t2 = time.perf_counter()
+        for p in data:
+            band.read(p)
+        t3 = time.perf_counter()
+        mismatches = sum(a != b for a, b in zip(legacy, vectorised))
+        for p in data[:1] + [np.full(width * height, 200, dtype=np.uint8)]:
+            reading = wedge.read(p)
+            assert ((0 <= reading.means) & (reading.means <= 1) & (0 <= reading.medians) & (reading.medians <= 1)).all(), reading[:2]
+        print("%dx%d: loop %.1f ms/frame, numpy %.3f ms/frame, 5 sensors + ROI %.3f ms/frame, %d mismatches"
+              % (width, height, 1e3 * (t1 - t0) / frames, 1e3 * (t2 - t1) / frames, 1e3 * (t3 - t2) / frames,
+                 mismatches))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Per-frame cost of the Braitenberg sensor extraction")
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark(frames=args.frames, seed=args.seed)
@@ -38,6 +38,10 @@ import random
 import sys
 import time
 import malmoutils
+import video_frames
+# q_table.py is shared with the scripts in Python_Examples/, one directory up:
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from q_table import QTable
 
 if sys.version_info[0] == 2:
     # Workaround for https://github.com/PythonCharmers/python-future/issues/262
@@ -69,16 +73,22 @@ class TabQAgent(object):
         self.logger.addHandler(logging.StreamHandler(sys.stdout))
 
         self.actions = actions
-        self.q_table = {}
+        self.q_table = QTable(len(actions))
         self.canvas = canvas
         self.root = root
         
         self.rep = 0
 
     def loadModel(self, model_file):
-        """load q table from model_file"""
-        with open(model_file) as f:
-            self.q_table = json.load(f)
+        """load q table from model_file (a checkpoint directory or a legacy JSON model)"""
+        if os.path.isdir(model_file):
+            self.q_table = QTable.load_checkpoint(model_file)
+        else:
+            self.q_table = QTable.from_json_model(model_file)
+
+    def saveModel(self, checkpoint_dir):
+        """save q table as a checkpoint; only rows changed since the last save are written"""
+        return self.q_table.save_checkpoint(checkpoint_dir)
 
     def training(self):
         """switch to training mode"""
@@ -100,14 +110,11 @@ class TabQAgent(object):
             return 0
         current_s = "%d:%d" % (int(obs[u'XPos']), int(obs[u'ZPos']))
         self.logger.debug("State: %s (x = %.2f, z = %.2f)" % (current_s, float(obs[u'XPos']), float(obs[u'ZPos'])))
-        if current_s not in self.q_table:
-            self.q_table[current_s] = ([0] * len(self.actions))
+        self.q_table.state_id(current_s)
 
         # update Q values
         if self.training and self.prev_s is not None and self.prev_a is not None:
-            old_q = self.q_table[self.prev_s][self.prev_a]
-            self.q_table[self.prev_s][self.prev_a] = old_q + self.alpha * (current_r
-                + self.gamma * max(self.q_table[current_s]) - old_q)
+            self.q_table.update(self.prev_s, self.prev_a, current_r, current_s, self.alpha, self.gamma)
 
         self.drawQ( curr_x = int(obs[u'XPos']), curr_y = int(obs[u'ZPos']) )
 
@@ -117,11 +124,12 @@ class TabQAgent(object):
             a = random.randint(0, len(self.actions) - 1)
             self.logger.info("Random action: %s" % self.actions[a])
         else:
-            m = max(self.q_table[current_s])
-            self.logger.debug("Current values: %s" % ",".join(str(x) for x in self.q_table[current_s]))
+            q_values = self.q_table.q_values(current_s)
+            m = max(q_values)
+            self.logger.debug("Current values: %s" % ",".join(str(x) for x in q_values))
             l = list()
             for x in range(0, len(self.actions)):
-                if self.q_table[current_s][x] == m:
+                if q_values[x] == m:
                     l.append(x)
             y = random.randint(0, len(l)-1)
             a = l[y]
@@ -169,7 +177,7 @@ class TabQAgent(object):
         if save_images:
             # save the frame, for debugging
             frame = world_state.video_frames[-1]
-            image = Image.frombytes('RGB', (frame.width, frame.height), bytes(frame.pixels) )
+            image = Image.fromarray(video_frames.frame_view(frame), 'RGB')
             iFrame = 0
             self.rep = self.rep + 1
             image.save( 'rep_' + str(self.rep).zfill(3) + '_saved_frame_' + str(iFrame).zfill(4) + '.png' )
@@ -218,7 +226,7 @@ class TabQAgent(object):
                 if world_state.is_mission_running:
                     assert len(world_state.video_frames) > 0, 'No video frames!?'
                     frame = world_state.video_frames[-1]
-                    image = Image.frombytes('RGB', (frame.width, frame.height), bytes(frame.pixels) )
+                    image = Image.fromarray(video_frames.frame_view(frame), 'RGB')
                     iFrame = iFrame + 1
                     image.save( 'rep_' + str(self.rep).zfill(3) + '_saved_frame_' + str(iFrame).zfill(4) + '_after_' + self.actions[self.prev_a] + '.png' )
                 
@@ -260,8 +268,7 @@ class TabQAgent(object):
 
         # update Q values
         if self.training and self.prev_s is not None and self.prev_a is not None:
-            old_q = self.q_table[self.prev_s][self.prev_a]
-            self.q_table[self.prev_s][self.prev_a] = old_q + self.alpha * ( current_r - old_q )
+            self.q_table.update(self.prev_s, self.prev_a, current_r, None, self.alpha, self.gamma, terminal=True)
             
         self.drawQ()
     
@@ -285,7 +292,7 @@ class TabQAgent(object):
                 for action in range(4):
                     if not s in self.q_table:
                         continue
-                    value = self.q_table[s][action]
+                    value = self.q_table.get(s, action)
                     color = int( 255 * ( value - min_value ) / ( max_value - min_value )) # map value to 0-255
                     color = max( min( color, 255 ), 0 ) # ensure within [0,255]
                     color_string = '#%02x%02x%02x' % (255-color, color, 0)
@@ -330,7 +337,9 @@ agent_host.addOptionalFloatArgument('epsilon',
     'Exploration rate of the Q-learning agent.', 0.01)
 agent_host.addOptionalFloatArgument('gamma', 'Discount factor.', 1.0)
 agent_host.addOptionalFlag('load_model', 'Load initial model from model_file.')
-agent_host.addOptionalStringArgument('model_file', 'Path to the initial model file', '')
+agent_host.addOptionalStringArgument('model_file', 'Path to the initial model file (checkpoint directory or JSON)', '')
+agent_host.addOptionalStringArgument('checkpoint', 'Directory for periodic Q-table checkpoints (one per map).', '')
+agent_host.addOptionalIntArgument('checkpoint_every', 'Save a checkpoint every N missions.', 10)
 agent_host.addOptionalFlag('debug', 'Turn on debugging.')
 
 malmoutils.parse_command_line(agent_host)
@@ -363,6 +372,12 @@ for imap in range(num_maps):
         debug = agent_host.receivedArgument("debug"),
         canvas = canvas,
         root = root)
+    if agent_host.receivedArgument("load_model"):
+        agent.loadModel(agent_host.getStringArgument('model_file'))
+    checkpoint_dir = agent_host.getStringArgument('checkpoint')
+    if checkpoint_dir:
+        checkpoint_dir = os.path.join(checkpoint_dir, "map%d" % imap)
+    checkpoint_every = max(1, agent_host.getIntArgument('checkpoint_every'))
 
     # -- set up the mission -- #
     mission_file = agent_host.getStringArgument('mission_file')
@@ -419,6 +434,9 @@ for imap in range(num_maps):
         cumulative_reward = agent.run(agent_host)
         print('Cumulative reward: %d' % cumulative_reward)
         cumulative_rewards += [ cumulative_reward ]
+        if checkpoint_dir and ((i + 1) % checkpoint_every == 0 or i + 1 == num_repeats):
+            rows = agent.saveModel(checkpoint_dir)
+            print('Checkpoint saved to %s (%d rows written)' % (checkpoint_dir, rows))
 
         # -- clean up -- #
         time.sleep(0.5) # (let the Mod reset)
@@ -0,0 +1,684 @@
+# Route optimisation core for tsp_race.py
+#
+# Cities are given as coordinate arrays and the distance matrix is computed once
+# with NumPy. Routes are integer index arrays: open paths that always start at
+# city 0 (the agents' fixed start point) and never return to it.
+# Internally the annealer works on a Python list with a zero-cost dummy city
+# appended, so every move has a fixed predecessor and successor. The change in
+# length of a relocate, 2-opt or Or-opt move is then a handful of matrix lookups,
+# and only accepted moves touch the route.
+# The genetic algorithm keeps its population as a (k, n) integer array, so a
+# generation's route lengths are one gather-and-sum over the distance matrix, and
+# order crossover is done for all pairs at once with boolean masks.
+# The MST route comes from dense Prim's algorithm (no edge list at all) or, for
+# large n, Kruskal over a k-nearest-neighbour graph.
+# Divide-and-conquer solves its small clusters exactly with Held-Karp dynamic
+# programming over bitmask states, after a vectorised k-means split.
+
+from functools import lru_cache
+import math
+import time
+
+import numpy as np
+
+
+def coordinates(points):
+    '''(xs, ys) float arrays for objects with .x and .y (eg tsp_race.point_node).'''
+    return (np.array([p.x for p in points], dtype=np.float64),
+            np.array([p.y for p in points], dtype=np.float64))
+
+
+def distance_matrix(xs, ys):
+    '''
+    Pairwise distances between cities. tsp_race measures |dx| + |dy| (its
+    distance lambda is sqrt(dx*dx) + sqrt(dy*dy)), so this does too.
+    '''
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    return np.abs(xs[:, None] - xs[None, :]) + np.abs(ys[:, None] - ys[None, :])
+
+
+def route_length(dist, route):
+    '''Length of the open path visiting `route` in order.'''
+    route = np.asarray(route)
+    if len(route) < 2:
+        return 0.0
+    return float(dist[route[:-1], route[1:]].sum())
+
+
+def _with_dummy(dist):
+    # Add a city at zero distance from every other one, to sit at the end of the route
+    n = len(dist)
+    padded = np.zeros((n + 1, n + 1), dtype=np.float64)
+    padded[:n, :n] = dist
+    return padded.tolist()
+
+
+def anneal(dist, route=None, initial_temperature=None, alpha=0.9, final_temperature=0.25,
+           moves_per_temperature=None, two_opt_fraction=0.5, rng=None, log=None):
+    '''
+    Simulated annealing over open paths that start at city 0. Uses the same
+    schedule as tsp_race's original version: start at sqrt(n), then
+    10 * alpha**t until the temperature drops below final_temperature.
+    Each temperature tries moves_per_temperature random moves
+    (default min(n * n, 50 * n), which is n * n for up to 50 cities). A move is
+    either a 2-opt reversal or an Or-opt move: a segment of 1-3 cities is moved
+    elsewhere, possibly reversed (a plain relocate when the segment is one
+    city). Returns the route as an index array.
+    '''
+    n = len(dist)
+    rng = np.random.default_rng() if rng is None else rng
+    tour = list(range(n)) if route is None else [int(c) for c in route]
+    if n < 3:
+        return np.array(tour, dtype=np.intp)
+    if tour[0] != 0 or sorted(tour) != list(range(n)):
+        raise ValueError("route must be a permutation of the cities starting at city 0")
+    d = _with_dummy(dist)
+    tour.append(n)     # the dummy city
+    if moves_per_temperature is None:
+        moves_per_temperature = min(n * n, 50 * n)
+    length = route_length(dist, tour[:-1])
+    temperature = math.sqrt(n) if initial_temperature is None else initial_temperature
+    t = 0
+    while temperature > final_temperature:
+        m = moves_per_temperature
+        two_opt = (rng.random(m) < two_opt_fraction).tolist()
+        first = rng.integers(1, n, m).tolist()
+        second = rng.integers(0, n, m).tolist()
+        segment = rng.integers(1, 4, m).tolist()
+        reverse = (rng.random(m) < 0.5).tolist()
+        threshold = (-temperature * np.log1p(-rng.random(m))).tolist()     # accept if change < T * -ln(u)
+        kept_bad = 0
+        for k in range(m):
+            i = first[k]
+            if two_opt[k]:
+                j = second[k]
+                if j < i:
+                    i, j = j, i
+                if i == 0 or i == j:
+                    continue
+                p, s, e, q = tour[i - 1], tour[i], tour[j], tour[j + 1]
+                change = d[p][e] + d[s][q] - d[p][s] - d[e][q]
+                if change > 0:
+                    if change >= threshold[k]:
+                        continue
+                    kept_bad += 1
+                tour[i:j + 1] = tour[i:j + 1][::-1]
+            else:
+                seg_len = min(segment[k], n - i)
+                c = second[k]      # insert after this position
+                if i - 1 <= c <= i + seg_len - 1:
+                    continue
+                p, s, e, q = tour[i - 1], tour[i], tour[i + seg_len - 1], tour[i + seg_len]
+                a, b = tour[c], tour[c + 1]
+                if reverse[k]:
+                    added = d[p][q] + d[a][e] + d[s][b]
+                else:
+                    added = d[p][q] + d[a][s] + d[e][b]
+                change = added - d[p][s] - d[e][q] - d[a][b]
+                if change > 0:
+                    if change >= threshold[k]:
+                        continue
+                    kept_bad += 1
+                moved = tour[i:i + seg_len]
+                if reverse[k]:
+                    moved.reverse()
+                if c < i:
+                    tour[c + 1:i + seg_len] = moved + tour[c + 1:i]
+                else:
+                    tour[i:c + 1] = tour[i + seg_len:c + 1] + moved
+            length += change
+        length = route_length(dist, tour[:-1])     # drop accumulated rounding
+        if log is not None:
+            log("Temp: %s length: %s bad moves kept: %d" % (temperature, length, kept_bad))
+        t += 1
+        temperature = 10 * (alpha ** t)
+    return np.array(tour[:-1], dtype=np.intp)
+
+
+def route_lengths(dist, population):
+    '''Lengths of every route in a (k, n) population, in one gather-and-sum.'''
+    population = np.asarray(population)
+    return dist[population[:, :-1], population[:, 1:]].sum(axis=1)
+
+
+_fitness_worker = {}
+
+
+def _init_fitness_worker(dist):
+    _fitness_worker["dist"] = dist
+
+
+def _worker_route_lengths(population):
+    return route_lengths(_fitness_worker["dist"], population)
+
+
+def order_crossover(donors, others, left, right):
+    '''
+    tsp_race's crossover for a batch of parent pairs: each child keeps
+    donor[left:right] in place and fills the remaining positions with the other
+    parent's cities in their original order. Uses boolean masks, not membership tests.
+    '''
+    m, n = donors.shape
+    positions = np.arange(n)
+    segment = (positions >= left[:, None]) & (positions < right[:, None])
+    rows, cols = np.nonzero(segment)
+    taken = np.zeros((m, n), dtype=bool)       # by city: is it in the donor's segment?
+    taken[rows, donors[rows, cols]] = True
+    keep = ~taken[np.arange(m)[:, None], others]
+    children = np.empty_like(donors)
+    children[segment] = donors[segment]
+    children[~segment] = others[keep]          # row-major: each row has n - (right - left) of both
+    return children
+
+
+def genetic(dist, k=20, iters=3000, mutation_probability=0.7, crossover_probability=0.9, rng=None,
+            progress_callback=None, log=None, workers=0):
+    '''
+    tsp_race's genetic algorithm on a (k, n) integer population: tournament
+    selection (tournaments of 2 * ceil(sqrt(k)), drawn with replacement), order
+    crossover with probability random() * crossover_probability per pair, and a
+    swap mutation with probability random() * mutation_probability per child.
+    City 0 stays first throughout. With workers > 1 the route lengths of each
+    generation are computed in a process pool, which only pays off for large k.
+    Returns the best route of the last generation as an index array.
+    '''
+    n = len(dist)
+    rng = np.random.default_rng() if rng is None else rng
+    population = np.tile(np.arange(n), (k, 1))
+    if n < 3:
+        return population[0].copy()
+    population[:, 1:] = rng.permuted(population[:, 1:], axis=1)
+    tournament_size = int(2 * math.ceil(math.sqrt(k)))
+    pairs = int(math.ceil(k / 2.0))
+
+    pool = None
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_fitness_worker, initargs=(dist,))
+        chunks = workers
+        evaluate = lambda pop: np.concatenate(list(pool.map(_worker_route_lengths, np.array_split(pop, chunks))))
+    else:
+        evaluate = lambda pop: route_lengths(dist, pop)
+    try:
+        lengths = evaluate(population)
+        for it in range(iters):
+            if progress_callback is not None:
+                progress_callback(100 * float(it) / float(iters))
+            # Tournament selection: the shortest route of each tournament wins
+            entrants = rng.integers(0, k, (2, pairs, tournament_size))
+            winners = np.take_along_axis(entrants, np.argmin(lengths[entrants], axis=2)[:, :, None], axis=2)[:, :, 0]
+            parent1, parent2 = population[winners[0]], population[winners[1]]
+
+            # Crossover on a random left < right, leaving the other pairs unchanged
+            cross = rng.random(pairs) <= rng.random(pairs) * crossover_probability
+            left = rng.integers(0, n, pairs)
+            right = (left + rng.integers(1, n, pairs)) % n
+            left, right = np.minimum(left, right), np.maximum(left, right)
+            child1, child2 = parent1.copy(), parent2.copy()
+            if cross.any():
+                c = np.flatnonzero(cross)
+                child1[c] = order_crossover(parent2[c], parent1[c], left[c], right[c])
+                child2[c] = order_crossover(parent1[c], parent2[c], left[c], right[c])
+
+            # Swap mutation (never touching the start city); both children share a pair's probability
+            children = np.concatenate((child1, child2))[:k]
+            p_mutation = np.tile(rng.random(pairs) * mutation_probability, 2)[:k]
+            mutate = np.flatnonzero(rng.random(k) < p_mutation)
+            ma = rng.integers(1, n, len(mutate))
+            mb = rng.integers(1, n, len(mutate))
+            children[mutate, ma], children[mutate, mb] = children[mutate, mb], children[mutate, ma]
+
+            population = children
+            lengths = evaluate(population)
+            if log is not None:
+                log("Gen %d : best path = %s" % (it, lengths.min()))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return population[int(np.argmin(lengths))].copy()
+
+
+def _squared_distances_from(xs, ys, i):
+    return (xs - xs[i]) ** 2 + (ys - ys[i]) ** 2
+
+
+def prim_mst(xs, ys):
+    '''
+    Minimum spanning tree by dense Prim's algorithm: O(n^2) time, and only O(n)
+    memory because each new vertex's distances are computed as it joins.
+    Edges are weighted by squared Euclidean length, like tsp_race's original
+    Kruskal (the tree is the same as for Euclidean length).
+    Returns (u, v, w) arrays of the n - 1 edges.
+    '''
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    n = len(xs)
+    in_tree = np.zeros(n, dtype=bool)
+    best = np.full(n, np.inf)
+    parent = np.zeros(n, dtype=np.intp)
+    u = np.empty(max(n - 1, 0), dtype=np.intp)
+    v = np.empty(max(n - 1, 0), dtype=np.intp)
+    w = np.empty(max(n - 1, 0), dtype=np.float64)
+    current = 0
+    for e in range(n - 1):
+        in_tree[current] = True
+        d = _squared_distances_from(xs, ys, current)
+        closer = ~in_tree & (d < best)
+        best[closer] = d[closer]
+        parent[closer] = current
+        best[current] = np.inf
+        current = int(np.argmin(np.where(in_tree, np.inf, best)))
+        u[e], v[e], w[e] = parent[current], current, best[current]
+    return u, v, w
+
+
+def knn_edges(xs, ys, k=8):
+    '''
+    Edges from every city to its k nearest neighbours, weighted by squared
+    Euclidean length, without duplicates. The cities are bucketed into a grid of
+    cells holding about k + 1 cities each, and each cell's cities are compared
+    only with the cities in the surrounding ring of cells, which is widened
+    until it is guaranteed to contain their k nearest.
+    '''
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    n = len(xs)
+    k = min(k, n - 1)
+    x0, y0 = xs.min(), ys.min()
+    extent = max(xs.max() - x0, ys.max() - y0, 1e-9)
+    cell = extent * math.sqrt((k + 1) / float(n))
+    columns = int(extent / cell) + 1
+    cx = ((xs - x0) / cell).astype(np.intp)
+    cy = ((ys - y0) / cell).astype(np.intp)
+    keys = cx * columns + cy
+    by_cell = np.argsort(keys, kind="stable")
+    sorted_keys = keys[by_cell]
+    occupied, starts = np.unique(sorted_keys, return_index=True)
+    stops = np.append(starts[1:], n)
+
+    u = np.empty(n * k, dtype=np.intp)
+    v = np.empty(n * k, dtype=np.intp)
+    filled = 0
+    for key, start, stop in zip(occupied.tolist(), starts.tolist(), stops.tolist()):
+        members = by_cell[start:stop]
+        col, row = divmod(key, columns)
+        ring = 1
+        while True:
+            # Cells (col + dc, row - ring .. row + ring) are contiguous in key order
+            lo = [(col + dc) * columns + max(row - ring, 0) for dc in range(-ring, ring + 1) if 0 <= col + dc < columns]
+            hi = [(col + dc) * columns + min(row + ring, columns - 1) + 1 for dc in range(-ring, ring + 1) if 0 <= col + dc < columns]
+            bounds = zip(np.searchsorted(sorted_keys, lo).tolist(), np.searchsorted(sorted_keys, hi).tolist())
+            candidates = np.concatenate([by_cell[a:b] for a, b in bounds])
+            if len(candidates) > k:
+                d = (xs[members, None] - xs[candidates]) ** 2 + (ys[members, None] - ys[candidates]) ** 2
+                d[members[:, None] == candidates] = np.inf
+                nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+                kth = np.take_along_axis(d, nearest, axis=1).max()
+                # Anything closer than ring * cell is inside the ring, so these are the true k nearest:
+                if kth <= (ring * cell) ** 2 or ring >= columns:
+                    break
+            ring += 1
+        count = len(members) * k
+        u[filled:filled + count] = np.repeat(members, k)
+        v[filled:filled + count] = candidates[nearest].ravel()
+        filled += count
+    a, b = np.minimum(u, v), np.maximum(u, v)
+    pairs = np.unique(a * n + b)
+    u, v = pairs // n, pairs % n
+    w = (xs[u] - xs[v]) ** 2 + (ys[u] - ys[v]) ** 2
+    return u, v, w
+
+
+def _find(parent, a):
+    # Iterative find with path halving
+    while parent[a] != a:
+        parent[a] = parent[parent[a]]
+        a = parent[a]
+    return a
+
+
+def kruskal(n, u, v, w):
+    '''
+    Minimum spanning forest of a sparse graph: edges sorted once with NumPy, then
+    union-find with union by rank on int arrays. Returns (u, v, w) of the chosen edges.
+    '''
+    order = np.argsort(w, kind="stable")
+    parent = list(range(n))
+    rank = [0] * n
+    chosen = []
+    for e, a, b in zip(order.tolist(), u[order].tolist(), v[order].tolist()):
+        ra, rb = _find(parent, a), _find(parent, b)
+        if ra == rb:
+            continue
+        if rank[ra] < rank[rb]:
+            ra, rb = rb, ra
+        parent[rb] = ra
+        if rank[ra] == rank[rb]:
+            rank[ra] += 1
+        chosen.append(e)
+        if len(chosen) == n - 1:
+            break
+    chosen = np.array(chosen, dtype=np.intp)
+    return u[chosen], v[chosen], w[chosen]
+
+
+def preorder(n, u, v, w, start=0):
+    '''
+    Depth-first walk of a tree, as tsp_race's original MST route: a stack
+    starting at `start`, with each city's neighbours pushed shortest edge first
+    (the order Kruskal adds them in), so the longest branch is walked first.
+    '''
+    ends = np.concatenate((u, v))
+    others = np.concatenate((v, u))
+    lengths = np.concatenate((w, w))
+    order = np.lexsort((lengths, ends))
+    neighbours = others[order].tolist()
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(ends, minlength=n)))).tolist()
+    visited = [False] * n
+    route = []
+    stack = [start]
+    while stack:
+        city = stack.pop()
+        visited[city] = True
+        route.append(city)
+        for neighbour in neighbours[offsets[city]:offsets[city + 1]]:
+            if not visited[neighbour]:
+                stack.append(neighbour)
+    return np.array(route, dtype=np.intp)
+
+
+KNN_THRESHOLD = 2000
+
+
+def mst_route(xs, ys, mode="auto", k=8):
+    '''
+    Route from a preorder walk of the minimum spanning tree, starting at city 0.
+    mode "dense" uses Prim's algorithm, "knn" Kruskal on a k-nearest-neighbour
+    graph (k is doubled until that graph is connected), and "auto" picks knn
+    above KNN_THRESHOLD cities.
+    '''
+    n = len(xs)
+    if n < 2:
+        return np.arange(n)
+    if mode == "auto":
+        mode = "knn" if n > KNN_THRESHOLD else "dense"
+    if mode == "dense":
+        u, v, w = prim_mst(xs, ys)
+    elif mode == "knn":
+        while True:
+            u, v, w = kruskal(n, *knn_edges(xs, ys, k))
+            if len(u) == n - 1:
+                break
+            k *= 2
+    else:
+        raise ValueError("Unknown MST mode: %s" % mode)
+    return preorder(n, u, v, w)
+
+
+def squared_distance_matrix(xs, ys):
+    '''Pairwise squared Euclidean distances (what tsp_race's brute force minimised).'''
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    return (xs[:, None] - xs[None, :]) ** 2 + (ys[:, None] - ys[None, :]) ** 2
+
+
+@lru_cache(maxsize=None)
+def _held_karp_layers(n):
+    # For each subset size s >= 2: the masks with s bits, and for each (mask, last city k)
+    # the mask without k, plus whether k is in the mask at all. Built once per n.
+    masks = np.arange(1 << n)
+    bits = (masks[:, None] >> np.arange(n)) & 1
+    sizes = bits.sum(axis=1)
+    layers = []
+    for size in range(2, n + 1):
+        layer = masks[sizes == size]
+        layers.append((layer, layer[:, None] ^ (1 << np.arange(n)), bits[layer].astype(bool)))
+    return layers
+
+
+def held_karp(dist, start=None):
+    '''
+    Shortest open path through every city, by Held-Karp dynamic programming:
+    best[mask, k] is the cheapest path visiting the cities in mask and ending
+    at k. Each subset size is one vectorised step. O(2^n n^2) time, so fine up
+    to 12 or so cities. The path starts anywhere unless `start` is given.
+    '''
+    dist = np.asarray(dist, dtype=np.float64)
+    n = len(dist)
+    if n <= 2:
+        order = np.arange(n)
+        return order if start is None or start == 0 else order[::-1].copy()
+    best = np.full((1 << n, n), np.inf)
+    previous = np.zeros((1 << n, n), dtype=np.intp)
+    firsts = range(n) if start is None else [start]
+    for k in firsts:
+        best[1 << k, k] = 0.0
+    for layer, without, members in _held_karp_layers(n):
+        # cost[m, k, j]: reach the cities of layer[m] except k, ending at j, then go on to k
+        cost = best[without] + dist.T[None, :, :]
+        j = np.argmin(cost, axis=2)
+        value = np.take_along_axis(cost, j[:, :, None], axis=2)[:, :, 0]
+        best[layer] = np.where(members, value, np.inf)
+        previous[layer] = j
+    mask = (1 << n) - 1
+    city = int(np.argmin(best[mask]))
+    order = []
+    while mask:
+        order.append(city)
+        mask, city = mask ^ (1 << city), int(previous[mask, city])
+    return np.array(order[::-1], dtype=np.intp)
+
+
+def kmeans(xs, ys, k, rng=None):
+    '''
+    tsp_race's k-means: random initial clusters, centroids moved to their
+    cluster means (an empty cluster gets a random integer position inside the
+    bounding box), points reassigned to the nearest centroid by |dx| + |dy|
+    (ties to the lowest index) until nothing changes.
+    Returns (labels, centroid xs, centroid ys).
+    '''
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    rng = np.random.default_rng() if rng is None else rng
+    labels = rng.integers(0, k, len(xs))
+    low = (int(math.floor(xs.min())), int(math.floor(ys.min())))
+    high = (int(math.floor(xs.max())), int(math.floor(ys.max())))
+    while True:
+        counts = np.bincount(labels, minlength=k)
+        empty = counts == 0
+        with np.errstate(invalid="ignore"):
+            cx = np.bincount(labels, xs, minlength=k) / counts
+            cy = np.bincount(labels, ys, minlength=k) / counts
+        cx[empty] = rng.integers(low[0], high[0] + 1, np.count_nonzero(empty))
+        cy[empty] = rng.integers(low[1], high[1] + 1, np.count_nonzero(empty))
+        new_labels = np.argmin(np.abs(xs[:, None] - cx[None, :]) + np.abs(ys[:, None] - cy[None, :]), axis=1)
+        if (new_labels == labels).all():
+            return labels, cx, cy
+        labels = new_labels
+
+
+#-------------------------------------------------------------------------------------------------
+# Benchmarks against the original point_node + path_length implementations
+#-------------------------------------------------------------------------------------------------
+
+class _Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+def _legacy_annealing(input_points, rnd):
+    # Copy of the original get_simulated_annealing_route (without the printing)
+    distance = lambda p1, p2: math.sqrt((p1.x - p2.x) * (p1.x - p2.x)) + math.sqrt((p1.y - p2.y) * (p1.y - p2.y))
+
+    def path_length(points):
+        tot_dist = 0
+        p_old = points[0]
+        for p_new in points:
+            tot_dist += distance(p_new, p_old)
+            p_old = p_new
+        return tot_dist
+
+    points = list(input_points)
+    temperature = math.sqrt(len(input_points))
+    t = 0
+    alpha = 0.9
+    while temperature > 0.25:
+        dist_before = path_length(points)
+        for i in range(len(points)*len(points)):
+            i_from = rnd.randint(1, len(points)-1)
+            p = points.pop(i_from)
+            i_to = rnd.randint(1, len(points))
+            points.insert(i_to, p)
+            dist_after = path_length(points)
+            delta = dist_before - dist_after
+            if delta < 0 and rnd.random() > math.exp(delta / temperature):
+                points.pop(i_to)
+                points.insert(i_from, p)
+            else:
+                dist_before = dist_after
+        t += 1
+        temperature = 10 * (alpha**t)
+    return points
+
+
+def _legacy_genetic(points, k, iters, mutation_probability, crossover_probability, rnd):
+    # Copy of the original get_genetic_algorithm_route (tournament selection, without the printing)
+    def path_length(route):
+        tot_dist = 0
+        p_old = route[0]
+        for p_new in route:
+            tot_dist += abs(p_new.x - p_old.x) + abs(p_new.y - p_old.y)
+            p_old = p_new
+        return tot_dist
+
+    generation = []
+    tournament_size = int(2 * math.ceil(math.sqrt(k)))
+    for i in range(k):
+        sample = list(points)
+        for j in range(1, len(sample)):
+            ind = rnd.randint(j, len(sample) - 1)
+            (sample[j], sample[ind]) = (sample[ind], sample[j])
+        generation.append((sample, 1.0 / path_length(sample)))
+    for it in range(iters):
+        next_gen = []
+        for i in range(int(math.ceil(float(k) / 2.0))):
+            parent1 = max([rnd.choice(generation) for t in range(tournament_size)], key=lambda p: p[1])[0]
+            parent2 = max([rnd.choice(generation) for t in range(tournament_size)], key=lambda p: p[1])[0]
+            p_crossover = rnd.random() * crossover_probability
+            if rnd.random() <= p_crossover:
+                left = rnd.randint(0, len(points)-1)
+                right = left
+                while (right == left):
+                    right = rnd.randint(0, len(points)-1)
+                if left > right:
+                    (left, right) = (right, left)
+                subsection1 = parent1[left:right]
+                subsection2 = parent2[left:right]
+                remainder1 = [s for s in parent2 if not s in subsection1]
+                remainder2 = [s for s in parent1 if not s in subsection2]
+                child1 = remainder2[:left] + subsection2 + remainder2[left:]
+                child2 = remainder1[:left] + subsection1 + remainder1[left:]
+            else:
+                child1 = list(parent1)
+                child2 = list(parent2)
+            p_mutation = rnd.random() * mutation_probability
+            if rnd.random() < p_mutation:
+                ma = rnd.randint(1, len(child1)-1)
+                mb = rnd.randint(1, len(child1)-1)
+                (child1[ma], child1[mb]) = (child1[mb], child1[ma])
+            if rnd.random() < p_mutation:
+                ma = rnd.randint(1, len(child2)-1)
+                mb = rnd.randint(1, len(child2)-1)
+                (child2[ma], child2[mb]) = (child2[mb], child2[ma])
+            next_gen.append((child1, 1.0 / path_length(child1)))
+            if len(next_gen) < k:
+                next_gen.append((child2, 1.0 / path_length(child2)))
+        generation = list(next_gen)
+    return max(generation, key=lambda p: p[1])[0]
+
+
+def random_cities(n, rng):
+    '''City 0 at the centre, the rest on the integer grid [-50, 50] like tsp_race.'''
+    xs = np.concatenate(([0], rng.integers(-50, 51, n - 1))).astype(np.float64)
+    ys = np.concatenate(([0], rng.integers(-50, 51, n - 1))).astype(np.float64)
+    return xs, ys
+
+
+def benchmark_annealing(sizes=(50, 200, 400), legacy_limit=50, seed=0):
+    import random
+    rng = np.random.default_rng(seed)
+    for n in sizes:
+        xs, ys = random_cities(n, rng)
+        t0 = time.perf_counter()
+        dist = distance_matrix(xs, ys)
+        route = anneal(dist, rng=rng)
+        t1 = time.perf_counter()
+        assert route[0] == 0 and sorted(route.tolist()) == list(range(n))
+        line = "%4d cities: anneal %.2f s, length %.0f" % (n, t1 - t0, route_length(dist, route))
+        if n <= legacy_limit:
+            cities = [_Point(x, y) for x, y in zip(xs, ys)]
+            t0 = time.perf_counter()
+            legacy = _legacy_annealing(cities, random.Random(seed))
+            t1 = time.perf_counter()
+            order = [cities.index(p) for p in legacy]
+            line += "; original %.2f s, length %.0f" % (t1 - t0, route_length(dist, order))
+        print(line)
+
+
+def benchmark_genetic(sizes=(50, 200), populations=(20, 200), iters=300, legacy_limit=50, workers=0, seed=0):
+    import random
+    rng = np.random.default_rng(seed)
+    for n in sizes:
+        xs, ys = random_cities(n, rng)
+        dist = distance_matrix(xs, ys)
+        cities = [_Point(x, y) for x, y in zip(xs, ys)]
+        for k in populations:
+            t0 = time.perf_counter()
+            route = genetic(dist, k, iters, rng=rng, workers=workers)
+            t1 = time.perf_counter()
+            assert route[0] == 0 and sorted(route.tolist()) == list(range(n))
+            line = "%4d cities, k=%4d, %d generations: numpy %.2f s, length %.0f" % (
+                n, k, iters, t1 - t0, route_length(dist, route))
+            if n <= legacy_limit:
+                t0 = time.perf_counter()
+                legacy = _legacy_genetic(cities, k, iters, 0.7, 0.9, random.Random(seed))
+                t1 = time.perf_counter()
+                order = [cities.index(p) for p in legacy]
+                line += "; original %.2f s, length %.0f" % (t1 - t0, route_length(dist, order))
+            print(line)
+
+
+
+def benchmark_mst(sizes=(1000, 5000, 20000), dense_limit=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    for n in sizes:
+        xs, ys = rng.uniform(-50, 50, n), rng.uniform(-50, 50, n)
+        t0 = time.perf_counter()
+        route = mst_route(xs, ys, "knn")
+        t1 = time.perf_counter()
+        line = "%6d cities: knn %.2f s" % (n, t1 - t0)
+        if n <= dense_limit:
+            dense = mst_route(xs, ys, "dense")
+            t2 = time.perf_counter()
+            line += ", dense %.2f s, same route: %s" % (t2 - t1, bool((dense == route).all()))
+        print(line)
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Route quality and time of the tsp_race solvers against the originals")
+    parser.add_argument('solver', choices=['anneal', 'genetic', 'mst'])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 400])
+    parser.add_argument('--populations', type=int, nargs='+', default=[20, 200], help="genetic: population sizes")
+    parser.add_argument('--iters', type=int, default=300, help="genetic: generations")
+    parser.add_argument('--workers', type=int, default=0, help="genetic: fitness worker processes")
+    parser.add_argument('--legacy_limit', type=int, default=50, help="also run the original solver up to this many cities")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if args.solver == 'anneal':
+        benchmark_annealing(args.sizes, args.legacy_limit, args.seed)
+    elif args.solver == 'mst':
+        benchmark_mst(args.sizes, seed=args.seed)
+    else:
+        benchmark_genetic(args.sizes, args.populations, args.iters, args.legacy_limit, args.workers, args.seed)
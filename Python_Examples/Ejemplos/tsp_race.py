@@ -44,6 +44,10 @@ import json
 import random
 import math
 import threading
+# mission_launcher.py is shared with the scripts in Python_Examples/, one directory up:
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import mission_launcher
+import tsp_core
 
 if sys.version_info[0] == 2:
     # Workaround for https://github.com/PythonCharmers/python-future/issues/262
@@ -67,7 +71,7 @@ class point_node(object):
     def add_neighbour(self, neighbour):
         self.neighbours.append(neighbour)
 
-distance = lambda p1, p2: math.sqrt((p1.x - p2.x) * (p1.x - p2.x)) + math.sqrt((p1.y - p2.y) * (p1.y - p2.y))
+distance = lambda p1, p2: abs(p1.x - p2.x) + abs(p1.y - p2.y)
 
 def path_length(points):
     tot_dist = 0
@@ -81,32 +85,6 @@ def path_length(points):
 # Code to support Minimum Spanning Tree approach
 ###################################################################################################################
 
-class disjoint_set_forest_node(object):
-    def __init__(self, data=None, parent=None):
-        self.data = data
-        self.parent = parent
-
-    def get_data(self):
-        return self.data
-
-    def get_parent(self):
-        return self.parent
-
-    def set_parent(self, parent):
-        self.parent = parent
-
-    def get_root(self):
-        if self.parent == None:
-            return self
-        self.parent = self.parent.get_root()
-        return self.parent
-
-    def combine_sets(self, new_node):
-        root_node_a = self.get_root()
-        root_node_b = new_node.get_root()
-        if root_node_a != root_node_b:
-            root_node_b.set_parent(root_node_a)
-
 class edge(object):
     def __init__(self, point1, point2):
         self.point1 = point1
@@ -116,196 +94,38 @@ class edge(object):
     def get_squared_length(self):
         return self.squared_length
 
-def merge_sort_edges(edges):
-    if len(edges) > 1:
-        m = len(edges) // 2
-        left = edges[:m]
-        right = edges[m:]
-
-        merge_sort_edges(left)
-        merge_sort_edges(right)
-
-        l = 0
-        r = 0
-        i = 0
-        while l < len(left) and r < len(right):
-            if left[l].get_squared_length() < right[r].get_squared_length():
-                edges[i] = left[l]
-                l += 1
-            else:
-                edges[i] = right[r]
-                r += 1
-            i += 1
-        while l < len(left):
-            edges[i] = left[l]
-            l += 1
-            i += 1
-        while r < len(right):
-            edges[i] = right[r]
-            r += 1
-            i += 1
-
-def min_span_tree(edges, points):
-    # Build a MST using Kruskal's algorithm.
-    # Make each point the start of a disjoint set forest:
-    for p in points:
-        p.disjoint_set_forest_node = disjoint_set_forest_node()
-    # Sort the edges from shortest to longest:
-    merge_sort_edges(edges)
-    # Build the tree:
-    tree=[]
-    i = 0
-    finished = False
-    while not finished and i < len(edges):
-        e = edges[i]
-        i += 1
-        if e.point1.disjoint_set_forest_node.get_root() != e.point2.disjoint_set_forest_node.get_root():
-            # This edge will connect two different trees, so add it to the MST:
-            tree.append(e)
-            e.point1.disjoint_set_forest_node.combine_sets(e.point2.disjoint_set_forest_node)
-            e.point1.add_neighbour(e.point2)
-            e.point2.add_neighbour(e.point1)
-
-    return tree
-
 def get_MST_route(points):
-    # Create a rough approximation of the optimal TSP route using a depth-first search on the minimum spanning tree:
-    # First, create a fully connected graph:
-    edges = []
-    for i in range(len(points)):
-        for j in range(i + 1, len(points)):
-            edges.append(edge(points[i], points[j]))
-    # Get the MST:
-    tree = min_span_tree(edges, points)
-    # Perform the search:
-    stack=[points[0]]
-    order=[]
-    for p in points:
-        p.visited = False
-    while len(stack) > 0:
-        current_node = stack.pop()
-        current_node.visited = True
-        order.append(current_node)
-        for neighbour in current_node.neighbours:
-            if not neighbour.visited:
-                stack.append(neighbour)
-    return order
+    # Create a rough approximation of the optimal TSP route using a depth-first search on the minimum spanning tree.
+    # The tree comes from Prim's algorithm on the point coordinates (or, for thousands of points, Kruskal on a
+    # k-nearest-neighbour graph), so no list of all the edges is ever built - see tsp_core.mst_route.
+    route = tsp_core.mst_route(*tsp_core.coordinates(points))
+    return [points[i] for i in route]
 
 ###################################################################################################################
 # Code to support Divide and conquer approach
 ###################################################################################################################
 
-def generate_orders(n):
-    # Recursively generate all the permutations of n cities, as a list of colon-delimited strings.
-    # Eg "generate_orders(3)" will return ['0:1:2:', '0:2:1:', '1:0:2:', '1:2:0:', '2:0:1:', '2:1:0:']
-    values = [True for x in range(n)]
-    perms = []
-    fill_next_value(0, n, values, perms, "")
-    return perms
-
-def fill_next_value(digit, num_digits, available_values, perms, seq_so_far):
-    # Recursively generate perumutations.
-    if digit == num_digits:
-        perms.append(seq_so_far)
-    else:
-        for i in range(num_digits):
-            if available_values[i]:
-                values_available_now=list(available_values)
-                values_available_now[i] = False
-                fill_next_value(digit + 1, num_digits, values_available_now, perms, seq_so_far + str(i) + ":")
-
 def assignKMeans(centroids, points):
-    #K-means:
-    i = 0
-    for centroid in centroids:
+    #K-means (vectorised - see tsp_core.kmeans):
+    labels, cx, cy = tsp_core.kmeans(*tsp_core.coordinates(points), k=len(centroids))
+    for i, centroid in enumerate(centroids):
         centroid.index = i
-        i += 1
+        centroid.x, centroid.y = float(cx[i]), float(cy[i])
+    for p, label in zip(points, labels.tolist()):
+        p.k_index = label
 
-    # Give all points a cluster index, and find bounding box:
-    minx = maxx = points[0].x
-    miny = maxy = points[0].y
-    for p in points:
-        p.k_index = random.randint(0, len(centroids) - 1)
-        if p.x < minx:
-            minx = p.x
-        if p.y < miny:
-            miny = p.y
-        if p.x > maxx:
-            maxx = p.x
-        if p.y > maxy:
-            maxy = p.y
-
-    changed = True
-    while (changed):
-        # Step 2: move centroids:
-        counts = [0 for c in centroids]
-        for c in centroids:
-            c.x = 0
-            c.y = 0
-        for p in points:
-            c = centroids[p.k_index]
-            counts[p.k_index] += 1
-            c.x += p.x
-            c.y += p.y
-        for x in range(len(centroids)):
-            if counts[x] == 0:
-                centroids[x].x = random.randint(minx, maxx)
-                centroids[x].y = random.randint(miny, maxy)
-            else:
-                centroids[x].x /= counts[x]
-                centroids[x].y /= counts[x]
-        # Step 1: allocate each point to a cluster:
-        changed = False
-        for p in points:
-            mindist = 0
-            nearest_centroid = None
-            for c in centroids:
-                dist = distance(p, c)
-                if dist < mindist or nearest_centroid == None:
-                    nearest_centroid = c
-                    mindist = dist
-            if p.k_index != nearest_centroid.index:
-                changed = True
-                p.k_index = nearest_centroid.index
-
-# Pre-calculate the permutations for n cities, up to n = 8
-perm_tables = []
-for i in range(9):
-    perm_tables.append(generate_orders(i))
-
-def brute_force_best_perm(points, perms):
-    # Get the best route by brute force - can do this up to about eight cities before execution time becomes prohibitive.
-    # (NB we don't do anything clever here, like caching partial routes etc. Why be clever when you are being a brute?)
-    best_length = 0
-    best_order = []
-    for p in perms:
-        length = 0
-        indices = p.split(":")
-        indices.remove('')
-        p1 = points[int(indices[0])]
-        for i in indices:
-            p2 = points[int(i)]
-            dx = (p2.x - p1.x) * (p2.x - p1.x)
-            dz = (p2.y - p1.y) * (p2.y - p1.y)
-            length += dx + dz
-            p1 = p2
-        if best_length == 0 or length < best_length:
-            best_order = indices
-            best_length = length
-
-    route = [None for x in points]
-    i = 0
-    for ind in best_order:
-        route[i] = points[int(ind)]
-        i += 1
-    return route
+def best_exact_route(points):
+    # Get the best route exactly, by Held-Karp dynamic programming over subsets (minimising the sum of squared
+    # leg lengths, as the old brute-force search over permutations did). Quick up to about a dozen cities.
+    order = tsp_core.held_karp(tsp_core.squared_distance_matrix(*tsp_core.coordinates(points)))
+    return [points[i] for i in order]
 
 def get_divide_and_conquer_route(points):
     route = []
     divide_and_generate_route(points, route)
     return route
 
-BRANCH_FACTOR=7 # Split any task of >7 cities into sub-cities.
+BRANCH_FACTOR=10 # Split any task of >10 cities into sub-cities.
 def divide_and_generate_route(points_in, route, level=0):
     points = [point_node(p.x, p.y) for p in points_in]  # Copy
     if len(points) == 0:
@@ -316,8 +136,7 @@ def divide_and_generate_route(points_in, route, level=0):
         centroids = [point_node(0,0) for x in range(BRANCH_FACTOR)]
         assignKMeans(centroids, points)
         # Find the best route through the centroids:
-        perms = perm_tables[BRANCH_FACTOR]
-        centroid_route = brute_force_best_perm(centroids, perms)
+        centroid_route = best_exact_route(centroids)
         # And recurse:
         for c in centroid_route:
             cluster = [point_node(p.x, p.y) for p in points if p.k_index == c.index]
@@ -325,9 +144,8 @@ def divide_and_generate_route(points_in, route, level=0):
     elif len(points) == 1:
         route += points
     else:
-        # This group is small enough to solve by brute-force:
-        perms = perm_tables[len(points)]
-        route += brute_force_best_perm(points, perms)
+        # This group is small enough to solve exactly:
+        route += best_exact_route(points)
 
 ###################################################################################################################
 # Nearest neighbour approach
@@ -389,156 +207,27 @@ def get_spiral_route(points):
 # Genetic algorithm approach
 ###################################################################################################################
 
-def shuffle(points):
-    for i in range(1, len(points)):    # Always leave starting point in place.
-        ind = random.randint(i, len(points) - 1)
-        (points[i], points[ind]) = (points[ind], points[i])
-
-def get_genetic_algorithm_route(progress_callback, points, k, iters, mutation_probability, crossover_probability):
+def get_genetic_algorithm_route(progress_callback, points, k, iters, mutation_probability, crossover_probability, workers=0):
     # Seems to work best with tournament selection. Never really gets particularly close to optimum solution,
     # even with fancy self-adapting mutation/crossover probabilites, large generations, many iterations, etc.
     # But it's cute.
-
-    # Choose k random starting points:
-    generation = []
-    total_fitness = 0
-    roulette = False
-    tournament_size = int(2 * math.ceil(math.sqrt(k)))
-
-    for i in range(k):
-        sample = list(points)
-        shuffle(sample)
-        score = old_div(1.0, path_length(sample))
-        total_fitness += score
-        generation.append((sample, score))
-
-    for it in range(iters):
-        if progress_callback != None:
-            progress_callback(100 * float(it) / float(iters))
-
-        # Create next generation:
-        next_gen = []
-        for i in range(int(math.ceil(old_div(float(k), 2.0)))):
-            # Choose two parents:
-            if roulette:
-                # Choose by roulette:
-                r = random.random() * total_fitness
-                t = generation[0][1]
-                c = 0
-                while t < r and c < len(generation):
-                    c += 1
-                    t += generation[c][1]
-                parent1 = generation[c][0]
-                r = random.random() * total_fitness
-                t = generation[0][1]
-                c = 0
-                while t < r and c < len(generation):
-                    c += 1
-                    t += generation[c][1]
-                parent2 = generation[c][0]
-            else:
-                # Choose by tournament:
-                tournament=[]
-                for t in range(tournament_size):
-                    tournament.append(random.choice(generation))
-                parent1 = max(tournament, key=lambda p:p[1])[0]
-                tournament=[]
-                for t in range(tournament_size):
-                    tournament.append(random.choice(generation))
-                parent2 = max(tournament, key=lambda p:p[1])[0]
-
-            # Perform crossover?
-            p_crossover = random.random() * crossover_probability
-            if random.random() <= p_crossover:
-                left = random.randint(0, len(points)-1)
-                right = left
-                while (right == left):
-                    right = random.randint(0, len(points)-1)
-                if left > right:
-                    (left, right) = (right, left)
-                subsection1 = parent1[left:right]
-                subsection2 = parent2[left:right]
-                remainder1 = []
-                remainder2 = []
-                for s in parent2:
-                    if not s in subsection1:
-                        remainder1.append(s)
-                for s in parent1:
-                    if not s in subsection2:
-                        remainder2.append(s)
-                child1 = remainder2[:left] + subsection2 + remainder2[left:]
-                child2 = remainder1[:left] + subsection1 + remainder1[left:]
-            else:
-                # No crossover - leave parents unchanged.
-                child1 = list(parent1)
-                child2 = list(parent2)
-
-            # Perform mutation (taking care to leave starting point untouched):
-            p_mutation = random.random() * mutation_probability
-            if random.random() < p_mutation:
-                ma = random.randint(1, len(child1)-1)
-                mb = random.randint(1, len(child1)-1)
-                (child1[ma], child1[mb]) = (child1[mb], child1[ma])
-            if random.random() < p_mutation:
-                ma = random.randint(1, len(child2)-1)
-                mb = random.randint(1, len(child2)-1)
-                (child2[ma], child2[mb]) = (child2[mb], child2[ma])
-
-            # Add to generation:
-            next_gen.append((child1, old_div(1.0,path_length(child1))))
-            if len(next_gen) < k:   # Deal with case where k is an odd number.
-                next_gen.append((child2, old_div(1.0,path_length(child2))))
-
-        # Generation completed - adjust crossover and mutation probabilites
-        generation = list(next_gen)
-        print("Gen", it, ": best path = ", path_length(max(generation, key=lambda p:p[1])[0]))
-        total_fitness = sum(p[1] for p in generation)
-    return max(generation, key=lambda p:p[1])[0]
+    # The population is a (k, n) array of city indices - see tsp_core.genetic.
+    dist = tsp_core.distance_matrix(*tsp_core.coordinates(points))
+    route = tsp_core.genetic(dist, k, iters, mutation_probability, crossover_probability,
+                             progress_callback=progress_callback, log=print, workers=workers)
+    return [points[i] for i in route]
 
 ###################################################################################################################
 # Simulated annealing approach
 ###################################################################################################################
 
 def get_simulated_annealing_route(input_points):
-    # Possibly the most succesful route in our toy example, relatively quick to compute for smallish numbers of cities.
+    # Possibly the most succesful route in our toy example. The distance matrix is computed once, and each
+    # relocate / 2-opt / Or-opt move is scored from the few edges it changes (see tsp_core.anneal).
     points = list(input_points)
-    initial_temperature = math.sqrt(len(input_points))
-    temperature = initial_temperature
-    t = 0
-    alpha = 0.9
-    while temperature > 0.25:
-        kept_bad = 0
-        print("Temp: ", temperature, end=' ')
-        dist_before = path_length(points)
-        for i in range(len(points)*len(points)):
-            i_from = random.randint(1, len(points)-1)
-            p = points.pop(i_from)
-            i_to = random.randint(1, len(points))
-            points.insert(i_to, p)
-            dist_after = path_length(points)
-            delta = dist_before - dist_after
-            if delta < 0:
-                # Did not improve things.
-                prop = math.exp(old_div(delta,temperature))
-                if random.random() > prop:
-                    # Reject this move.
-                    points.pop(i_to)
-                    points.insert(i_from, p)
-                    #print "rejected"
-                else:
-                    # Kept this move.
-                    dist_before = dist_after
-                    kept_bad += 1
-                    #print "dn:", delta
-            else:
-                # Kept this move.
-                dist_before = dist_after
-                #print "up:", delta
-        t += 1
-        temperature = 10 * (alpha**t)
-        print("length: ", dist_before, end=' ')
-        print("bad moves kept:", kept_bad)
-    return points
+    dist = tsp_core.distance_matrix(*tsp_core.coordinates(points))
+    route = tsp_core.anneal(dist, log=print)
+    return [points[i] for i in route]
 
 
 ###################################################################################################################
@@ -640,7 +329,7 @@ def getCitiesDrawingXML(points):
 class RouteGenerators(object):
     NearestNeighbour, Genetic, DivideAndConquer, MinSpanTree, Spiral, Annealing = list(range(6))
     Generators = {NearestNeighbour:lambda progress_callback, points : get_nearest_neighbour_route(points),
-                  Genetic:lambda progress_callback, points : get_genetic_algorithm_route(None, points, 20, 3000, 0.7, 0.9),
+                  Genetic:lambda progress_callback, points : get_genetic_algorithm_route(progress_callback.onRouteCalculationProgress, points, 20, 3000, 0.7, 0.9),
                   DivideAndConquer:lambda progress_callback, points : get_divide_and_conquer_route(points),
                   MinSpanTree:lambda progress_callback, points : get_MST_route(points),
                   Spiral:lambda progress_callback, points : get_spiral_route(points),
@@ -716,48 +405,18 @@ class SalesmanAgent(threading.Thread):
         self.manager = manager
 
     def run(self):
-        used_attempts = 0
-        max_attempts = 5
-        while True:
-            try:
-                # Attempt to start the mission:
-                self.agent_host.startMission(self.mission, self.client_pool, self.mission_record, self.role, "TSPExperiment")
-                break
-            except MalmoPython.MissionException as e:
-                errorCode = e.details.errorCode
-                if errorCode == MalmoPython.MissionErrorCode.MISSION_SERVER_WARMING_UP:
-                    # Server not quite ready yet - waiting...
-                    time.sleep(2)
-                elif errorCode == MalmoPython.MissionErrorCode.MISSION_INSUFFICIENT_CLIENTS_AVAILABLE:
-                    # Not enough available Minecraft instances running.
-                    used_attempts += 1
-                    if used_attempts < max_attempts:
-                        time.sleep(2)
-                elif errorCode == MalmoPython.MissionErrorCode.MISSION_SERVER_NOT_FOUND:
-                    # Server not found - has the mission with role 0 been started yet?
-                    used_attempts += 1
-                    if used_attempts < max_attempts:
-                        time.sleep(2)
-                else:
-                    print("Other error:", e.message)
-                    print("Bailing immediately.")
-                    exit(1)
-            if used_attempts == max_attempts:
-                print("Failed to start mission - bailing now.")
-                exit(1)
-
-        start_time = time.time()
-        world_state = self.agent_host.getWorldState()
-        while not world_state.has_mission_begun:
-            time.sleep(0.1)
-            world_state = self.agent_host.getWorldState()
-            if len(world_state.errors) > 0:
-                for err in world_state.errors:
-                    print(err)
-                exit(1)
-            if time.time() - start_time > 120:
-                print("Mission failed to begin within two minutes - did you forget to start the other agent?")
-                exit(1)
+        # Retry startMission with a per-MissionErrorCode backoff, then wait for the mission to begin.
+        try:
+            metrics = mission_launcher.start_mission(self.agent_host, self.mission, self.client_pool,
+                                                     self.mission_record, self.role, "TSPExperiment",
+                                                     deadline=time.monotonic() + 120)
+            mission_launcher.wait_for_start([self.agent_host], timeout=120, poll_interval=0.1,
+                                            wait_for_first_observation=False, fatal_errors=True)
+        except mission_launcher.MissionStartError as e:
+            print(e)
+            print("Mission failed to begin - did you forget to start the other agent?")
+            exit(1)
+        print("Role", self.role, "started after", metrics.attempts, "startMission attempt(s).")
         self.route = self.calculateRoute(self.points)
         self.runMissionLoop()
         print(RouteGenerators.DisplayNames[self.route_generator], "agent has finished!")
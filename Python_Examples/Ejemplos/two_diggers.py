@@ -30,6 +30,9 @@ import random
 import sys
 import time
 import malmoutils
+# mission_launcher.py is shared with the scripts in Python_Examples/, one directory up:
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from mission_launcher import MissionStartError, launch_mission
 
 malmoutils.fix_print()
 
@@ -102,66 +105,23 @@ client_pool.add( MalmoPython.ClientInfo('127.0.0.1',10001) )
 
 MalmoPython.setLogging("", MalmoPython.LoggingSeverityLevel.LOG_OFF)
 
-def safeStartMission(agent_host, mission, client_pool, recording, role, experimentId):
-    used_attempts = 0
-    max_attempts = 5
-    print("Calling startMission for role", role)
-    while True:
-        try:
-            agent_host.startMission(mission, client_pool, recording, role, experimentId)
-            break
-        except MalmoPython.MissionException as e:
-            errorCode = e.details.errorCode
-            if errorCode == MalmoPython.MissionErrorCode.MISSION_SERVER_WARMING_UP:
-                print("Server not quite ready yet - waiting...")
-                time.sleep(2)
-            elif errorCode == MalmoPython.MissionErrorCode.MISSION_INSUFFICIENT_CLIENTS_AVAILABLE:
-                print("Not enough available Minecraft instances running.")
-                used_attempts += 1
-                if used_attempts < max_attempts:
-                    print("Will wait in case they are starting up.", max_attempts - used_attempts, "attempts left.")
-                    time.sleep(2)
-            elif errorCode == MalmoPython.MissionErrorCode.MISSION_SERVER_NOT_FOUND:
-                print("Server not found - has the mission with role 0 been started yet?")
-                used_attempts += 1
-                if used_attempts < max_attempts:
-                    print("Will wait and retry.", max_attempts - used_attempts, "attempts left.")
-                    time.sleep(2)
-            else:
-                print("Other error:", e.message)
-                print("Waiting will not help here - bailing immediately.")
-                exit(1)
-        if used_attempts == max_attempts:
-            print("All chances used up - bailing now.")
-            exit(1)
-    print("startMission called okay.")
-
-def safeWaitForStart(agent_hosts):
-    print("Waiting for the mission to start", end=' ')
-    start_flags = [False for a in agent_hosts]
-    start_time = time.time()
-    time_out = 120  # Allow two minutes for mission to start.
-    while not all(start_flags) and time.time() - start_time < time_out:
-        states = [a.peekWorldState() for a in agent_hosts]
-        start_flags = [w.has_mission_begun for w in states]
-        errors = [e for w in states for e in w.errors]
-        if len(errors) > 0:
-            print("Errors waiting for mission start:")
-            for e in errors:
-                print(e.text)
-            print("Bailing now.")
-            exit(1)
-        time.sleep(0.1)
-        print(".", end=' ')
-    print()
-    if time.time() - start_time >= time_out:
-        print("Timed out waiting for mission to begin. Bailing.")
+def safeLaunchMission(agent_hosts, mission, client_pool, recordings, experimentId=''):
+    # All roles call startMission concurrently; mission_launcher retries each one with a
+    # backoff chosen by MissionErrorCode and then waits on all of them in a single loop.
+    print("Calling startMission for roles", list(range(len(agent_hosts))))
+    try:
+        metrics = launch_mission(agent_hosts, mission, client_pool, experimentId, recordings,
+                                 start_timeout=120, log=print, fatal_errors=True)
+    except MissionStartError as e:
+        print("Error starting mission:", e)
+        print("Bailing now.")
         exit(1)
     print("Mission has started.")
+    print(metrics.summary())
 
-safeStartMission(agent_host1, my_mission, client_pool, malmoutils.get_default_recording_object(agent_host1, "agent_1_viewpoint_discrete"), 0, '' )
-safeStartMission(agent_host2, my_mission, client_pool, malmoutils.get_default_recording_object(agent_host1, "agent_2_viewpoint_discrete"), 1, '' )
-safeWaitForStart([agent_host1, agent_host2])
+safeLaunchMission([agent_host1, agent_host2], my_mission, client_pool,
+                  [malmoutils.get_default_recording_object(agent_host1, "agent_1_viewpoint_discrete"),
+                   malmoutils.get_default_recording_object(agent_host1, "agent_2_viewpoint_discrete")])
 
 # perform a few actions
 reps = 3
@@ -253,9 +213,9 @@ client_pool = MalmoPython.ClientPool()
 client_pool.add( MalmoPython.ClientInfo('127.0.0.1',10000) )
 client_pool.add( MalmoPython.ClientInfo('127.0.0.1',10001) )
 
-safeStartMission(agent_host1, my_mission, client_pool, malmoutils.get_default_recording_object(agent_host1, "agent_1_viewpoint_continuous"), 0, '' )
-safeStartMission(agent_host2, my_mission, client_pool, malmoutils.get_default_recording_object(agent_host1, "agent_2_viewpoint_continuous"), 1, '' )
-safeWaitForStart( [agent_host1, agent_host2] )
+safeLaunchMission([agent_host1, agent_host2], my_mission, client_pool,
+                  [malmoutils.get_default_recording_object(agent_host1, "agent_1_viewpoint_continuous"),
+                   malmoutils.get_default_recording_object(agent_host1, "agent_2_viewpoint_continuous")])
 
 # perform a few actions
 time.sleep(1)
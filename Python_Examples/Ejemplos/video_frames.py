@@ -0,0 +1,206 @@
+# Video frame ingestion without per-frame copies
+#
+# frame_view() exposes a TimestampedVideoFrame's pixels as a read-only
+# (height, width, channels) uint8 NumPy view, via np.frombuffer, instead of
+# converting them with bytes(...) and Image.frombytes (two full copies per
+# frame). If the pixels don't support the buffer protocol they are copied once,
+# with np.fromiter. FrameRing keeps the last N frames of a stream in one
+# preallocated (N, H, W, C) array, with a structured array of per-frame metadata
+# (position, yaw, pitch, frame type, timestamp) alongside: pushing a frame is a
+# single copy into the next slot, and the latest K frames are read back as a view
+# (or, when they wrap around the end of the ring, copied into a caller's buffer).
+# Ring views are read-only and are overwritten as the ring wraps, so a consumer
+# that keeps frames across ticks asks for copy=True.
+
+import time
+
+import numpy as np
+
+FRAME_METADATA = np.dtype([("xPos", np.float64), ("yPos", np.float64), ("zPos", np.float64),
+                           ("yaw", np.float64), ("pitch", np.float64), ("frametype", np.int16),
+                           ("timestamp", np.float64)])
+
+
+def buffer_view(pixels, dtype=np.uint8, offset=0, count=-1):
+    '''Read-only flat view of a pixel buffer (copied once if it doesn't support the buffer protocol).'''
+    if isinstance(pixels, np.ndarray):
+        flat = pixels.reshape(-1).view(np.uint8)[offset:]
+        flat = flat[:count * np.dtype(dtype).itemsize] if count >= 0 else flat
+        view = flat.view(dtype)
+    else:
+        try:
+            view = np.frombuffer(pixels, dtype=dtype, count=count, offset=offset)
+        except TypeError:
+            flat = np.fromiter(pixels, dtype=np.uint8)
+            view = np.frombuffer(flat, dtype=dtype, count=count, offset=offset)
+    if view.flags.writeable:
+        view = view.view()
+        view.flags.writeable = False
+    return view
+
+
+def frame_view(frame, dtype=np.uint8):
+    '''
+    Read-only (height, width, channels) view of a frame's pixels; for
+    DEPTH_MAP frames pass dtype=np.float32 to get (height, width, 1) depths.
+    The view shares that frame's own buffer, so later frames don't change it.
+    '''
+    channels = getattr(frame, "channels", 3) // np.dtype(dtype).itemsize
+    count = frame.width * frame.height * channels
+    return buffer_view(frame.pixels, dtype, count=count).reshape(frame.height, frame.width, channels)
+
+
+def _seconds(timestamp):
+    # Frame timestamps come through as datetimes; plain numbers are taken as seconds
+    if hasattr(timestamp, "timestamp"):
+        return timestamp.timestamp()
+    try:
+        return float(timestamp)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _frametype(frame):
+    try:
+        return int(frame.frametype)
+    except (AttributeError, TypeError, ValueError):
+        return -1
+
+
+class FrameRing(object):
+    '''
+    The last `capacity` frames of a video stream, with their metadata, in preallocated arrays.
+    Views returned by frame() and latest() point into the ring: once `capacity`
+    more frames have been pushed they show the newer frames. They are read-only
+    so that writing to them fails loudly; pass copy=True (or an out buffer) to
+    keep frames across ticks.
+    '''
+
+    def __init__(self, capacity, height, width, channels=3):
+        self.capacity = capacity
+        self.frames = np.zeros((capacity, height, width, channels), dtype=np.uint8)
+        self.metadata = np.zeros(capacity, dtype=FRAME_METADATA)
+        self.count = 0      # frames pushed in total
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def push(self, frame):
+        '''Copy a TimestampedVideoFrame into the next slot; returns the slot.'''
+        slot = self.count % self.capacity
+        pixels = frame_view(frame)
+        if pixels.shape != self.frames.shape[1:]:
+            raise ValueError("Frame is %s, the ring holds %s frames" % (pixels.shape, self.frames.shape[1:]))
+        self.frames[slot] = pixels
+        self.metadata[slot] = (frame.xPos, frame.yPos, frame.zPos, frame.yaw, frame.pitch,
+                               _frametype(frame), _seconds(frame.timestamp))
+        self.count += 1
+        return slot
+
+    def _check(self, k):
+        if not 0 < k <= len(self):
+            raise IndexError("Asked for %d frames, the ring holds %d" % (k, len(self)))
+
+    def frame(self, age=0, copy=False):
+        '''
+        A single frame: age 0 is the latest, 1 the one before, ... A read-only view
+        into the ring (overwritten by later pushes), or a private array if copy=True.
+        '''
+        self._check(age + 1)
+        view = self.frames[(self.count - 1 - age) % self.capacity]
+        if copy:
+            return view.copy()
+        view.flags.writeable = False
+        return view
+
+    def _latest(self, array, k, out, copy):
+        self._check(k)
+        start = (self.count - k) % self.capacity
+        if start + k <= self.capacity:
+            if out is None:
+                view = array[start:start + k]
+                if copy:
+                    return view.copy()
+                view.flags.writeable = False
+                return view
+            out[...] = array[start:start + k]
+            return out
+        if out is None:
+            out = np.empty((k,) + array.shape[1:], dtype=array.dtype)
+        split = self.capacity - start
+        out[:split] = array[start:]
+        out[split:] = array[:k - split]
+        return out
+
+    def latest(self, k=1, out=None, copy=False):
+        '''
+        The latest k frames, oldest first, as a (k, H, W, C) stack: a read-only view
+        when they are contiguous in the ring, otherwise copied into out (allocated
+        if not given). The view is only valid until the ring wraps onto those
+        slots; with copy=True (or out) the result is the caller's own array.
+        '''
+        return self._latest(self.frames, k, out, copy)
+
+    def latest_metadata(self, k=1, out=None, copy=False):
+        '''Metadata of the latest k frames, oldest first (see latest()).'''
+        return self._latest(self.metadata, k, out, copy)
+
+
+#-------------------------------------------------------------------------------------------------
+# Benchmark: per-frame conversion cost, and ring ingestion at mission frame rates
+#-------------------------------------------------------------------------------------------------
+
+class _SyntheticFrame(object):
+    def __init__(self, pixels, width, height, index):
+        self.pixels = pixels
+        self.width = width
+        self.height = height
+        self.channels = 3
+        self.xPos, self.yPos, self.zPos = float(index), 4.0, 0.5
+        self.yaw = float(index % 360)
+        self.pitch = 0.0
+        self.frametype = 0
+        self.timestamp = index / 20.0
+
+
+def benchmark(width=860, height=480, frames=200, agents=4, capacity=16, stack=4, seed=0):
+    rng = np.random.default_rng(seed)
+    buffers = [rng.integers(0, 256, width * height * 3, dtype=np.uint8).tobytes() for i in range(8)]
+    stream = [_SyntheticFrame(buffers[i % len(buffers)], width, height, i) for i in range(frames)]
+
+    t0 = time.perf_counter()
+    for frame in stream:
+        image = np.frombuffer(bytearray(bytes(frame.pixels)), dtype=np.uint8).reshape(frame.height, frame.width, 3)  # two copies, like bytes(...) + Image.frombytes
+    t1 = time.perf_counter()
+    for frame in stream:
+        image = frame_view(frame)
+    t2 = time.perf_counter()
+    print("%dx%d: copying conversion %.3f ms/frame, frame_view %.4f ms/frame"
+          % (width, height, 1000 * (t1 - t0) / frames, 1000 * (t2 - t1) / frames))
+
+    rings = [FrameRing(capacity, height, width) for a in range(agents)]
+    out = np.empty((stack, height, width, 3), dtype=np.uint8)
+    t0 = time.perf_counter()
+    for frame in stream:
+        for ring in rings:
+            ring.push(frame)
+            k = min(stack, len(ring))
+            ring.latest(k, out=out[:k])
+    t1 = time.perf_counter()
+    ring = rings[0]
+    last = ring.latest(stack, out=out)
+    correct = all(np.array_equal(last[i], frame_view(stream[frames - stack + i])) for i in range(stack))
+    print("%d agents, ring of %d: push + latest %d %.3f ms/frame/agent (%d MiB preallocated), stack correct: %s"
+          % (agents, capacity, stack, 1000 * (t1 - t0) / frames / agents,
+             agents * ring.frames.nbytes // 2 ** 20, correct))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Time video frame ingestion")
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--agents', type=int, default=4)
+    parser.add_argument('--capacity', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark(frames=args.frames, agents=args.agents, capacity=args.capacity, seed=args.seed)
@@ -0,0 +1,147 @@
+# Cellular-automaton test structures for chunk_test.py and discrete_3d_test.py
+#
+# The structure is a uint8 NumPy array indexed [x, y, z], wrapping around at the
+# edges like the original nested-list version. Each cell's 26-neighbour count is a
+# 3x3x3 box sum built from rolled views (three separable passes of two np.add
+# calls each), and birth/survival are applied as boolean lookups on the counts.
+# The final "colouring" step stores each cell's neighbour count, which selects its
+# block from the pallette (count // 5). Drawing decorator XML and expected grid
+# observations are built straight from the array.
+
+import time
+
+import numpy as np
+
+BIRTH = (13, 14, 17, 18, 19)     # an empty cell with this many live neighbours is born
+SURVIVE_MIN = 13                 # a live cell with fewer than this many dies
+
+
+def neighbour_counts(cells):
+    '''Number of live cells among the 26 neighbours of each cell (periodic boundaries), as uint8.'''
+    box = cells.astype(np.uint8)
+    for axis in range(3):
+        box = box + np.roll(box, 1, axis=axis) + np.roll(box, -1, axis=axis)
+    return box - cells.astype(np.uint8)
+
+
+def step(cells, birth=BIRTH, survive_min=SURVIVE_MIN):
+    '''One generation of the automaton: returns the new boolean grid.'''
+    counts = neighbour_counts(cells)
+    born = np.zeros(27, dtype=bool)
+    born[list(birth)] = True
+    survives = np.arange(27) >= survive_min
+    return np.where(cells, survives[counts], born[counts])
+
+
+def create_structure(sx, sy, sz, iterations=None, density=0.5, rng=None, birth=BIRTH, survive_min=SURVIVE_MIN):
+    '''
+    Random grid (each cell live with probability `density`), run for
+    iterations - 1 generations, then coloured with neighbour counts (0-26).
+    iterations defaults to a random value from 10 to 25, as in chunk_test.
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    if iterations is None:
+        iterations = int(rng.integers(10, 26))
+    cells = rng.random((sx, sy, sz)) >= 1.0 - density
+    for i in range(iterations - 1):
+        cells = step(cells, birth, survive_min)
+    return neighbour_counts(cells)
+
+
+def _pallette_table(pallette):
+    # Block type and colour (or None) for each structure value; 0 is air
+    entries = [("air", None)]
+    for value in range(1, 27):
+        parts = pallette[value // 5].split()
+        entries.append((parts[0], parts[1] if len(parts) > 1 else None))
+    return entries
+
+
+def draw_blocks_xml(structure, xorg, yorg, zorg, pallette):
+    '''DrawBlock elements for every non-zero cell, in y, z, x order.'''
+    table = _pallette_table(pallette)
+    attributes = []
+    for block_type, colour in table:
+        attributes.append(' type="' + block_type + '"' + (' colour="' + colour + '"' if colour else ''))
+    ys, zs, xs = np.nonzero(structure.transpose(1, 2, 0))
+    values = structure[xs, ys, zs].tolist()
+    return "".join('<DrawBlock x="%d" y="%d" z="%d" %s/>' % (x + xorg, y + yorg, z + zorg, attributes[v])
+                   for x, y, z, v in zip(xs.tolist(), ys.tolist(), zs.tolist(), values))
+
+
+def drawing_decorator(structure, xorg, yorg, zorg, pallette):
+    '''DrawingDecorator that blanks out the volume and then draws the structure.'''
+    sx, sy, sz = structure.shape
+    return ('<DrawingDecorator>'
+            # "Blank out" the volume, in case if overlaps with old structures and throws the test.
+            '<DrawCuboid x1="%d" y1="%d" z1="%d" x2="%d" y2="%d" z2="%d" type="air"/>' % (
+                xorg, yorg, zorg, xorg + sx, yorg + sy, zorg + sz)
+            + draw_blocks_xml(structure, xorg, yorg, zorg, pallette) + '</DrawingDecorator>')
+
+
+def grid_block_types(structure, pallette):
+    '''Block type of every cell in ObservationFromGrid order (y, then z, then x), as a list of strings.'''
+    names = np.array([block_type for block_type, colour in _pallette_table(pallette)], dtype=object)
+    return names[structure.transpose(1, 2, 0).ravel()].tolist()
+
+
+#-------------------------------------------------------------------------------------------------
+# Verification / benchmark against the original nested-list automaton
+#-------------------------------------------------------------------------------------------------
+
+def _legacy_structure(s, iterations):
+    # The loop of the original createTestStructure, from a given initial grid (nested lists)
+    import copy
+    sx, sy, sz = len(s), len(s[0]), len(s[0][0])
+    t = [[[0 for z in range(sz)] for y in range(sy)] for x in range(sx)]
+    xtrim = lambda x: x % sx if x > 0 else x
+    ytrim = lambda y: y % sy if y > 0 else y
+    ztrim = lambda z: z % sz if z > 0 else z
+    neighbours = lambda x,y,z: [s[xtrim(a)][ytrim(b)][ztrim(c)] for a in range(x-1, x+2) for b in range(y-1, y+2) for c in range(z-1, z+2)]
+    colour = False
+    for i in range(iterations):
+        if i == iterations - 1:
+            colour = True
+        for x in range(sx):
+            for y in range(sy):
+                for z in range(sz):
+                    tot = sum(neighbours(x,y,z)) - s[x][y][z]
+                    result = s[x][y][z]
+                    if colour:
+                        result = tot
+                    elif result == 0:
+                        if tot == 13 or tot == 14 or (tot >= 17 and tot <= 19):
+                            result = 1
+                    elif tot < 13:
+                        result = 0
+                    t[x][y][z] = result
+        s = copy.deepcopy(t)
+    return s
+
+
+def benchmark(sizes=((21, 21, 21), (21, 31, 21), (64, 64, 64), (128, 128, 128)), iterations=20,
+              legacy_limit=21 * 31 * 21, seed=0):
+    rng = np.random.default_rng(seed)
+    for shape in sizes:
+        initial = rng.random(shape) >= 0.5
+        t0 = time.perf_counter()
+        cells = initial
+        for i in range(iterations - 1):
+            cells = step(cells)
+        structure = neighbour_counts(cells)
+        t1 = time.perf_counter()
+        line = "%dx%dx%d, %d iterations: numpy %.3f s" % (shape + (iterations, t1 - t0))
+        if np.prod(shape) <= legacy_limit:
+            legacy = _legacy_structure(initial.astype(int).tolist(), iterations)
+            t2 = time.perf_counter()
+            line += ", nested lists %.2f s, identical: %s" % (t2 - t1, bool((np.array(legacy) == structure).all()))
+        print(line)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Time the cellular-automaton structure generator")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark(iterations=args.iterations, seed=args.seed)
@@ -0,0 +1,230 @@
+# Path planning through the cellular-automaton structures of discrete_3d_test.py
+#
+# The structure is a boolean "solid" volume indexed [x, y, z]. Which blocks can
+# be stood on, walked over or jumped from is computed for the whole volume at once
+# as boolean masks, and the moves between standable blocks (step or fall up to
+# three blocks to N/S/E/W, or jump up one) become a CSR adjacency list over flat
+# voxel indices (x + z * SIZE_X + y * SIZE_X * SIZE_Z, as before).
+# The sensible path to the lowest reachable point is found by A* through a binary
+# heap, with a height-aware heuristic: a move descends at most three blocks, so a
+# block at height y is at least ceil(y / 3) moves from the floor. The silly path
+# keeps the original depth-first walk.
+
+from collections import deque, namedtuple
+import heapq
+import time
+
+import numpy as np
+
+WalkMasks = namedtuple("WalkMasks", ["standable", "hoverable", "jumpable"])
+
+# Neighbour columns, in the order the original makePath enumerated them:
+DIRECTIONS = ((-1, 0), (0, -1), (0, 1), (1, 0))
+MAX_DROP = 3
+
+
+def _clear_above(solid, k):
+    # Is the block k above each cell empty (or above the top of the volume)?
+    clear = np.ones_like(solid)
+    clear[:, :-k] = ~solid[:, k:]
+    return clear
+
+
+def walk_masks(solid):
+    '''
+    standable: solid with two empty blocks above it; hoverable: the two blocks
+    above are empty (an agent's body fits); jumpable: standable with a third
+    empty block above.
+    '''
+    hoverable = _clear_above(solid, 1) & _clear_above(solid, 2)
+    standable = solid & hoverable
+    jumpable = standable & _clear_above(solid, 3)
+    return WalkMasks(standable, hoverable, jumpable)
+
+
+def landing_heights(solid):
+    '''Height of the first solid block at or up to MAX_DROP below each cell, or -1 if there is none.'''
+    sx, sy, sz = solid.shape
+    landing = np.full(solid.shape, -1, dtype=np.intp)
+    heights = np.arange(sy)[None, :, None]
+    for drop in range(MAX_DROP, -1, -1):     # nearest solid block wins, so fill from the farthest
+        below = np.zeros_like(solid)
+        below[:, drop:] = solid[:, :sy - drop]
+        landing = np.where(below, heights - drop, landing)
+    return landing
+
+
+def flat_index(x, y, z, shape):
+    sx, sy, sz = shape
+    return x + z * sx + y * sx * sz
+
+
+def build_graph(solid):
+    '''
+    CSR adjacency (indptr, indices) of the moves between standable blocks.
+    For each block, its moves are listed in the original order: per direction,
+    the step/fall move and then the jump.
+    '''
+    masks = walk_masks(solid)
+    landing = landing_heights(solid)
+    sx, sy, sz = solid.shape
+    sources, targets, keys = [], [], []
+    for d, (dx, dz) in enumerate(DIRECTIONS):
+        # Source columns whose neighbour column is inside the volume:
+        xs = slice(max(0, -dx), sx - max(0, dx))
+        zs = slice(max(0, -dz), sz - max(0, dz))
+        nxs = slice(max(0, dx), sx + min(0, dx))
+        nzs = slice(max(0, dz), sz + min(0, dz))
+        x, y, z = np.meshgrid(np.arange(sx)[xs], np.arange(sy), np.arange(sz)[zs], indexing="ij")
+        nx, nz = x + dx, z + dz
+        stand = masks.standable[xs, :, zs]
+
+        # Step across, or fall up to three blocks, into a column the agent fits in:
+        ny = landing[nxs, :, nzs]
+        step = stand & masks.hoverable[nxs, :, nzs] & (ny >= 0)
+        step[step] = masks.standable[nx[step], ny[step], nz[step]]
+        sources.append(flat_index(x[step], y[step], z[step], solid.shape))
+        targets.append(flat_index(nx[step], ny[step], nz[step], solid.shape))
+        keys.append(np.full(np.count_nonzero(step), 2 * d))
+
+        # Jump up onto the block one higher:
+        jump = masks.jumpable[xs, :sy - 1, zs] & masks.standable[nxs, 1:, nzs]
+        jx, jy, jz = x[:, :sy - 1][jump], y[:, :sy - 1][jump], z[:, :sy - 1][jump]
+        sources.append(flat_index(jx, jy, jz, solid.shape))
+        targets.append(flat_index(jx + dx, jy + 1, jz + dz, solid.shape))
+        keys.append(np.full(len(jx), 2 * d + 1))
+
+    sources, targets, keys = np.concatenate(sources), np.concatenate(targets), np.concatenate(keys)
+    order = np.lexsort((keys, sources))
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=solid.size))))
+    return indptr, targets[order]
+
+
+def start_cell(standable):
+    '''The highest standable block (lowest x, then lowest z, on ties), or (0, 0, 0) if none is above the floor.'''
+    x, y, z = np.nonzero(standable)
+    if not len(y) or y.max() == 0:
+        return (0, 0, 0)
+    top = y == y.max()
+    first = np.lexsort((z[top], x[top]))[0]
+    return (int(x[top][first]), int(y.max()), int(z[top][first]))
+
+
+def _unflatten(index, shape):
+    sx, sy, sz = shape
+    y, rest = divmod(index, sx * sz)
+    z, x = divmod(rest, sx)
+    return x, y, z
+
+
+def _further(candidate, best, start):
+    # The original choice of end point: deeper, or as deep but further from the start (x/z Manhattan distance)
+    if candidate[1] != best[1]:
+        return candidate[1] < best[1]
+    return abs(best[0] - start[0]) + abs(best[2] - start[2]) < abs(candidate[0] - start[0]) + abs(candidate[2] - start[2])
+
+
+def astar_to_floor(indptr, indices, shape, start):
+    '''
+    Shortest walk from start to any floor-level (y == 0) block, by A* with the
+    ceil(y / 3) heuristic. If no floor block is reachable, every reachable block
+    is settled and the walk goes to the deepest (then furthest) one.
+    Returns (parents, end) where parents maps flat index -> previous flat index.
+    '''
+    ptr, targets = indptr.tolist(), indices.tolist()
+    layer = shape[0] * shape[2]
+    source = flat_index(start[0], start[1], start[2], shape)
+    cost = {source: 0}
+    parents = {source: source}
+    heap = [(-(-start[1] // MAX_DROP), source)]
+    settled = set()
+    end = start
+    while heap:
+        f, node = heapq.heappop(heap)
+        if node in settled:
+            continue
+        settled.add(node)
+        cell = _unflatten(node, shape)
+        if _further(cell, end, start):
+            end = cell
+        if cell[1] == 0:
+            break
+        g = cost[node] + 1
+        for n in targets[ptr[node]:ptr[node + 1]]:
+            if g < cost.get(n, g + 1):
+                cost[n] = g
+                parents[n] = node
+                heapq.heappush(heap, (g - (-(n // layer) // MAX_DROP), n))
+    return parents, end
+
+
+def depth_first_walk(indptr, indices, shape, start):
+    '''The original "silly" search: a deque used as a stack, marking blocks as they are pushed.'''
+    ptr, targets = indptr.tolist(), indices.tolist()
+    source = flat_index(start[0], start[1], start[2], shape)
+    parents = {source: source}
+    queue = deque([source])
+    end = start
+    while queue:
+        node = queue.popleft()
+        cell = _unflatten(node, shape)
+        if _further(cell, end, start):
+            end = cell
+        if cell[1] == 0:
+            break
+        for n in targets[ptr[node]:ptr[node + 1]]:
+            if n not in parents:
+                queue.appendleft(n)
+                parents[n] = node
+    return parents, end
+
+
+def find_path(solid, xorg, yorg, zorg, depth_first=False):
+    '''
+    makePath's result: the route from the highest standable block to the lowest
+    reachable one, as world coordinates listed from the end back to the start.
+    '''
+    solid = np.asarray(solid, dtype=bool)
+    indptr, indices = build_graph(solid)
+    start = start_cell(walk_masks(solid).standable)
+    search = depth_first_walk if depth_first else astar_to_floor
+    parents, end = search(indptr, indices, solid.shape, start)
+    path = []
+    node = flat_index(end[0], end[1], end[2], solid.shape)
+    source = flat_index(start[0], start[1], start[2], solid.shape)
+    while node != source:
+        x, y, z = _unflatten(node, solid.shape)
+        path.append((x + xorg, y + yorg, z + zorg))
+        node = parents[node]
+    path.append((start[0] + xorg, start[1] + yorg, start[2] + zorg))
+    return path
+
+
+#-------------------------------------------------------------------------------------------------
+# Benchmark: planning time over growing volumes
+#-------------------------------------------------------------------------------------------------
+
+def benchmark(sizes=((21, 31, 21), (64, 64, 64), (128, 96, 128)), seed=0):
+    import voxel_generation
+    rng = np.random.default_rng(seed)
+    for shape in sizes:
+        structure = voxel_generation.create_structure(*shape, iterations=22, rng=rng)
+        structure[:, 0, :] = 26
+        solid = structure > 0
+        t0 = time.perf_counter()
+        indptr, indices = build_graph(solid)
+        start = start_cell(walk_masks(solid).standable)
+        t1 = time.perf_counter()
+        parents, end = astar_to_floor(indptr, indices, solid.shape, start)
+        t2 = time.perf_counter()
+        depth_first_walk(indptr, indices, solid.shape, start)
+        t3 = time.perf_counter()
+        print("%dx%dx%d: masks + graph %.3f s (%d moves), A* %.3f s (%d blocks reached), depth-first %.3f s"
+              % (shape + (t1 - t0, len(indices), t2 - t1, len(parents), t3 - t2)))
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Time the discrete_3d_test path planner")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark(seed=args.seed)
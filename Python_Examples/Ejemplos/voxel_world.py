@@ -0,0 +1,210 @@
+# A persistent, sparse world model built from grid and line-of-sight observations
+#
+# Blocks are stored as interned uint16 ids (see grid_observation.py) in 16x16x16
+# NumPy chunks, indexed [y, z, x] like a decoded grid observation, in a dict keyed
+# by chunk coordinates (x // 16, y // 16, z // 16). Blocks never observed hold
+# grid_observation.UNKNOWN. A grid observation is merged by copying its slab into
+# each chunk it overlaps; a LineOfSight observation sets a single block. Chunks
+# whose contents change are added to a dirty set, which consumers drain with
+# changes(). The dict is kept in least-recently-used order, and when it holds
+# more than max_chunks the least recently used chunk outside keep_radius (in
+# chunks) of the agent is evicted. A dirty chunk that is evicted stays in the
+# feed (chunk(key) is then None), so a consumer that drains it only now and
+# then still hears about every chunk that changed.
+
+from collections import OrderedDict
+import math
+import time
+
+import numpy as np
+
+import grid_observation
+
+CHUNK = 16
+
+
+def block_position(x, y, z):
+    '''The block containing a point (as the agents compute it from LineOfSight and XPos/YPos/ZPos).'''
+    return int(math.floor(x)), int(math.floor(y)), int(math.floor(z))
+
+
+def _chunk_ranges(start, stop):
+    # (chunk coordinate, slice within the chunk, slice within [start, stop)) for each chunk the range touches
+    for c in range(start // CHUNK, (stop - 1) // CHUNK + 1):
+        lo = max(start, c * CHUNK)
+        hi = min(stop, (c + 1) * CHUNK)
+        yield c, slice(lo - c * CHUNK, hi - c * CHUNK), slice(lo - start, hi - start)
+
+
+class WorldMap(object):
+    '''
+    Sparse block map of the world, in 16^3 chunks with LRU eviction. max_chunks
+    should comfortably exceed the chunks one grid observation spans.
+    '''
+
+    def __init__(self, vocabulary=grid_observation.VOCABULARY, max_chunks=4096, keep_radius=2):
+        self.vocabulary = vocabulary
+        self.max_chunks = max_chunks
+        self.keep_radius = keep_radius
+        self._chunks = OrderedDict()
+        self._dirty = set()
+        self._centre = None
+
+    def __len__(self):
+        return len(self._chunks)
+
+    @property
+    def nbytes(self):
+        return len(self._chunks) * CHUNK ** 3 * np.dtype(np.uint16).itemsize
+
+    def chunk_keys(self):
+        return list(self._chunks)
+
+    def chunk(self, key):
+        '''The [y, z, x] id array of a loaded chunk, or None.'''
+        return self._chunks.get(key)
+
+    def _chunk(self, key, create):
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+        elif create:
+            chunk = self._chunks[key] = np.full((CHUNK, CHUNK, CHUNK), grid_observation.UNKNOWN, dtype=np.uint16)
+            self._evict()
+        return chunk
+
+    def _evict(self):
+        while len(self._chunks) > self.max_chunks:
+            victim = next(iter(self._chunks))
+            if self._centre is not None:
+                for key in self._chunks:
+                    if max(abs(a - b) for a, b in zip(key, self._centre)) > self.keep_radius:
+                        victim = key
+                        break
+            del self._chunks[victim]
+
+    def move_agent(self, x, y, z):
+        '''Note the agent's block position: chunks near it are the last to be evicted.'''
+        self._centre = (x // CHUNK, y // CHUNK, z // CHUNK)
+
+    def changes(self):
+        '''
+        Keys of the chunks that have changed since the last call (sorted),
+        clearing the feed. Includes changed chunks evicted since then, for which
+        chunk(key) returns None.
+        '''
+        dirty = sorted(self._dirty)
+        self._dirty.clear()
+        return dirty
+
+    def get_block(self, x, y, z):
+        '''Name of the block at (x, y, z), or None if it has not been observed.'''
+        chunk = self._chunk((x // CHUNK, y // CHUNK, z // CHUNK), False)
+        if chunk is None:
+            return None
+        block_id = chunk[y % CHUNK, z % CHUNK, x % CHUNK]
+        return None if block_id == grid_observation.UNKNOWN else self.vocabulary.names[block_id]
+
+    def set_block(self, x, y, z, name):
+        '''Record one block, e.g. from a LineOfSight observation (name None forgets it).'''
+        key = (x // CHUNK, y // CHUNK, z // CHUNK)
+        chunk = self._chunk(key, name is not None)
+        if chunk is None:
+            return
+        block_id = grid_observation.UNKNOWN if name is None else self.vocabulary.id(name)
+        index = (y % CHUNK, z % CHUNK, x % CHUNK)
+        if chunk[index] != block_id:
+            chunk[index] = block_id
+            self._dirty.add(key)
+
+    def pop_block(self, x, y, z):
+        '''Name of the block at (x, y, z) (or None), forgetting it.'''
+        name = self.get_block(x, y, z)
+        if name is not None:
+            self.set_block(x, y, z, None)
+        return name
+
+    def update_from_line_of_sight(self, los):
+        '''Record the block an ObservationFromRay "LineOfSight" entry hits; returns its position.'''
+        position = block_position(los["x"], los["y"] - 0.0001, los["z"])
+        self.set_block(position[0], position[1], position[2], los["type"])
+        return position
+
+    def update_from_grid(self, grid, spec, agent):
+        '''
+        Merge an ObservationFromGrid observation: grid is the list of block names
+        (or a decoded (y, z, x) array), spec its GridSpec and agent the agent's
+        block position.
+        '''
+        if not isinstance(grid, np.ndarray):
+            grid = grid_observation.decode(grid, spec, self.vocabulary)
+        self.move_agent(*agent)
+        x0, y0, z0 = (a + m for a, m in zip(agent, spec.min))
+        ny, nz, nx = grid.shape
+        for cy, chunk_y, grid_y in _chunk_ranges(y0, y0 + ny):
+            for cz, chunk_z, grid_z in _chunk_ranges(z0, z0 + nz):
+                for cx, chunk_x, grid_x in _chunk_ranges(x0, x0 + nx):
+                    key = (cx, cy, cz)
+                    chunk = self._chunk(key, True)
+                    target = chunk[chunk_y, chunk_z, chunk_x]
+                    source = grid[grid_y, grid_z, grid_x]
+                    if not np.array_equal(target, source):
+                        target[...] = source
+                        self._dirty.add(key)
+
+    def region(self, minimum, maximum):
+        '''(y, z, x) id array of the blocks from minimum to maximum (x, y, z), inclusive; UNKNOWN where not observed.'''
+        (x0, y0, z0), (x1, y1, z1) = minimum, maximum
+        out = np.full((y1 - y0 + 1, z1 - z0 + 1, x1 - x0 + 1), grid_observation.UNKNOWN, dtype=np.uint16)
+        for cy, chunk_y, out_y in _chunk_ranges(y0, y1 + 1):
+            for cz, chunk_z, out_z in _chunk_ranges(z0, z1 + 1):
+                for cx, chunk_x, out_x in _chunk_ranges(x0, x1 + 1):
+                    chunk = self._chunks.get((cx, cy, cz))
+                    if chunk is not None:
+                        out[out_y, out_z, out_x] = chunk[chunk_y, chunk_z, chunk_x]
+        return out
+
+
+#-------------------------------------------------------------------------------------------------
+# Benchmark: ingesting grid observations from an agent walking through a synthetic world
+#-------------------------------------------------------------------------------------------------
+
+def benchmark(extents=(5, 11, 21), ticks=400, tick_rate=20, max_chunks=256, seed=0):
+    rng = np.random.default_rng(seed)
+    names = ["air", "stone", "dirt", "grass", "water", "log", "leaves", "sand"]
+    vocabulary = grid_observation.BlockVocabulary(names)
+    world = rng.integers(0, len(names), (64, 256, 256)).astype(np.uint16)     # [y, z, x]
+    for extent in extents:
+        half = extent // 2
+        spec = grid_observation.GridSpec((-half, -half, -half), (half, half, half))
+        world_map = WorldMap(vocabulary, max_chunks=max_chunks)
+        # A random walk, one block per tick, kept clear of the edges of the synthetic world:
+        steps = rng.integers(-1, 2, (ticks, 3))
+        path = np.clip(np.array([128, 32, 128]) + np.cumsum(steps, axis=0), half, [255 - half, 63 - half, 255 - half])
+        observations = []
+        for x, y, z in path.tolist():
+            block = world[y - half:y + half + 1, z - half:z + half + 1, x - half:x + half + 1]
+            observations.append(((x, y, z), [names[i] for i in block.ravel().tolist()]))
+        t0 = time.perf_counter()
+        changed = 0
+        for agent, observation in observations:
+            world_map.update_from_grid(observation, spec, agent)
+            changed += len(world_map.changes())
+        t1 = time.perf_counter()
+        x, y, z = path[-1].tolist()
+        last = world_map.region((x - half, y - half, z - half), (x + half, y + half, z + half))
+        correct = np.array_equal(last, world[y - half:y + half + 1, z - half:z + half + 1, x - half:x + half + 1])
+        per_tick = (t1 - t0) / ticks
+        print("%d^3 grid: %.3f ms/tick (%.1f%% of a %d Hz tick), %d chunks (%d KiB), %d chunk changes, region correct: %s"
+              % (extent, 1000 * per_tick, 100 * per_tick * tick_rate, tick_rate, len(world_map),
+                 world_map.nbytes // 1024, changed, correct))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Time ingesting grid observations into the chunked world map")
+    parser.add_argument('--ticks', type=int, default=400)
+    parser.add_argument('--max_chunks', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark(ticks=args.ticks, max_chunks=args.max_chunks, seed=args.seed)
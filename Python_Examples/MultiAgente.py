@@ -1,10 +1,11 @@
 import os
 import time
-import threading
 import socket
 import sys
 import MalmoPython
 
+from mission_launcher import MissionStartError, launch_mission
+
 print("TEST.py arrancando (PID=%d)" % os.getpid())
 
 MISSION_FILE = "./fckingMukso2.xml"
@@ -22,8 +23,8 @@ except RuntimeError as e:
     sys.exit(1)
 
 CLIENT_PORTS = [10000, 10001]
-START_RETRY_TIMEOUT = 30.0   # segundos para reintentos de startMission
-START_RETRY_INTERVAL = 1.5
+AGENT_NAMES = ["AgentA", "AgentB"]
+START_TIMEOUT = 90.0   # segundos para startMission (con reintentos) + has_mission_begun
 
 def tcp_open(host, port, timeout=0.5):
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -35,60 +36,6 @@ def tcp_open(host, port, timeout=0.5):
     except Exception:
         return False
 
-# ----- MODIFICADO AQUÍ -----
-# Añadimos 'experiment_id' como un parámetro separado
-def run_agent_idle(role, agent_name, experiment_id, client_ports):
-    print(f"[{agent_name}] hilo (role={role}) iniciado")
-    agent_host = MalmoPython.AgentHost()
-    mr = MalmoPython.MissionRecordSpec()
-    pool = MalmoPython.ClientPool()
-    for p in client_ports:
-        pool.add(MalmoPython.ClientInfo("127.0.0.1", p))
-
-    # Intentar startMission con reintentos
-    start_deadline = time.time() + START_RETRY_TIMEOUT
-    while True:
-        try:
-            # El 'agent_name' es solo para los logs
-            print(f"[{agent_name}] llamando startMission (role={role}, mission_id='{experiment_id}')...")
-            
-            # ----- ESTE ES EL ARREGLO -----
-            # Pasamos el 'experiment_id' COMPARTIDO, no el 'agent_name'
-            agent_host.startMission(mission_spec, pool, mr, role, experiment_id)
-            
-            print(f"[{agent_name}] startMission retornó OK.")
-            break
-        except RuntimeError as e:
-            # Este error 'Failed to find server' es NORMAL al principio para AgentB
-            print(f"[{agent_name}] startMission fallo: {e}")
-            if time.time() > start_deadline:
-                print(f"[{agent_name}] agotado tiempo de reintentos para startMission.")
-                return
-            time.sleep(START_RETRY_INTERVAL)
-
-    # Ahora nos quedamos quietos: esperar que la misión realmente comience y luego que termine.
-    print(f"[{agent_name}] esperando has_mission_begun...")
-    world_state = agent_host.getWorldState()
-    begin_deadline = time.time() + 60.0
-    while not world_state.has_mission_begun:
-        if time.time() > begin_deadline:
-            print(f"[{agent_name}] timeout esperando has_mission_begun. Estado: is_mission_running={world_state.is_mission_running}")
-            break
-        time.sleep(0.2)
-        world_state = agent_host.getWorldState()
-
-    if world_state.has_mission_begun:
-        print(f"[{agent_name}] misión ha comenzado. Ahora quedo quieto hasta que termine.")
-    else:
-        print(f"[{agent_name}] no se detectó has_mission_begun; igualmente permanezco conectado si es posible.")
-
-    # permanecer inactivo hasta fin de misión
-    while world_state.is_mission_running:
-        time.sleep(0.5)
-        world_state = agent_host.getWorldState()
-
-    print(f"[{agent_name}] misión finalizada (o desconectado).")
-
 def main():
     # check puertos
     for p in CLIENT_PORTS:
@@ -97,30 +44,38 @@ def main():
         if not ok:
             print(f"→ Asegurate de lanzar launchClient.bat en ese puerto antes de ejecutar este script.")
 
-    # ----- MODIFICADO AQUÍ -----
-    # Crear un ID de misión ÚNICO pero COMPARTIDO
+    # Un ID de misión ÚNICO pero COMPARTIDO por todos los roles
     SHARED_MISSION_ID = f"mision_compartida_{int(time.time())}"
-
-    # Preparar ambos hilos
-    tA = threading.Thread(target=run_agent_idle, args=(0, "AgentA", SHARED_MISSION_ID, CLIENT_PORTS), daemon=True)
-    tB = threading.Thread(target=run_agent_idle, args=(1, "AgentB", SHARED_MISSION_ID, CLIENT_PORTS), daemon=True)
-
     print(f"Iniciando misión con ID: {SHARED_MISSION_ID}")
-    
-    print("Lanzando AgentA (role 0)...")
-    tA.start()
 
-    # Darle 1-2 segundos al role 0 para que hable con el cliente y empiece a crear el servidor
-    print("Esperando 2 segundos para dar ventaja al servidor (A)...")
-    time.sleep(2.0) 
+    pool = MalmoPython.ClientPool()
+    for p in CLIENT_PORTS:
+        pool.add(MalmoPython.ClientInfo("127.0.0.1", p))
+    agent_hosts = [MalmoPython.AgentHost() for _ in AGENT_NAMES]
+    recordings = [MalmoPython.MissionRecordSpec() for _ in AGENT_NAMES]
 
-    print("Lanzando AgentB (role 1)...")
-    tB.start()
-    
-    # esperar ambos
-    print("Ambos hilos lanzados. Esperando que terminen (join)...")
-    tA.join()
-    tB.join()
+    # Todos los roles arrancan a la vez: el role 1 reintenta con backoff mientras
+    # el role 0 crea el servidor (ya no hace falta darle ventaja con un sleep fijo)
+    try:
+        metrics = launch_mission(agent_hosts, mission_spec, pool, SHARED_MISSION_ID, recordings,
+                                 start_timeout=START_TIMEOUT, log=print)
+    except MissionStartError as e:
+        print("❌ No se pudo iniciar la misión:", e)
+        sys.exit(1)
+    print("Misión comenzada para todos los agentes:")
+    print(metrics.summary())
+
+    # permanecer inactivos hasta fin de misión (un solo bucle para todos)
+    running = list(zip(AGENT_NAMES, agent_hosts))
+    while running:
+        time.sleep(0.5)
+        still_running = []
+        for agent_name, agent_host in running:
+            if agent_host.peekWorldState().is_mission_running:
+                still_running.append((agent_name, agent_host))
+            else:
+                print(f"[{agent_name}] misión finalizada (o desconectado).")
+        running = still_running
     print("Fin del script.")
 
 if __name__ == "__main__":
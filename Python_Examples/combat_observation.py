@@ -0,0 +1,140 @@
+# Decodificación de observaciones para el agente de combate: un json.loads por tick
+
+import json
+import math
+import time
+
+_RAD_TO_DEG = 180.0 / math.pi
+
+
+def wrap_yaw(angle):
+    """
+    Lleva un ángulo en grados a [-180, 180] igual que los bucles originales
+    (while < -180: += 360; while > 180: -= 360): los ángulos que ya están en el
+    rango no cambian, así que -180 y 180 se conservan.
+
+    >>> wrap_yaw(-180.0), wrap_yaw(180.0), wrap_yaw(-540.0), wrap_yaw(540.0), wrap_yaw(190.0)
+    (-180.0, 180.0, -180.0, 180.0, -170.0)
+    """
+    if angle < -180.0:
+        return (angle + 180.0) % 360.0 - 180.0        # [-180, 180)
+    if angle > 180.0:
+        return -((180.0 - angle) % 360.0 - 180.0)     # (-180, 180]
+    return angle
+
+
+class CombatObservation(object):
+    __slots__ = ("health", "yaw", "has_enemy", "enemy_dx", "enemy_dz",
+                 "distance", "yaw_diff", "abs_yaw")
+
+    def __init__(self, health, yaw, has_enemy, enemy_dx=0.0, enemy_dz=0.0,
+                 distance=100.0, yaw_diff=0.0):
+        self.health = health
+        self.yaw = yaw
+        self.has_enemy = has_enemy
+        self.enemy_dx = enemy_dx
+        self.enemy_dz = enemy_dz
+        self.distance = distance
+        self.yaw_diff = yaw_diff
+        self.abs_yaw = abs(yaw_diff)
+
+    def state(self):
+        """Estado discretizado "h:_d:_y:" usado como clave de la tabla Q."""
+        if not self.has_enemy:
+            return "enemy_dead"
+        return f"h:{int(self.health / 5)}_d:{int(self.distance / 3)}_y:{int(self.yaw_diff / 45)}"
+
+    def __repr__(self):
+        if not self.has_enemy:
+            return f"CombatObservation(health={self.health}, yaw={self.yaw:.1f}, enemy=None)"
+        return (f"CombatObservation(health={self.health}, yaw={self.yaw:.1f}, dx={self.enemy_dx:.2f}, "
+                f"dz={self.enemy_dz:.2f}, dist={self.distance:.2f}, yaw_diff={self.yaw_diff:.1f})")
+
+
+def extract_features(obs, enemy_name="Zombie"):
+    """Construye el CombatObservation a partir del dict ya parseado."""
+    health = obs.get('Life', 0)
+    agent_yaw = obs.get('Yaw', 0)
+    for e in obs.get('entities', ()):
+        if e['name'] == enemy_name:
+            enemy_info = e
+            break
+    else:
+        return CombatObservation(health, agent_yaw, False)
+    dx = enemy_info['x'] - obs['XPos']
+    dz = enemy_info['z'] - obs['ZPos']
+    enemy_yaw = -_RAD_TO_DEG * math.atan2(dx, dz)
+    return CombatObservation(health, agent_yaw, True, dx, dz,
+                             enemy_info.get('distance', 100), wrap_yaw(enemy_yaw - agent_yaw))
+
+
+def decode_observation(text, enemy_name="Zombie"):
+    return extract_features(json.loads(text), enemy_name)
+
+
+# ======================================================================
+# MICRO-BENCHMARK: reproduce observaciones JSON grabadas
+# ======================================================================
+
+def load_recorded_observations(path):
+    """
+    Lee observaciones grabadas: una por línea, ya sea JSON puro o con el
+    prefijo de timestamp de observations.txt de las grabaciones de Malmo.
+    """
+    texts = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            brace = line.find('{')
+            if brace >= 0:
+                texts.append(line[brace:])
+    return texts
+
+
+def synthetic_observations(n, seed=0):
+    import random
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        obs = {
+            "Life": rng.uniform(0, 20), "Yaw": rng.uniform(-360, 360),
+            "XPos": rng.uniform(-10, 10), "ZPos": rng.uniform(-10, 10),
+            "entities": [
+                {"name": "SteveJohnWick", "x": 0.5, "y": 227.0, "z": 0.5},
+                {"name": "Zombie", "x": rng.uniform(-10, 10), "y": 227.0, "z": rng.uniform(-10, 10),
+                 "distance": rng.uniform(0, 20)},
+            ],
+        }
+        texts.append(json.dumps(obs))
+    return texts
+
+
+def benchmark(texts, repeats=5):
+    best_parse = best_features = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        parsed = [json.loads(t) for t in texts]
+        t1 = time.perf_counter()
+        for obs in parsed:
+            extract_features(obs).state()
+        t2 = time.perf_counter()
+        best_parse = min(best_parse, t1 - t0)
+        best_features = min(best_features, t2 - t1)
+    n = len(texts)
+    print(f"{n} ticks")
+    print(f"  parse:    {best_parse / n * 1e6:8.2f} us/tick")
+    print(f"  features: {best_features / n * 1e6:8.2f} us/tick")
+    print(f"  total:    {(best_parse + best_features) / n * 1e6:8.2f} us/tick")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Micro-benchmark de decodificación de observaciones")
+    parser.add_argument('observations', nargs='?', help="Archivo con observaciones JSON grabadas (una por línea)")
+    parser.add_argument('--ticks', type=int, default=20000, help="Ticks sintéticos si no se entrega archivo")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    texts = load_recorded_observations(args.observations) if args.observations else synthetic_observations(args.ticks)
+    benchmark(texts, args.repeats)
@@ -0,0 +1,131 @@
+# Compilador de geometría para el DrawingDecorator de Malmo
+#
+# Recibe una ocupación 2D (z, x) o 3D (y, z, x) y la cubre de forma voraz con
+# cuboides máximos (primero se extiende en x, luego en z, luego en y), de modo
+# que un muro recto de dos bloques de alto pasa de 2*L <DrawBlock> a un único
+# <DrawCuboid>. La salida se arma con una lista y ''.join.
+
+import time
+
+import numpy as np
+
+
+def fusionar_cuboides(ocupacion):
+    """
+    Devuelve una lista de cuboides (x1, y1, z1, x2, y2, z2), inclusivos y en
+    índices del arreglo, que cubren exactamente las celdas ocupadas.
+    """
+    restante = np.array(ocupacion, dtype=bool, copy=True)
+    if restante.ndim == 2:
+        restante = restante[None]
+    ny, nz, nx = restante.shape
+    cuboides = []
+
+    for y in range(ny):
+        for z in range(nz):
+            fila = restante[y, z]
+            if not fila.any():
+                continue
+            # Tramos contiguos de la fila: no cambian al procesar otros tramos de la misma fila
+            bordes = np.flatnonzero(np.diff(np.concatenate(([False], fila, [False])).astype(np.int8)))
+            for x1, fin in zip(bordes[0::2].tolist(), bordes[1::2].tolist()):
+                x2 = fin - 1
+                z2 = z
+                while z2 + 1 < nz and restante[y, z2 + 1, x1:fin].all():
+                    z2 += 1
+                y2 = y
+                while y2 + 1 < ny and restante[y2 + 1, z:z2 + 1, x1:fin].all():
+                    y2 += 1
+                restante[y:y2 + 1, z:z2 + 1, x1:fin] = False
+                cuboides.append((x1, y, z, x2, y2, z2))
+    return cuboides
+
+
+def elementos_cuboides(cuboides, tipo, origen=(0, 0, 0)):
+    """Convierte cuboides en elementos XML; los de un solo bloque salen como <DrawBlock>."""
+    ox, oy, oz = origen
+    partes = []
+    for x1, y1, z1, x2, y2, z2 in cuboides:
+        if x1 == x2 and y1 == y2 and z1 == z2:
+            partes.append(f'<DrawBlock x="{x1 + ox}" y="{y1 + oy}" z="{z1 + oz}" type="{tipo}"/>\n')
+        else:
+            partes.append(f'<DrawCuboid x1="{x1 + ox}" y1="{y1 + oy}" z1="{z1 + oz}" '
+                          f'x2="{x2 + ox}" y2="{y2 + oy}" z2="{z2 + oz}" type="{tipo}"/>\n')
+    return partes
+
+
+def _como_3d(ocupacion, alto):
+    ocupacion = np.asarray(ocupacion, dtype=bool)
+    if ocupacion.ndim == 2:
+        # Apilar capas idénticas: la fusión en y las junta en un solo cuboide
+        return np.broadcast_to(ocupacion, (alto,) + ocupacion.shape)
+    return ocupacion
+
+
+def compilar_ocupacion(ocupacion, tipo, y=0, alto=1, origen_x=0, origen_z=0):
+    """
+    XML de dibujo para una ocupación. Si es 2D, cada celda ocupada es una
+    columna de `alto` bloques desde `y`; si es 3D, su eje 0 empieza en `y`.
+    """
+    cuboides = fusionar_cuboides(_como_3d(ocupacion, alto))
+    return ''.join(elementos_cuboides(cuboides, tipo, (origen_x, y, origen_z)))
+
+
+def compilar_por_bloque(ocupacion, tipo, y=0, alto=1, origen_x=0, origen_z=0):
+    """Versión sin fusionar: un <DrawBlock> por bloque (lo que se emitía antes)."""
+    ys, zs, xs = np.nonzero(_como_3d(ocupacion, alto))
+    return ''.join(f'<DrawBlock x="{x + origen_x}" y="{yy + y}" z="{z + origen_z}" type="{tipo}"/>\n'
+                   for yy, z, x in zip(ys.tolist(), zs.tolist(), xs.tolist()))
+
+
+def _largo_decimal(valores):
+    valores = np.asarray(valores, dtype=np.int64)
+    largo = np.ones(valores.shape, dtype=np.int64) + (valores < 0)
+    resto = np.abs(valores) // 10
+    while resto.any():
+        largo += resto > 0
+        resto //= 10
+    return largo
+
+
+def reporte_compresion(ocupacion, tipo, y=0, alto=1, compilado=None):
+    """
+    Cantidad de elementos y bytes del XML antes (un <DrawBlock> por bloque) y
+    después de fusionar. El tamaño "antes" se calcula sin construir ese XML.
+    """
+    ys, zs, xs = np.nonzero(_como_3d(ocupacion, alto))
+    fijo = len(f'<DrawBlock x="" y="" z="" type="{tipo}"/>\n'.encode('utf-8'))
+    bytes_antes = int(len(xs) * fijo + _largo_decimal(xs).sum()
+                      + _largo_decimal(ys + y).sum() + _largo_decimal(zs).sum())
+    if compilado is None:
+        compilado = compilar_ocupacion(ocupacion, tipo, y, alto)
+    return {
+        "elementos_antes": len(xs),
+        "bytes_antes": bytes_antes,
+        "elementos_despues": compilado.count('\n'),
+        "bytes_despues": len(compilado.encode('utf-8')),
+    }
+
+
+def imprimir_reporte(reporte, titulo="DrawingDecorator"):
+    print(f"{titulo}: {reporte['elementos_antes']} -> {reporte['elementos_despues']} elementos, "
+          f"{reporte['bytes_antes'] / 1024:.1f} -> {reporte['bytes_despues'] / 1024:.1f} KiB")
+
+
+if __name__ == '__main__':
+    import argparse
+    from generador_laberintos import generar_laberinto
+    parser = argparse.ArgumentParser(description="Compresión de XML de laberintos con DrawCuboid")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[21, 101, 501])
+    parser.add_argument('--algoritmo', default="dfs")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for size in args.sizes:
+        laberinto = generar_laberinto(size, args.algoritmo, args.seed)
+        t0 = time.perf_counter()
+        compilar_por_bloque(laberinto, "stonebrick", 228, 2)
+        t1 = time.perf_counter()
+        compilar_ocupacion(laberinto, "stonebrick", 228, 2)
+        t2 = time.perf_counter()
+        imprimir_reporte(reporte_compresion(laberinto, "stonebrick", 228, 2), f"{size}x{size}")
+        print(f"    tiempo: por bloque {t1 - t0:.3f} s, fusionado {t2 - t1:.3f} s")
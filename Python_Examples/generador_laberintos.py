@@ -0,0 +1,256 @@
+# Generadores de laberintos sobre una cuadrícula NumPy uint8 (1 = pared, 0 = pasillo)
+#
+# Las celdas del laberinto están en coordenadas impares (1, 3, 5, ...) igual que en
+# generar_laberinto_dfs original; los muros entre celdas están en las posiciones pares.
+# Los algoritmos trabajan con índices planos de celda y solo al final se tallan
+# todas las celdas y pasajes de una vez con asignación por índices.
+
+import sys
+import time
+
+import numpy as np
+
+PARED, PASILLO = 1, 0
+
+# Tamaño máximo del bloque de números aleatorios que se pide a NumPy de una vez
+_BLOQUE_ALEATORIO = 1 << 16
+
+
+def _flujo_aleatorio(rng):
+    """Floats en [0, 1) sacados por bloques (crecientes) de un Generator de NumPy."""
+    bloque = 256
+    while True:
+        yield from rng.random(bloque).tolist()
+        bloque = min(bloque * 2, _BLOQUE_ALEATORIO)
+
+
+def _celdas_por_lado(size):
+    n = (size - 1) // 2
+    if n < 1:
+        raise ValueError(f"Tamaño de laberinto demasiado pequeño: {size}")
+    return n
+
+
+# Los generadores secuenciales (DFS, Wilson) indexan las celdas en una malla de
+# (n + 2) x (n + 2) con un borde ya marcado: así los vecinos son c ± 1 y c ± W sin
+# comprobar límites.
+
+def _malla_con_borde(n):
+    w = n + 2
+    marca = bytearray(w * w)
+    for i in range(w):
+        marca[i] = marca[(w - 1) * w + i] = marca[i * w] = marca[i * w + w - 1] = 1
+    return w, marca
+
+
+def _celda_inicial(w, inicio):
+    x, z = inicio
+    n = w - 2
+    if x % 2 == 0 or z % 2 == 0 or not (0 <= (x - 1) // 2 < n and 0 <= (z - 1) // 2 < n):
+        raise ValueError(f"La celda de inicio {inicio} debe tener coordenadas impares dentro del laberinto")
+    return ((z - 1) // 2 + 1) * w + (x - 1) // 2 + 1
+
+
+def _tallar(size, n, a, b, w=None):
+    """
+    Construye la cuadrícula y abre en bloque todas las celdas y los pasajes a<->b.
+    Si se da w, a y b son índices en la malla con borde de ancho w.
+    """
+    grid = np.ones((size, size), dtype=np.uint8)
+    grid[1:2 * n:2, 1:2 * n:2] = PASILLO
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    if w is None:
+        az, ax = np.divmod(a, n)
+        bz, bx = np.divmod(b, n)
+        grid[az + bz + 1, ax + bx + 1] = PASILLO
+    else:
+        az, ax = np.divmod(a, w)
+        bz, bx = np.divmod(b, w)
+        grid[az + bz - 1, ax + bx - 1] = PASILLO
+    return grid
+
+
+def generar_laberinto_dfs(size, seed=None, inicio=(1, 1)):
+    """Laberinto perfecto por DFS iterativo (backtracker recursivo)."""
+    n = _celdas_por_lado(size)
+    azar = _flujo_aleatorio(np.random.default_rng(seed)).__next__
+    w, visitado = _malla_con_borde(n)
+
+    inicial = _celda_inicial(w, inicio)
+    visitado[inicial] = 1
+    pila = [inicial]
+    desde, hacia = [], []
+
+    while pila:
+        c = pila[-1]
+        libres = []
+        if not visitado[c + w]: libres.append(c + w)
+        if not visitado[c - w]: libres.append(c - w)
+        if not visitado[c + 1]: libres.append(c + 1)
+        if not visitado[c - 1]: libres.append(c - 1)
+        if libres:
+            v = libres[int(azar() * len(libres))] if len(libres) > 1 else libres[0]
+            visitado[v] = 1
+            desde.append(c)
+            hacia.append(v)
+            pila.append(v)
+        else:
+            pila.pop()
+    return _tallar(size, n, desde, hacia, w)
+
+
+def generar_laberinto_kruskal(size, seed=None):
+    """Laberinto perfecto por Kruskal aleatorio con union-find (rango + compresión por mitades)."""
+    n = _celdas_por_lado(size)
+    rng = np.random.default_rng(seed)
+
+    celdas = np.arange(n * n, dtype=np.int64).reshape(n, n)
+    a = np.concatenate([celdas[:, :-1].ravel(), celdas[:-1, :].ravel()])
+    b = np.concatenate([celdas[:, 1:].ravel(), celdas[1:, :].ravel()])
+    orden = rng.permutation(len(a))
+    a, b = a[orden], b[orden]
+
+    padre = list(range(n * n))
+    rango = bytearray(n * n)
+    aceptado = np.zeros(len(a), dtype=bool)
+    restantes = n * n - 1
+
+    for i, (x, y) in enumerate(zip(a.tolist(), b.tolist())):
+        while padre[x] != x:
+            padre[x] = padre[padre[x]]
+            x = padre[x]
+        while padre[y] != y:
+            padre[y] = padre[padre[y]]
+            y = padre[y]
+        if x == y:
+            continue
+        if rango[x] < rango[y]:
+            x, y = y, x
+        padre[y] = x
+        if rango[x] == rango[y]:
+            rango[x] += 1
+        aceptado[i] = True
+        restantes -= 1
+        if restantes == 0:
+            break
+    return _tallar(size, n, a[aceptado], b[aceptado])
+
+
+def generar_laberinto_wilson(size, seed=None):
+    """
+    Laberinto uniforme (todos los árboles de expansión equiprobables) por el
+    algoritmo de Wilson: caminatas aleatorias con borrado de ciclos.
+    """
+    n = _celdas_por_lado(size)
+    rng = np.random.default_rng(seed)
+    azar = _flujo_aleatorio(rng).__next__
+    w, borde = _malla_con_borde(n)
+    en_arbol = bytearray(w * w)
+    siguiente = [0] * (w * w)
+    pasos = (w, -w, 1, -1)
+
+    celdas = (np.arange(1, n + 1)[:, None] * w + np.arange(1, n + 1)[None, :]).ravel()
+    orden = rng.permutation(celdas).tolist()
+    en_arbol[orden[0]] = 1
+    desde, hacia = [], []
+
+    for inicio in orden[1:]:
+        if en_arbol[inicio]:
+            continue
+        # Caminata: sobrescribir siguiente[] borra implícitamente los ciclos
+        c = inicio
+        while not en_arbol[c]:
+            v = c + pasos[int(azar() * 4)]
+            while borde[v]:
+                v = c + pasos[int(azar() * 4)]
+            siguiente[c] = v
+            c = v
+        c = inicio
+        while not en_arbol[c]:
+            en_arbol[c] = 1
+            desde.append(c)
+            hacia.append(siguiente[c])
+            c = siguiente[c]
+    return _tallar(size, n, desde, hacia, w)
+
+
+GENERADORES = {
+    "dfs": generar_laberinto_dfs,
+    "kruskal": generar_laberinto_kruskal,
+    "wilson": generar_laberinto_wilson,
+}
+
+
+def generar_laberinto(size, algoritmo="dfs", seed=None):
+    try:
+        generador = GENERADORES[algoritmo]
+    except KeyError:
+        raise ValueError(f"Algoritmo desconocido: {algoritmo} (use uno de {', '.join(GENERADORES)})")
+    return generador(size, seed=seed)
+
+
+# ======================================================================
+# BENCHMARK contra la versión original con listas de listas
+# ======================================================================
+
+def _generar_laberinto_dfs_listas(size, start_x=1, start_z=1):
+    # Copia de la implementación original (AvancePresentación.py), solo para comparar
+    import random
+    laberinto = [[1] * size for _ in range(size)]
+    pila = [(start_x, start_z)]
+    laberinto[start_z][start_x] = 0
+    direcciones = [(0, 2), (0, -2), (2, 0), (-2, 0)]
+
+    while pila:
+        cx, cz = pila[-1]
+        vecinos_no_visitados = []
+        for dx, dz in direcciones:
+            nx, nz = cx + dx, cz + dz
+            if 1 <= nx < size - 1 and 1 <= nz < size - 1 and laberinto[nz][nx] == 1:
+                vecinos_no_visitados.append((nx, nz, dx, dz))
+        if vecinos_no_visitados:
+            nx, nz, dx, dz = random.choice(vecinos_no_visitados)
+            laberinto[nz][nx] = 0
+            laberinto[cz + dz // 2][cx + dx // 2] = 0
+            pila.append((nx, nz))
+        else:
+            pila.pop()
+    return laberinto
+
+
+def _tamano_resultado(grid):
+    if isinstance(grid, np.ndarray):
+        return grid.nbytes
+    return sys.getsizeof(grid) + sum(sys.getsizeof(fila) for fila in grid)
+
+
+def benchmark(sizes=(21, 101, 501, 1001), algoritmos=("listas", "dfs", "kruskal", "wilson"), seed=0):
+    # El tiempo se mide sin tracemalloc (que lo distorsiona); la memoria en una segunda corrida
+    import tracemalloc
+    candidatos = dict(GENERADORES)
+    candidatos["listas"] = lambda size, seed=None: _generar_laberinto_dfs_listas(size)
+
+    print(f"{'size':>6} {'algoritmo':>9} {'tiempo [s]':>11} {'pico mem [MB]':>14} {'resultado [MB]':>15}")
+    for size in sizes:
+        for nombre in algoritmos:
+            t0 = time.perf_counter()
+            grid = candidatos[nombre](size, seed=seed)
+            dt = time.perf_counter() - t0
+            del grid
+
+            tracemalloc.start()
+            grid = candidatos[nombre](size, seed=seed)
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{size:>6} {nombre:>9} {dt:>11.3f} {pico / 2**20:>14.2f} {_tamano_resultado(grid) / 2**20:>15.3f}")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark de generadores de laberintos")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[21, 101, 501, 1001])
+    parser.add_argument('--algoritmos', nargs='+', default=["listas", "dfs", "kruskal", "wilson"])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark(args.sizes, args.algoritmos, args.seed)
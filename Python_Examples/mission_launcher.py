@@ -0,0 +1,236 @@
+# Arranque de misiones compartido: reintentos por código de error, arranque
+# concurrente de todos los roles y una sola espera con peekWorldState
+#
+# Uso típico (multiagente):
+#     metrics = launch_mission([host_a, host_b], mission, client_pool, "exp_1")
+#     print(metrics.summary())
+# Uso con un solo agente (sin ClientPool):
+#     launch_mission([agent_host], mission, recordings=[MalmoPython.MissionRecordSpec()])
+
+import random
+import threading
+import time
+
+
+class MissionStartError(RuntimeError):
+    pass
+
+
+class RetryPolicy(object):
+    """
+    Espera exponencial con jitter: min(max_delay, base * factor**intento) * U(1 - jitter, 1 + jitter).
+    max_attempts=None significa reintentar hasta el plazo global.
+    """
+
+    def __init__(self, base, factor=2.0, max_delay=10.0, jitter=0.0, max_attempts=None):
+        self.base = base
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+
+    def delay(self, attempt, rng=random):
+        d = min(self.max_delay, self.base * self.factor ** attempt)
+        if self.jitter:
+            d *= rng.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+        return d
+
+
+# Claves: nombre del MissionErrorCode (o None para RuntimeError sin detalles)
+DEFAULT_POLICIES = {
+    # El servidor arranca en algunos segundos: exponencial con jitter, sin límite de intentos
+    "MISSION_SERVER_WARMING_UP": RetryPolicy(0.25, factor=2.0, max_delay=4.0, jitter=0.5),
+    # Puede que falten clientes por levantar, pero no esperamos para siempre
+    "MISSION_INSUFFICIENT_CLIENTS_AVAILABLE": RetryPolicy(1.0, factor=1.5, max_delay=4.0, jitter=0.2, max_attempts=6),
+    # Los roles > 0 fallan así hasta que el role 0 creó el servidor
+    "MISSION_SERVER_NOT_FOUND": RetryPolicy(0.25, factor=1.5, max_delay=2.0, jitter=0.3, max_attempts=30),
+    None: RetryPolicy(0.5, factor=1.5, max_delay=3.0, jitter=0.3, max_attempts=10),
+}
+
+
+def error_code_name(error):
+    """Nombre del MissionErrorCode de una excepción de startMission (None si no trae detalles)."""
+    details = getattr(error, "details", None)
+    code = getattr(details, "errorCode", None)
+    if code is None:
+        return None
+    return getattr(code, "name", None) or str(code).split(".")[-1]
+
+
+def retry_delay(error, attempt, policies=None, rng=random):
+    """
+    Segundos a esperar antes del próximo startMission, o None si no hay que
+    reintentar (código desconocido o intentos agotados).
+    """
+    policies = DEFAULT_POLICIES if policies is None else policies
+    name = error_code_name(error)
+    policy = policies.get(name)
+    if policy is None or (policy.max_attempts is not None and attempt >= policy.max_attempts):
+        return None
+    return policy.delay(attempt, rng)
+
+
+class RoleMetrics(object):
+    __slots__ = ("role", "attempts", "errors", "start_called", "start_returned",
+                 "mission_begun", "first_observation")
+
+    def __init__(self, role):
+        self.role = role
+        self.attempts = 0
+        self.errors = []
+        self.start_called = None
+        self.start_returned = None
+        self.mission_begun = None
+        self.first_observation = None
+
+
+class LaunchMetrics(object):
+
+    def __init__(self, n_roles, t0):
+        self.t0 = t0
+        self.roles = [RoleMetrics(r) for r in range(n_roles)]
+
+    def _rel(self, t):
+        return None if t is None else t - self.t0
+
+    def as_dicts(self):
+        return [{
+            "role": m.role, "attempts": m.attempts, "errors": list(m.errors),
+            "start_mission_s": self._rel(m.start_returned),
+            "time_to_begin_s": self._rel(m.mission_begun),
+            "time_to_first_observation_s": self._rel(m.first_observation),
+        } for m in self.roles]
+
+    def summary(self):
+        def fmt(t):
+            return "-" if t is None else f"{t:.2f}s"
+        lines = []
+        for d in self.as_dicts():
+            lines.append(f"role {d['role']}: startMission {fmt(d['start_mission_s'])} ({d['attempts']} intentos), "
+                         f"begun {fmt(d['time_to_begin_s'])}, primera observación {fmt(d['time_to_first_observation_s'])}")
+        return "\n".join(lines)
+
+
+def start_mission(agent_host, mission, client_pool=None, recording=None, role=0, experiment_id="",
+                  deadline=None, policies=None, metrics=None, rng=random, log=None):
+    """startMission con reintentos según el código de error. Lanza MissionStartError si se rinde."""
+    metrics = metrics if metrics is not None else RoleMetrics(role)
+    if recording is None:
+        import MalmoPython
+        recording = MalmoPython.MissionRecordSpec()
+    metrics.start_called = time.monotonic()
+    attempt = 0
+    while True:
+        metrics.attempts += 1
+        try:
+            if client_pool is None:
+                agent_host.startMission(mission, recording)
+            else:
+                agent_host.startMission(mission, client_pool, recording, role, experiment_id)
+            metrics.start_returned = time.monotonic()
+            return metrics
+        except Exception as e:
+            # MalmoPython.MissionException trae e.details.errorCode; un RuntimeError sin código usa la política None
+            name = error_code_name(e)
+            if name is None and not isinstance(e, RuntimeError):
+                raise
+            metrics.errors.append(name or str(e))
+            delay = retry_delay(e, attempt, policies, rng)
+            if delay is None:
+                raise MissionStartError(f"role {role}: startMission falló ({name or e}), sin más reintentos")
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise MissionStartError(f"role {role}: startMission no lo logró antes del plazo ({name or e})")
+            if log:
+                log(f"role {role}: {name or e} - reintento en {delay:.2f}s")
+            attempt += 1
+            time.sleep(delay)
+
+
+def wait_for_start(agent_hosts, metrics=None, timeout=120.0, poll_interval=0.05,
+                   wait_for_first_observation=True, observation_timeout=5.0, log=None,
+                   fatal_errors=False):
+    """
+    Un solo bucle con peekWorldState sobre todos los agentes hasta que todas las
+    misiones comenzaron y, si se pide, hasta la primera observación de cada uno
+    (como mucho observation_timeout segundos después de que comenzaron todas).
+    peekWorldState no consume observaciones, así que el bucle del agente las ve igual.
+    Los errores del world state se muestran (con log, o print) y se sigue esperando,
+    como hacían los bucles originales; con fatal_errors=True lanzan MissionStartError.
+    """
+    t0 = time.monotonic()
+    metrics = metrics if metrics is not None else LaunchMetrics(len(agent_hosts), t0)
+    deadline = t0 + timeout
+    obs_deadline = None
+    # peekWorldState devuelve los mismos errores en cada llamada: cuántos ya se mostraron por role
+    reported = [0] * len(agent_hosts)
+    while True:
+        now = time.monotonic()
+        for host, m in zip(agent_hosts, metrics.roles):
+            if m.first_observation is not None:
+                continue
+            ws = host.peekWorldState()
+            if len(ws.errors) < reported[m.role]:
+                reported[m.role] = 0
+            for error in list(ws.errors)[reported[m.role]:]:
+                if fatal_errors:
+                    raise MissionStartError(f"role {m.role}: {error.text}")
+                m.errors.append(error.text)
+                (log or print)(f"role {m.role}: Error: {error.text}")
+            reported[m.role] = len(ws.errors)
+            if m.mission_begun is None and ws.has_mission_begun:
+                m.mission_begun = now
+            if ws.observations:
+                m.first_observation = now
+
+        if all(m.mission_begun is not None for m in metrics.roles):
+            if not wait_for_first_observation or all(m.first_observation is not None for m in metrics.roles):
+                return metrics
+            if obs_deadline is None:
+                obs_deadline = now + observation_timeout
+            elif now > obs_deadline:
+                if log:
+                    log("algún agente aún no tiene observaciones; se continúa")
+                return metrics
+        elif now > deadline:
+            raise MissionStartError(f"la misión no comenzó en {timeout:.0f}s")
+        time.sleep(poll_interval)
+
+
+def launch_mission(agent_hosts, mission, client_pool=None, experiment_id="", recordings=None,
+                   start_timeout=120.0, poll_interval=0.05, policies=None,
+                   wait_for_first_observation=True, log=None, fatal_errors=False):
+    """
+    Arranca todos los roles a la vez (un hilo por startMission; los roles > 0
+    reintentan MISSION_SERVER_NOT_FOUND hasta que el role 0 tenga servidor) y
+    espera a todos con un solo bucle. Devuelve LaunchMetrics.
+    """
+    t0 = time.monotonic()
+    deadline = t0 + start_timeout
+    metrics = LaunchMetrics(len(agent_hosts), t0)
+    if recordings is None:
+        recordings = [None] * len(agent_hosts)
+    failures = []
+
+    def start(role):
+        try:
+            start_mission(agent_hosts[role], mission, client_pool, recordings[role], role, experiment_id,
+                          deadline=deadline, policies=policies, metrics=metrics.roles[role],
+                          rng=random.Random(), log=log)
+        except Exception as e:
+            failures.append(e)
+
+    if len(agent_hosts) == 1:
+        start(0)
+    else:
+        threads = [threading.Thread(target=start, args=(role,), daemon=True) for role in range(len(agent_hosts))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    if failures:
+        raise failures[0] if isinstance(failures[0], MissionStartError) else MissionStartError(str(failures[0]))
+
+    wait_for_start(agent_hosts, metrics, timeout=max(0.0, deadline - time.monotonic()),
+                   poll_interval=poll_interval, wait_for_first_observation=wait_for_first_observation, log=log,
+                   fatal_errors=fatal_errors)
+    return metrics
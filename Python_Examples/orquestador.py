@@ -0,0 +1,425 @@
+# Orquestador multiagente: un solo bucle planificador maneja N AgentHost
+#
+# En vez de un hilo por agente haciendo getWorldState() + time.sleep(0.2), cada
+# agente es una pequeña máquina de estados con su propio plazo (deadline) en un
+# heap. El bucle despierta solo cuando vence el plazo más cercano. Cada comando
+# discreto se confirma mirando las observaciones (posición / yaw) en lugar de
+# esperar un tiempo fijo, y las posiciones se publican en un BusPosiciones
+# (cola) en lugar de un diccionario global compartido.
+#
+# FakeAgentHost simula un AgentHost con DiscreteMovementCommands para poder
+# hacer pruebas de carga sin Minecraft (python orquestador.py --agentes 200).
+
+import heapq
+import itertools
+import json
+import math
+import queue
+import threading
+import time
+
+from mission_launcher import retry_delay
+
+
+# ======================================================================
+# BUS DE POSICIONES
+# ======================================================================
+
+class BusPosiciones(object):
+    """
+    Los productores (el orquestador) publican (agente, (x, z)) en una cola sin
+    bloqueo; un único consumidor (p. ej. la GUI) la vacía con ultimas().
+    """
+
+    def __init__(self, iniciales=None):
+        self._cola = queue.SimpleQueue()
+        self._ultimas = dict(iniciales or {})
+
+    def publicar(self, agente, pos):
+        self._cola.put((agente, pos))
+
+    def ultimas(self):
+        while True:
+            try:
+                agente, pos = self._cola.get_nowait()
+            except queue.Empty:
+                return self._ultimas
+            self._ultimas[agente] = pos
+
+
+# ======================================================================
+# AGENTE QUE SIGUE UNA RUTA
+# ======================================================================
+
+INICIANDO, ESPERANDO_INICIO, EJECUTANDO, ESPERANDO_ACK, TERMINANDO, TERMINADO = range(6)
+NOMBRES_ESTADO = ("INICIANDO", "ESPERANDO_INICIO", "EJECUTANDO", "ESPERANDO_ACK", "TERMINANDO", "TERMINADO")
+
+
+class AgenteRuta(object):
+    """
+    Ejecuta una lista de (comando, (x, z)) como la que entrega
+    generar_acciones_con_coords. Requiere ObservationFromFullStats en la misión
+    para confirmar cada comando.
+    """
+
+    def __init__(self, nombre, role, agent_host, acciones, inicio):
+        self.nombre = nombre
+        self.role = role
+        self.host = agent_host
+        self.acciones = list(acciones)
+        self.pos = tuple(inicio)
+        self.yaw = None
+
+        self.estado = INICIANDO
+        self.siguiente = 0
+        self.error = None
+        self.plazo_inicio = None
+        self.intentos_inicio = 0
+        self.plazo_ack = None
+        self._pendiente = None
+        self._yaw_envio = None
+        self._t_envio = 0.0
+
+        self.comandos = 0
+        self.confirmados = 0
+        self.timeouts = 0
+        self.latencia_total = 0.0
+
+    def _leer_observaciones(self, world_state):
+        if world_state.number_of_observations_since_last_state > 0 and world_state.observations:
+            obs = json.loads(world_state.observations[-1].text)
+            if 'XPos' in obs and 'ZPos' in obs:
+                self.pos = (int(math.floor(obs['XPos'])), int(math.floor(obs['ZPos'])))
+            if 'Yaw' in obs:
+                self.yaw = obs['Yaw'] % 360
+            return True
+        return False
+
+    def _confirmado(self):
+        cmd, destino = self._pendiente
+        if cmd.startswith("move"):
+            return self.pos == tuple(destino)
+        if cmd.startswith("turn"):
+            return self.yaw is not None and self.yaw != self._yaw_envio
+        return True
+
+
+class Orquestador(object):
+
+    def __init__(self, mission_spec, client_pool, experiment_id, bus=None,
+                 intervalo_sondeo=0.02, timeout_ack=1.0, timeout_inicio=60.0,
+                 politicas_reintento=None, retraso_roles=1.0, nuevo_registro=None,
+                 reloj=time.monotonic, log=print):
+        self.mission_spec = mission_spec
+        self.client_pool = client_pool
+        self.experiment_id = experiment_id
+        self.bus = bus if bus is not None else BusPosiciones()
+        self.intervalo_sondeo = intervalo_sondeo
+        self.timeout_ack = timeout_ack
+        self.timeout_inicio = timeout_inicio
+        self.politicas_reintento = politicas_reintento
+        self.retraso_roles = retraso_roles
+        self.nuevo_registro = nuevo_registro
+        self.reloj = reloj
+        self.log = log
+        self.agentes = []
+        self._detener = threading.Event()
+        self._heap = []
+        self._orden = itertools.count()
+
+    def agregar(self, agente):
+        self.agentes.append(agente)
+        self.bus.publicar(agente.nombre, agente.pos)
+        return agente
+
+    def detener(self):
+        self._detener.set()
+
+    def _registro(self):
+        if self.nuevo_registro is not None:
+            return self.nuevo_registro()
+        import MalmoPython
+        return MalmoPython.MissionRecordSpec()
+
+    def _programar(self, agente, plazo):
+        heapq.heappush(self._heap, (plazo, next(self._orden), agente))
+
+    def ejecutar(self):
+        ahora = self.reloj()
+        for agente in self.agentes:
+            # El role 0 crea el servidor; los demás arrancan un poco después
+            inicio = ahora + (self.retraso_roles if agente.role > 0 else 0.0)
+            agente.plazo_inicio = inicio + self.timeout_inicio
+            self._programar(agente, inicio)
+
+        while self._heap and not self._detener.is_set():
+            plazo, _, agente = heapq.heappop(self._heap)
+            espera = plazo - self.reloj()
+            if espera > 0 and self._detener.wait(espera):
+                break
+            siguiente = self._paso(agente, self.reloj())
+            if siguiente is not None:
+                self._programar(agente, siguiente)
+        return self.resumen()
+
+    def _paso(self, agente, ahora):
+        """Avanza la máquina de estados del agente; devuelve su próximo plazo o None."""
+        if agente.estado == INICIANDO:
+            try:
+                agente.host.startMission(self.mission_spec, self.client_pool, self._registro(),
+                                         agente.role, self.experiment_id)
+            except RuntimeError as e:
+                # Backoff según el código de error (ver mission_launcher.DEFAULT_POLICIES)
+                espera = retry_delay(e, agente.intentos_inicio, self.politicas_reintento)
+                agente.intentos_inicio += 1
+                if espera is None or ahora + espera > agente.plazo_inicio:
+                    return self._fallar(agente, f"startMission: {e}")
+                return ahora + espera
+            agente.estado = ESPERANDO_INICIO
+            return ahora + self.intervalo_sondeo
+
+        if agente.estado == ESPERANDO_INICIO:
+            world_state = agente.host.getWorldState()
+            agente._leer_observaciones(world_state)
+            if world_state.has_mission_begun:
+                self.log(f"[{agente.nombre}] GO! Ejecutando ruta...")
+                agente.estado = EJECUTANDO
+                return ahora
+            if ahora > agente.plazo_inicio:
+                return self._fallar(agente, "timeout esperando has_mission_begun")
+            return ahora + self.intervalo_sondeo
+
+        if agente.estado == EJECUTANDO:
+            if agente.siguiente >= len(agente.acciones):
+                self.log(f"[{agente.nombre}] Destino alcanzado. Terminando misión...")
+                agente.host.sendCommand("quit")
+                agente.estado = TERMINANDO
+                return ahora + self.intervalo_sondeo
+            agente._pendiente = agente.acciones[agente.siguiente]
+            agente._yaw_envio = agente.yaw
+            agente._t_envio = ahora
+            agente.host.sendCommand(agente._pendiente[0])
+            agente.comandos += 1
+            agente.plazo_ack = ahora + self.timeout_ack
+            agente.estado = ESPERANDO_ACK
+            return ahora + self.intervalo_sondeo
+
+        if agente.estado == ESPERANDO_ACK:
+            world_state = agente.host.getWorldState()
+            if not world_state.is_mission_running:
+                agente.estado = TERMINADO
+                return None
+            nuevas = agente._leer_observaciones(world_state)
+            if nuevas and agente._confirmado():
+                agente.confirmados += 1
+                agente.latencia_total += ahora - agente._t_envio
+            elif ahora > agente.plazo_ack:
+                agente.timeouts += 1
+                self.log(f"[{agente.nombre}] sin confirmación para '{agente._pendiente[0]}', se continúa")
+                agente.pos = tuple(agente._pendiente[1])
+            else:
+                return ahora + self.intervalo_sondeo
+            self.bus.publicar(agente.nombre, agente.pos)
+            agente.siguiente += 1
+            agente.estado = EJECUTANDO
+            return ahora
+
+        if agente.estado == TERMINANDO:
+            world_state = agente.host.getWorldState()
+            if world_state.is_mission_running:
+                return ahora + 5 * self.intervalo_sondeo
+            agente.estado = TERMINADO
+            return None
+        return None
+
+    def _fallar(self, agente, mensaje):
+        agente.error = mensaje
+        agente.estado = TERMINADO
+        self.log(f"[{agente.nombre}] Error: {mensaje}")
+        return None
+
+    def resumen(self):
+        filas = []
+        for a in self.agentes:
+            filas.append({
+                "agente": a.nombre, "estado": NOMBRES_ESTADO[a.estado], "error": a.error,
+                "comandos": a.comandos, "confirmados": a.confirmados, "timeouts": a.timeouts,
+                "latencia_media": a.latencia_total / a.confirmados if a.confirmados else None,
+            })
+        return filas
+
+
+def puertos_clientes(primero=10000, cantidad=2):
+    return [primero + i for i in range(cantidad)]
+
+
+def crear_client_pool(puertos, host="127.0.0.1"):
+    import MalmoPython
+    client_pool = MalmoPython.ClientPool()
+    for p in puertos:
+        client_pool.add(MalmoPython.ClientInfo(host, p))
+    return client_pool
+
+
+# ======================================================================
+# AGENTHOST SIMULADO (sin Minecraft)
+# ======================================================================
+
+class _Observacion(object):
+    __slots__ = ("text", "timestamp")
+
+    def __init__(self, text, timestamp):
+        self.text = text
+        self.timestamp = timestamp
+
+
+class _WorldState(object):
+    __slots__ = ("has_mission_begun", "is_mission_running", "observations",
+                 "number_of_observations_since_last_state", "rewards", "errors", "video_frames")
+
+    def __init__(self, begun, running, observations, nuevas):
+        self.has_mission_begun = begun
+        self.is_mission_running = running
+        self.observations = observations
+        self.number_of_observations_since_last_state = nuevas
+        self.rewards = []
+        self.errors = []
+        self.video_frames = []
+
+
+class FakeAgentHost(object):
+    """
+    Imita la parte de MalmoPython.AgentHost que usan los scripts: startMission,
+    getWorldState/peekWorldState y sendCommand con movimientos discretos
+    ("move 1", "turn 1", "turn -1", "quit"). Los comandos se aplican tras
+    `latencia` segundos y cada uno genera una observación estilo FullStats.
+    """
+
+    def __init__(self, inicio=(1, 1), yaw=0, retardo_inicio=0.05, latencia=0.01,
+                 fallos_inicio=0, reloj=time.monotonic):
+        self.x, self.z = inicio
+        self.yaw = yaw
+        self.retardo_inicio = retardo_inicio
+        self.latencia = latencia
+        self.fallos_inicio = fallos_inicio
+        self.reloj = reloj
+        self._t_inicio = None
+        self._pendientes = []
+        self._observaciones = []
+        self._nuevas = 0
+        self._terminada = False
+        self.comandos = []
+
+    def startMission(self, *args):
+        if self.fallos_inicio > 0:
+            self.fallos_inicio -= 1
+            raise RuntimeError("Failed to find an available client for this mission - tried all the clients in the supplied client pool.")
+        self._t_inicio = self.reloj() + self.retardo_inicio
+
+    def sendCommand(self, cmd):
+        self.comandos.append(cmd)
+        self._pendientes.append((self.reloj() + self.latencia, cmd))
+
+    def _observar(self, t):
+        obs = {"XPos": self.x + 0.5, "YPos": 228.0, "ZPos": self.z + 0.5, "Yaw": float(self.yaw)}
+        self._observaciones = [_Observacion(json.dumps(obs), t)]
+        self._nuevas += 1
+
+    def _avanzar(self):
+        ahora = self.reloj()
+        if self._t_inicio is None or ahora < self._t_inicio:
+            return ahora
+        if not self._observaciones and not self._terminada:
+            self._observar(ahora)
+        while self._pendientes and self._pendientes[0][0] <= ahora:
+            t, cmd = self._pendientes.pop(0)
+            verbo, _, valor = cmd.partition(" ")
+            if verbo == "quit":
+                self._terminada = True
+            elif verbo == "turn":
+                self.yaw = (self.yaw + 90 * int(valor)) % 360
+            elif verbo == "move":
+                rad = math.radians(self.yaw)
+                self.x += int(round(-math.sin(rad))) * int(valor)
+                self.z += int(round(math.cos(rad))) * int(valor)
+            if not self._terminada:
+                self._observar(t)
+        return ahora
+
+    def _estado(self, consumir):
+        ahora = self._avanzar()
+        begun = self._t_inicio is not None and ahora >= self._t_inicio
+        ws = _WorldState(begun, begun and not self._terminada, list(self._observaciones), self._nuevas)
+        if consumir:
+            self._nuevas = 0
+        return ws
+
+    def getWorldState(self):
+        return self._estado(True)
+
+    def peekWorldState(self):
+        return self._estado(False)
+
+
+# ======================================================================
+# PRUEBA DE CARGA
+# ======================================================================
+
+def prueba_de_carga(n_agentes=100, size=41, latencia=0.005, seed=0):
+    import random
+    from generador_laberintos import generar_laberinto_dfs
+    from planificador import campo_distancias
+
+    rng = random.Random(seed)
+    laberinto = generar_laberinto_dfs(size, seed=seed)
+    meta = (size - 2, size - 2)
+    campo = campo_distancias(laberinto, meta)
+    celdas = [(x, z) for z in range(1, size, 2) for x in range(1, size, 2)]
+
+    orquestador = Orquestador(None, None, "carga", intervalo_sondeo=0.005, retraso_roles=0.0,
+                              nuevo_registro=lambda: None, log=lambda *a: None)
+    for i in range(n_agentes):
+        inicio = rng.choice(celdas)
+        acciones = _acciones_para(campo.ruta(inicio))
+        host = FakeAgentHost(inicio, yaw=0, latencia=latencia, fallos_inicio=rng.randint(0, 2))
+        orquestador.agregar(AgenteRuta(f"Agent{i}", i, host, acciones, inicio))
+
+    t0 = time.perf_counter()
+    resumen = orquestador.ejecutar()
+    dt = time.perf_counter() - t0
+    comandos = sum(r["comandos"] for r in resumen)
+    confirmados = sum(r["confirmados"] for r in resumen)
+    latencias = [r["latencia_media"] for r in resumen if r["latencia_media"] is not None]
+    errores = [r for r in resumen if r["error"]]
+    print(f"{n_agentes} agentes, 1 hilo: {dt:.2f} s, {comandos} comandos ({comandos / dt:.0f}/s), "
+          f"{confirmados} confirmados por observación, {sum(r['timeouts'] for r in resumen)} timeouts, "
+          f"latencia media {1000 * sum(latencias) / max(1, len(latencias)):.1f} ms, {len(errores)} errores")
+
+
+def _acciones_para(ruta, yaw=0):
+    # Misma lógica que generar_acciones_con_coords en AvancePresentación.py
+    acciones = []
+    for (cx, cz), (nx, nz) in zip(ruta, ruta[1:]):
+        dx, dz = nx - cx, nz - cz
+        objetivo = {(0, 1): 0, (0, -1): 180, (1, 0): 270, (-1, 0): 90}[(dx, dz)]
+        diff = (objetivo - yaw) % 360
+        if diff == 90:
+            acciones.append(("turn 1", (cx, cz)))
+        elif diff == 270:
+            acciones.append(("turn -1", (cx, cz)))
+        elif diff == 180:
+            acciones += [("turn 1", (cx, cz)), ("turn 1", (cx, cz))]
+        acciones.append(("move 1", (nx, nz)))
+        yaw = objetivo
+    return acciones
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Prueba de carga del orquestador con FakeAgentHost")
+    parser.add_argument('--agentes', type=int, default=100)
+    parser.add_argument('--size', type=int, default=41)
+    parser.add_argument('--latencia', type=float, default=0.005, help="Latencia simulada por comando [s]")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    prueba_de_carga(args.agentes, args.size, args.latencia, args.seed)
@@ -0,0 +1,363 @@
+# Planificación de rutas en laberintos: A*, Jump Point Search y campos de distancia
+#
+# Todas las funciones reciben la cuadrícula indexada como grid[z][x] (0 = pasillo,
+# 1 = pared; lista de listas o arreglo NumPy) y devuelven la ruta como lista de
+# (x, z) desde el inicio hasta la meta, el formato que consume
+# generar_acciones_con_coords. Si no hay camino devuelven [].
+#
+# Internamente la cuadrícula se rodea de un borde de pared y se recorre con índices
+# planos: los vecinos de i son i ± 1 e i ± W, sin comprobar límites.
+
+import collections
+import hashlib
+import heapq
+import time
+
+import numpy as np
+
+
+class _Malla(object):
+    __slots__ = ("alto", "ancho", "w", "libre")
+
+    def __init__(self, grid):
+        grid = np.asarray(grid)
+        self.alto, self.ancho = grid.shape
+        self.w = self.ancho + 2
+        libre = np.zeros((self.alto + 2, self.w), dtype=np.uint8)
+        libre[1:-1, 1:-1] = grid == 0
+        self.libre = bytearray(libre.tobytes())
+
+    def indice(self, pos):
+        x, z = pos
+        if not (0 <= x < self.ancho and 0 <= z < self.alto):
+            raise ValueError(f"Posición fuera de la cuadrícula: {pos}")
+        return (z + 1) * self.w + x + 1
+
+    def posicion(self, i):
+        z, x = divmod(i, self.w)
+        return (x - 1, z - 1)
+
+
+def _expandir(malla, puntos):
+    """Pasa de una lista de índices (puntos de salto) a la ruta paso a paso en (x, z)."""
+    ruta = [malla.posicion(puntos[0])]
+    for a, b in zip(puntos, puntos[1:]):
+        paso = 1 if b > a else -1
+        if abs(b - a) >= malla.w:
+            paso *= malla.w
+        for i in range(a + paso, b + paso, paso):
+            ruta.append(malla.posicion(i))
+    return ruta
+
+
+def _reconstruir(padre, meta):
+    puntos = [meta]
+    while padre[puntos[-1]] != -1:
+        puntos.append(padre[puntos[-1]])
+    puntos.reverse()
+    return puntos
+
+
+# ======================================================================
+# A* (heurística Manhattan)
+# ======================================================================
+
+def a_estrella(grid, start, end):
+    malla = _Malla(grid)
+    inicio, meta = malla.indice(start), malla.indice(end)
+    libre, w = malla.libre, malla.w
+    if not (libre[inicio] and libre[meta]):
+        return []
+    mz, mx = divmod(meta, w)
+
+    g = {inicio: 0}
+    padre = {inicio: -1}
+    abiertos = [(0, 0, inicio)]
+    while abiertos:
+        _, gi, i = heapq.heappop(abiertos)
+        if i == meta:
+            return _expandir(malla, _reconstruir(padre, meta))
+        if gi > g[i]:
+            continue
+        gv = gi + 1
+        for v in (i + 1, i - 1, i + w, i - w):
+            if libre[v] and gv < g.get(v, gv + 1):
+                g[v] = gv
+                padre[v] = i
+                vz, vx = divmod(v, w)
+                heapq.heappush(abiertos, (gv + abs(vz - mz) + abs(vx - mx), gv, v))
+    return []
+
+
+# ======================================================================
+# Jump Point Search (4-conexo)
+# ======================================================================
+# Orden canónico: los movimientos horizontales siguen rectos salvo vecinos
+# forzados arriba/abajo; los verticales ramifican a izquierda/derecha y se
+# detienen en cuanto una de esas ramas horizontales encuentra un punto de salto.
+
+def _saltar_horizontal(libre, w, i, d, meta):
+    while True:
+        i += d
+        if not libre[i]:
+            return -1
+        if i == meta:
+            return i
+        if (libre[i + w] and not libre[i - d + w]) or (libre[i - w] and not libre[i - d - w]):
+            return i
+
+
+def _saltar_vertical(libre, w, i, d, meta):
+    while True:
+        i += d
+        if not libre[i]:
+            return -1
+        if i == meta:
+            return i
+        if _saltar_horizontal(libre, w, i, 1, meta) != -1 or _saltar_horizontal(libre, w, i, -1, meta) != -1:
+            return i
+
+
+def jps(grid, start, end):
+    malla = _Malla(grid)
+    inicio, meta = malla.indice(start), malla.indice(end)
+    libre, w = malla.libre, malla.w
+    if not (libre[inicio] and libre[meta]):
+        return []
+    mz, mx = divmod(meta, w)
+
+    g = {inicio: 0}
+    padre = {inicio: -1}
+    abiertos = [(0, 0, inicio)]
+    while abiertos:
+        _, gi, i = heapq.heappop(abiertos)
+        if i == meta:
+            return _expandir(malla, _reconstruir(padre, meta))
+        if gi > g[i]:
+            continue
+
+        p = padre[i]
+        if p == -1:
+            direcciones = (1, -1, w, -w)
+        else:
+            d = i - p
+            if abs(d) < w:
+                d = 1 if d > 0 else -1
+                direcciones = [d]
+                if libre[i + w] and not libre[i - d + w]: direcciones.append(w)
+                if libre[i - w] and not libre[i - d - w]: direcciones.append(-w)
+            else:
+                d = w if d > 0 else -w
+                direcciones = (d, 1, -1)
+
+        for d in direcciones:
+            if abs(d) == 1:
+                j = _saltar_horizontal(libre, w, i, d, meta)
+                costo = abs(j - i)
+            else:
+                j = _saltar_vertical(libre, w, i, d, meta)
+                costo = abs(j - i) // w
+            if j == -1:
+                continue
+            gj = gi + costo
+            if gj < g.get(j, gj + 1):
+                g[j] = gj
+                padre[j] = i
+                jz, jx = divmod(j, w)
+                heapq.heappush(abiertos, (gj + abs(jz - mz) + abs(jx - mx), gj, j))
+    return []
+
+
+# ======================================================================
+# Campo de distancias (BFS inverso desde la meta), con caché por laberinto
+# ======================================================================
+
+class CampoDistancias(object):
+    """
+    Distancia de cada celda a la meta y siguiente paso precalculado, de modo que
+    cualquier agente (o reinicio) obtiene su próximo movimiento en O(1).
+    """
+
+    def __init__(self, grid, meta):
+        malla = _Malla(grid)
+        self.malla = malla
+        self.meta = tuple(meta)
+        libre, w = malla.libre, malla.w
+        m = malla.indice(meta)
+
+        dist = [-1] * len(libre)
+        if libre[m]:
+            dist[m] = 0
+            cola = collections.deque([m])
+            while cola:
+                i = cola.popleft()
+                di = dist[i] + 1
+                for v in (i + 1, i - 1, i + w, i - w):
+                    if libre[v] and dist[v] < 0:
+                        dist[v] = di
+                        cola.append(v)
+
+        d = np.array(dist, dtype=np.int32).reshape(malla.alto + 2, w)
+        self.distancias = d[1:-1, 1:-1]
+
+        # Siguiente paso: cualquier vecino con distancia d - 1 (se toma el primero encontrado)
+        siguiente = np.full(d.shape, -1, dtype=np.int64)
+        planos = np.arange(d.size, dtype=np.int64).reshape(d.shape)
+        for desplazamiento in (-w, w, -1, 1):
+            vecino = np.roll(d, -desplazamiento)
+            elegir = (siguiente < 0) & (d > 0) & (vecino == d - 1)
+            siguiente[elegir] = planos[elegir] + desplazamiento
+        self._siguiente = siguiente.ravel().tolist()
+
+    def distancia(self, pos):
+        x, z = pos
+        return int(self.distancias[z, x])
+
+    def siguiente_paso(self, pos):
+        """Próxima celda (x, z) hacia la meta, o None si pos es la meta o no hay camino."""
+        j = self._siguiente[self.malla.indice(pos)]
+        return None if j < 0 else self.malla.posicion(j)
+
+    def ruta(self, start):
+        i = self.malla.indice(start)
+        if self.distancia(start) < 0:
+            return []
+        ruta = [tuple(start)]
+        while True:
+            i = self._siguiente[i]
+            if i < 0:
+                return ruta
+            ruta.append(self.malla.posicion(i))
+
+
+_CACHE_CAMPOS = collections.OrderedDict()
+MAX_CAMPOS_EN_CACHE = 32
+
+
+def hash_laberinto(grid):
+    grid = np.ascontiguousarray(np.asarray(grid) != 0)
+    h = hashlib.blake2b(grid.tobytes(), digest_size=16)
+    h.update(repr(grid.shape).encode())
+    return h.hexdigest()
+
+
+def campo_distancias(grid, meta):
+    """CampoDistancias para (laberinto, meta), calculado una sola vez y guardado en caché."""
+    clave = (hash_laberinto(grid), tuple(meta))
+    campo = _CACHE_CAMPOS.get(clave)
+    if campo is None:
+        campo = CampoDistancias(grid, meta)
+        _CACHE_CAMPOS[clave] = campo
+        if len(_CACHE_CAMPOS) > MAX_CAMPOS_EN_CACHE:
+            _CACHE_CAMPOS.popitem(last=False)
+    else:
+        _CACHE_CAMPOS.move_to_end(clave)
+    return campo
+
+
+METODOS = ("astar", "jps", "campo")
+
+
+def planificar(grid, start, end, metodo="astar"):
+    if metodo == "astar":
+        return a_estrella(grid, start, end)
+    if metodo == "jps":
+        return jps(grid, start, end)
+    if metodo == "campo":
+        return campo_distancias(grid, end).ruta(start)
+    raise ValueError(f"Método de planificación desconocido: {metodo} (use uno de {', '.join(METODOS)})")
+
+
+# ======================================================================
+# BENCHMARK contra la búsqueda bidireccional original
+# ======================================================================
+
+def _busqueda_bidireccional_original(grid, start, end):
+    # Copia de busqueda_bidireccional / obtener_vecinos / reconstruir_camino de AvancePresentación.py
+    def obtener_vecinos(grid, node):
+        x, z = node
+        vecinos = []
+        for dx, dz in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
+            nx, nz = x + dx, z + dz
+            if 0 <= nx < len(grid) and 0 <= nz < len(grid) and grid[nz][nx] == 0:
+                vecinos.append((nx, nz))
+        return vecinos
+
+    def reconstruir_camino(padres_s, padres_e, encuentro):
+        camino_s = []
+        curr = encuentro
+        while curr is not None:
+            camino_s.append(curr)
+            curr = padres_s[curr]
+        camino_s.reverse()
+        camino_e = []
+        curr = padres_e[encuentro]
+        while curr is not None:
+            camino_e.append(curr)
+            curr = padres_e[curr]
+        return camino_s + camino_e
+
+    if start == end: return [start]
+    q_start = collections.deque([start])
+    q_end = collections.deque([end])
+    visitado_start = {start: None}
+    visitado_end = {end: None}
+    while q_start and q_end:
+        curr_s = q_start.popleft()
+        if curr_s in visitado_end: return reconstruir_camino(visitado_start, visitado_end, curr_s)
+        for v in obtener_vecinos(grid, curr_s):
+            if v not in visitado_start:
+                visitado_start[v] = curr_s
+                q_start.append(v)
+        curr_e = q_end.popleft()
+        if curr_e in visitado_start: return reconstruir_camino(visitado_start, visitado_end, curr_e)
+        for v in obtener_vecinos(grid, curr_e):
+            if v not in visitado_end:
+                visitado_end[v] = curr_e
+                q_end.append(v)
+    return []
+
+
+def benchmark(sizes=(101, 501, 1001), algoritmo="dfs", consultas=10, seed=0):
+    from generador_laberintos import generar_laberinto
+    rng = np.random.default_rng(seed)
+    print(f"{'size':>6} {'método':>14} {'tiempo [s]':>11} {'largo ruta':>11}")
+    for size in sizes:
+        laberinto = generar_laberinto(size, algoritmo, seed)
+        listas = laberinto.tolist()
+        start, end = (1, 1), (size - 2, size - 2)
+        casos = [
+            ("bidireccional", lambda: _busqueda_bidireccional_original(listas, start, end)),
+            ("astar", lambda: a_estrella(laberinto, start, end)),
+            ("jps", lambda: jps(laberinto, start, end)),
+            ("campo (1ra)", lambda: CampoDistancias(laberinto, end).ruta(start)),
+        ]
+        for nombre, fn in casos:
+            t0 = time.perf_counter()
+            ruta = fn()
+            print(f"{size:>6} {nombre:>14} {time.perf_counter() - t0:>11.3f} {len(ruta):>11}")
+
+        # Muchos agentes / reinicios contra la misma meta: el campo sale de la caché
+        celdas = np.argwhere(laberinto == 0)
+        origenes = [tuple(int(v) for v in celdas[k][::-1]) for k in rng.integers(len(celdas), size=consultas)]
+        campo = campo_distancias(laberinto, end)
+        t0 = time.perf_counter()
+        for o in origenes:
+            campo.siguiente_paso(o)
+        dt_campo = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for o in origenes:
+            _busqueda_bidireccional_original(listas, o, end)
+        dt_bidir = time.perf_counter() - t0
+        print(f"{size:>6} {consultas} consultas de siguiente paso: bidireccional {dt_bidir:.3f} s, campo en caché {dt_campo:.4f} s")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark de planificadores de ruta en laberintos")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[101, 501, 1001])
+    parser.add_argument('--algoritmo', default="dfs", help="Generador de laberinto (dfs, kruskal, wilson)")
+    parser.add_argument('--consultas', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark(args.sizes, args.algoritmo, args.consultas, args.seed)
@@ -0,0 +1,389 @@
+# Tabla Q con estados internados y valores en un arreglo NumPy contiguo
+#
+# Checkpoints: un directorio con
+#   values.npy   matriz (capacidad, n_acciones) en formato .npy, se abre con mmap
+#   states.txt   un estado por línea; la línea i es el estado con id i (solo se agrega al final)
+#   meta.json    filas válidas, bytes válidos de states.txt, dtype y capacidad
+# save_checkpoint sobre el mismo directorio escribe solo las filas modificadas
+# desde el último guardado y los estados nuevos; meta.json se reemplaza al final,
+# así que si el proceso muere a mitad de un guardado se carga el anterior.
+
+import json
+import os
+import time
+
+import numpy as np
+
+_VALUES = "values.npy"
+_STATES = "states.txt"
+_META = "meta.json"
+
+
+class QTable(object):
+    """
+    Tabla Q tabular: cada estado (p. ej. "h:4_d:1_y:0") se interna en un id
+    entero y sus valores viven en una fila de un arreglo (n_estados, n_acciones)
+    que crece por duplicación.
+    """
+
+    def __init__(self, n_actions, initial_capacity=64, dtype=np.float64):
+        self.n_actions = n_actions
+        self._index = {}
+        self._states = []
+        self._values = np.zeros((max(1, initial_capacity), n_actions), dtype=dtype)
+        self._zeros = np.zeros(n_actions, dtype=dtype)
+        self._zeros.flags.writeable = False
+        # Estado del último checkpoint: directorio, filas guardadas y filas modificadas desde entonces
+        self._checkpoint = None
+        self._saved_rows = 0
+        self._dirty = set()
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, state):
+        return state in self._index
+
+    @property
+    def values(self):
+        # Vista de las filas ocupadas (sin copia)
+        return self._values[:len(self._states)]
+
+    @property
+    def states(self):
+        return self._states
+
+    def _grow(self, min_rows):
+        capacity = self._values.shape[0]
+        while capacity < min_rows:
+            capacity *= 2
+        grown = np.zeros((capacity, self.n_actions), dtype=self._values.dtype)
+        grown[:len(self._states)] = self._values[:len(self._states)]
+        self._values = grown
+
+    def state_id(self, state):
+        """Devuelve el id entero del estado, internándolo si es nuevo."""
+        sid = self._index.get(state)
+        if sid is None:
+            sid = len(self._states)
+            if sid >= self._values.shape[0]:
+                self._grow(sid + 1)
+            self._index[state] = sid
+            self._states.append(state)
+        return sid
+
+    def state_ids(self, states):
+        return np.fromiter((self.state_id(s) for s in states), dtype=np.intp, count=len(states))
+
+    def q_values(self, state):
+        """Fila de valores Q del estado; ceros (solo lectura) si nunca se visitó."""
+        sid = self._index.get(state)
+        if sid is None:
+            return self._zeros
+        return self._values[sid]
+
+    def get(self, state, action_idx, default=0.0):
+        sid = self._index.get(state)
+        if sid is None:
+            return default
+        return float(self._values[sid, action_idx])
+
+    def set(self, state, action_idx, value):
+        sid = self.state_id(state)
+        self._values[sid, action_idx] = value
+        self._dirty.add(sid)
+
+    def best_action(self, state):
+        return int(np.argmax(self.q_values(state)))
+
+    def max_q(self, state):
+        return float(np.max(self.q_values(state)))
+
+    def batch_argmax(self, state_ids):
+        return np.argmax(self._values[np.asarray(state_ids, dtype=np.intp)], axis=1)
+
+    def batch_max(self, state_ids):
+        return np.max(self._values[np.asarray(state_ids, dtype=np.intp)], axis=1)
+
+    def update(self, state, action_idx, reward, next_state, alpha, gamma, terminal=False):
+        """Actualización Q-learning de un paso; devuelve (old_q, new_q)."""
+        sid = self.state_id(state)
+        old_q = self._values[sid, action_idx]
+        next_max_q = 0.0 if terminal else self.max_q(next_state)
+        new_q = old_q + alpha * (reward + gamma * next_max_q - old_q)
+        self._values[sid, action_idx] = new_q
+        self._dirty.add(sid)
+        return float(old_q), float(new_q)
+
+    def apply_transitions(self, states, actions, rewards, next_states, terminals, alpha, gamma):
+        """
+        Aplica un buffer de transiciones en una sola llamada. Los objetivos se
+        calculan con la tabla previa al lote (actualización síncrona); pares
+        (s, a) repetidos acumulan sus correcciones.
+        """
+        s_ids = self.state_ids(states)
+        next_ids = self.state_ids(next_states)
+        actions = np.asarray(actions, dtype=np.intp)
+        rewards = np.asarray(rewards, dtype=self._values.dtype)
+        terminals = np.asarray(terminals, dtype=bool)
+
+        next_max = self.batch_max(next_ids)
+        next_max[terminals] = 0.0
+        old_q = self._values[s_ids, actions]
+        delta = alpha * (rewards + gamma * next_max - old_q)
+        np.add.at(self._values, (s_ids, actions), delta)
+        self._dirty.update(s_ids.tolist())
+        return delta
+
+    def to_dict(self):
+        """Formato antiguo {(estado, acción): valor}, solo entradas no nulas."""
+        table = {}
+        rows, cols = np.nonzero(self.values)
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            table[(self._states[r], c)] = float(self._values[r, c])
+        return table
+
+    @classmethod
+    def from_dict(cls, table, n_actions):
+        q = cls(n_actions, initial_capacity=max(64, len(table)))
+        for (state, action_idx), value in table.items():
+            q.set(state, action_idx, value)
+        return q
+
+    # ------------------------------------------------------------------
+    # Checkpoints (los estados deben ser str sin saltos de línea; las escrituras
+    # directas sobre `values` no se registran como modificadas)
+    # ------------------------------------------------------------------
+
+    def save_checkpoint(self, path):
+        """
+        Guarda la tabla en el directorio `path`. Si es el mismo checkpoint del
+        último guardado/carga y le cabe la tabla, solo escribe las filas
+        modificadas y las nuevas; si no, lo reescribe completo. Devuelve la
+        cantidad de filas escritas.
+        """
+        path = os.path.abspath(path)
+        n = len(self._states)
+        meta = _read_meta(path) if self._checkpoint == path else None
+        if (meta is not None and meta["rows"] == self._saved_rows and meta["capacity"] >= n
+                and meta["n_actions"] == self.n_actions and meta["dtype"] == self._values.dtype.str):
+            written = self._save_incremental(path, meta)
+        else:
+            written = self._save_full(path)
+        self._checkpoint = path
+        self._saved_rows = n
+        self._dirty.clear()
+        return written
+
+    def _encode_states(self, start):
+        nuevos = self._states[start:]
+        if any(not isinstance(s, str) or "\n" in s for s in nuevos):
+            raise ValueError("Los checkpoints solo admiten estados str sin saltos de línea")
+        return "".join(s + "\n" for s in nuevos).encode("utf-8")
+
+    def _release_mapping(self):
+        # Con un checkpoint cargado con mmap, self._values mapea values.npy; en Windows
+        # no se puede reemplazar un archivo mapeado, así que se pasa a memoria primero.
+        if isinstance(self._values, np.memmap):
+            self._values = np.array(self._values)
+
+    def _save_full(self, path):
+        os.makedirs(path, exist_ok=True)
+        self._release_mapping()
+        n = len(self._states)
+        values_path = os.path.join(path, _VALUES)
+        tmp = values_path + ".tmp"
+        mm = np.lib.format.open_memmap(tmp, mode="w+", dtype=self._values.dtype, shape=self._values.shape)
+        mm[:n] = self._values[:n]
+        mm.flush()
+        del mm
+        os.replace(tmp, values_path)
+
+        datos = self._encode_states(0)
+        states_path = os.path.join(path, _STATES)
+        with open(states_path + ".tmp", "wb") as f:
+            f.write(datos)
+        os.replace(states_path + ".tmp", states_path)
+        _write_meta(path, self, len(datos))
+        return n
+
+    def _save_incremental(self, path, meta):
+        n = len(self._states)
+        saved = self._saved_rows
+        filas = sorted(r for r in self._dirty if r < saved)
+        filas.extend(range(saved, n))
+        if filas:
+            filas = np.asarray(filas, dtype=np.intp)
+            values_path = os.path.join(path, _VALUES)
+            if os.name == "nt":
+                # Un segundo mapeo del archivo que self._values puede tener mapeado
+                # falla en Windows: se escribe con un archivo normal
+                _write_rows(values_path, self._values, filas)
+            else:
+                mm = np.load(values_path, mmap_mode="r+")
+                mm[filas] = self._values[filas]
+                mm.flush()
+                del mm
+
+        datos = self._encode_states(saved)
+        with open(os.path.join(path, _STATES), "r+b") as f:
+            # Descarta lo que haya quedado de un guardado interrumpido
+            f.truncate(meta["states_bytes"])
+            f.seek(meta["states_bytes"])
+            f.write(datos)
+        _write_meta(path, self, meta["states_bytes"] + len(datos))
+        return len(filas)
+
+    @classmethod
+    def load_checkpoint(cls, path, mmap_mode="c"):
+        """
+        Carga un checkpoint. Con mmap_mode="c" (copy-on-write) los valores no se
+        leen del disco hasta usarlos y las escrituras quedan en memoria hasta el
+        próximo save_checkpoint; mmap_mode=None los carga completos.
+        """
+        path = os.path.abspath(path)
+        meta = _read_meta(path)
+        if meta is None:
+            raise FileNotFoundError(f"No hay un checkpoint de QTable en {path}")
+        values = np.load(os.path.join(path, _VALUES), mmap_mode=mmap_mode)
+        with open(os.path.join(path, _STATES), "rb") as f:
+            datos = f.read(meta["states_bytes"])
+        states = datos.decode("utf-8").split("\n")[:-1]
+        if len(states) != meta["rows"] or values.shape != (meta["capacity"], meta["n_actions"]):
+            raise ValueError(f"Checkpoint inconsistente en {path}")
+
+        q = cls(meta["n_actions"], initial_capacity=1, dtype=values.dtype)
+        q._values = values
+        q._states = states
+        q._index = dict(zip(states, range(len(states))))
+        q._checkpoint = path
+        q._saved_rows = len(states)
+        return q
+
+    @classmethod
+    def from_json_model(cls, json_path, dtype=np.float64):
+        """Convierte un modelo JSON {estado: [q por acción]} (TabQAgent.loadModel)."""
+        with open(json_path) as f:
+            table = json.load(f)
+        if not table:
+            raise ValueError(f"Modelo vacío: {json_path}")
+        q = cls(len(next(iter(table.values()))), initial_capacity=1, dtype=dtype)
+        q._values = np.array(list(table.values()), dtype=dtype).reshape(len(table), q.n_actions)
+        q._states = list(table.keys())
+        q._index = dict(zip(q._states, range(len(q._states))))
+        return q
+
+    def to_json_model(self, json_path):
+        with open(json_path, "w") as f:
+            json.dump(dict(zip(self._states, self.values.tolist())), f)
+
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, _META)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_rows(values_path, values, filas):
+    """Escribe las filas (ordenadas) en values.npy por tramos contiguos, sin mmap."""
+    with open(values_path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        if fortran_order or shape[1:] != values.shape[1:] or dtype != values.dtype:
+            raise ValueError(f"values.npy no coincide con la tabla: {values_path}")
+        inicio_datos = f.tell()
+        bytes_fila = values.shape[1] * values.dtype.itemsize
+        # Cortes donde la fila siguiente no es consecutiva
+        cortes = np.flatnonzero(np.diff(filas) != 1) + 1
+        for tramo in np.split(filas, cortes):
+            a, b = int(tramo[0]), int(tramo[-1]) + 1
+            f.seek(inicio_datos + a * bytes_fila)
+            f.write(np.ascontiguousarray(values[a:b]).tobytes())
+
+
+def _write_meta(path, q, states_bytes):
+    meta = {
+        "version": 1,
+        "rows": len(q.states),
+        "capacity": q._values.shape[0],
+        "n_actions": q.n_actions,
+        "dtype": q._values.dtype.str,
+        "states_bytes": states_bytes,
+    }
+    tmp = os.path.join(path, _META + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, _META))
+
+
+def convert_json_model(json_path, checkpoint_path):
+    """Convierte un modelo JSON existente en un checkpoint; devuelve la QTable."""
+    q = QTable.from_json_model(json_path)
+    q.save_checkpoint(checkpoint_path)
+    return q
+
+
+# ======================================================================
+# BENCHMARK: JSON vs checkpoint binario
+# ======================================================================
+
+def benchmark(n_states=1000000, n_actions=4, dirty_fraction=0.01, directory=".", seed=0):
+    rng = np.random.default_rng(seed)
+    q = QTable(n_actions, initial_capacity=n_states)
+    q._states = [f"{x}:{z}" for x, z in zip(rng.integers(0, 10**6, n_states).tolist(),
+                                            range(n_states))]
+    q._index = dict(zip(q._states, range(n_states)))
+    q._values[:n_states] = rng.standard_normal((n_states, n_actions))
+
+    json_path = os.path.join(directory, "bench_q.json")
+    ckpt_path = os.path.join(directory, "bench_q.ckpt")
+    tiempos = {}
+
+    t0 = time.perf_counter()
+    q.to_json_model(json_path)
+    tiempos["json: guardar"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    QTable.from_json_model(json_path)
+    tiempos["json: cargar"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    q.save_checkpoint(ckpt_path)
+    tiempos["checkpoint: guardar completo"] = time.perf_counter() - t0
+    for sid in rng.choice(n_states, int(n_states * dirty_fraction), replace=False).tolist():
+        q.set(q._states[sid], 0, 1.0)
+    t0 = time.perf_counter()
+    filas = q.save_checkpoint(ckpt_path)
+    tiempos[f"checkpoint: incremental ({filas} filas)"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    cargada = QTable.load_checkpoint(ckpt_path)
+    tiempos["checkpoint: cargar (mmap)"] = time.perf_counter() - t0
+    assert np.array_equal(cargada.values, q.values)
+
+    print(f"{n_states} estados x {n_actions} acciones")
+    for nombre, t in tiempos.items():
+        print(f"  {nombre:<38} {t:8.3f} s")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Checkpoints de QTable")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    conv = sub.add_parser("convert", help="Convierte un modelo JSON {estado: [q...]} en checkpoint")
+    conv.add_argument("json_model")
+    conv.add_argument("checkpoint")
+    bench = sub.add_parser("benchmark", help="Compara JSON con el checkpoint binario")
+    bench.add_argument("--states", type=int, default=1000000)
+    bench.add_argument("--actions", type=int, default=4)
+    bench.add_argument("--dirty", type=float, default=0.01)
+    bench.add_argument("--dir", default=".")
+    args = parser.parse_args()
+    if args.comando == "convert":
+        q = convert_json_model(args.json_model, args.checkpoint)
+        print(f"{len(q)} estados x {q.n_actions} acciones -> {args.checkpoint}")
+    else:
+        benchmark(args.states, args.actions, args.dirty, args.dir)
@@ -0,0 +1,240 @@
+# Visualización de valores Q: modos sin pantalla, síncrono, limitado por FPS y asíncrono
+
+import collections
+import os
+import sys
+import threading
+import time
+
+VISUALIZER_MODES = ("headless", "sync", "throttled", "async")
+
+
+def display_available():
+    if sys.platform.startswith("linux"):
+        return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return True
+
+
+class HeadlessVisualizer(object):
+    """No dibuja nada: para máquinas de entrenamiento sin pantalla."""
+
+    def __init__(self, title="Q-Values"):
+        self.title = title
+        self.actions = []
+
+    def setup(self, actions):
+        self.actions = actions
+
+    def update(self, q_values, current_state, chosen_action_idx):
+        pass
+
+    def close(self):
+        pass
+
+
+class QVisualizer(object):
+    """
+    Dibuja una barra por acción. Los ítems del canvas se crean una sola vez en
+    setup() y en cada update() solo se mueven con coords() / itemconfig().
+    """
+    BAR_WIDTH = 300
+
+    def __init__(self, title="Q-Values"):
+        self.root = None
+        self.canvas = None
+        self.title = title
+        self.actions = []
+
+    def setup(self, actions):
+        import tkinter as tk
+        self.actions = actions
+        self.root = tk.Tk()
+        self.root.wm_title(self.title)
+        canvas_width = 400
+        canvas_height = 50 + len(actions) * 40
+        self.canvas = tk.Canvas(self.root, width=canvas_width, height=canvas_height, borderwidth=0, highlightthickness=0, bg="black")
+        self.canvas.pack()
+
+        self._state_id = self.canvas.create_text(200, 20, text="State: -", fill="white", font=("Helvetica", 12))
+        self._bar_ids = []
+        self._text_ids = []
+        for i in range(len(actions)):
+            y_pos = 50 + i * 40
+            self._bar_ids.append(self.canvas.create_rectangle(100, y_pos, 100, y_pos + 20, fill="black"))
+            self._text_ids.append(self.canvas.create_text(10, y_pos + 10, text="", anchor='w', fill="white"))
+        self.root.update()
+
+    def draw(self, q_values, current_state, chosen_action_idx):
+        self.canvas.itemconfig(self._state_id, text=f"State: {current_state}")
+
+        max_q = max(q_values) if any(q != 0 for q in q_values) else 1.0
+        min_q = min(q_values) if any(q != 0 for q in q_values) else -1.0
+
+        for i, q in enumerate(q_values):
+            y_pos = 50 + i * 40
+
+            # Normalizar valor para el color y la longitud de la barra
+            if q >= 0:
+                color = '#%02x%02x%02x' % (0, int(255 * (q / max_q if max_q > 0 else 1)), 0) # Verde para positivo
+                bar_len = q / max_q if max_q > 0 else 0
+            else:
+                color = '#%02x%02x%02x' % (int(255 * (q / min_q if min_q < 0 else 1)), 0, 0) # Rojo para negativo
+                bar_len = -q / min_q if min_q < 0 else 0
+
+            self.canvas.coords(self._bar_ids[i], 100, y_pos, 100 + bar_len * self.BAR_WIDTH, y_pos + 20)
+            self.canvas.itemconfig(self._bar_ids[i], fill=color)
+
+            marker = "  <-- CHOSEN" if i == chosen_action_idx else ""
+            self.canvas.itemconfig(self._text_ids[i], text=f"{self.actions[i]}: {q:.2f}{marker}")
+
+    def update(self, q_values, current_state, chosen_action_idx):
+        if self.root is None:
+            self.setup(self.actions)
+        self.draw(q_values, current_state, chosen_action_idx)
+        self.root.update()
+
+    def close(self):
+        if self.root is not None:
+            self.root.destroy()
+            self.root = None
+
+
+class ThrottledQVisualizer(QVisualizer):
+    """
+    Como QVisualizer pero repinta como máximo max_fps veces por segundo. Las
+    actualizaciones que llegan antes se agrupan: se guarda la más reciente y se
+    dibuja cuando vence el intervalo (o en flush() / close()), así el último
+    estado de una ráfaga siempre llega a la pantalla. Los eventos de Tk se
+    procesan en cada llamada, dibuje o no.
+    """
+
+    def __init__(self, title="Q-Values", max_fps=10.0):
+        super(ThrottledQVisualizer, self).__init__(title)
+        self.min_interval = 1.0 / max_fps
+        self._last_draw = 0.0
+        self._pending = None
+        self._flush_id = None
+
+    def update(self, q_values, current_state, chosen_action_idx):
+        if self.root is None:
+            self.setup(self.actions)
+        now = time.perf_counter()
+        wait = self.min_interval - (now - self._last_draw)
+        if wait <= 0:
+            self._pending = None
+            self._last_draw = now
+            self.draw(q_values, current_state, chosen_action_idx)
+        else:
+            # Copia: la fila de la tabla Q se sigue modificando hasta que se dibuje
+            self._pending = (list(q_values), current_state, chosen_action_idx)
+            if self._flush_id is None:
+                self._flush_id = self.root.after(max(1, int(wait * 1000)), self._scheduled_flush)
+        self.root.update()
+
+    def _scheduled_flush(self):
+        self._flush_id = None
+        self.flush()
+
+    def flush(self):
+        """Dibuja la actualización pendiente, si la hay."""
+        if self._pending is not None and self.root is not None:
+            snapshot, self._pending = self._pending, None
+            self._last_draw = time.perf_counter()
+            self.draw(*snapshot)
+            self.root.update_idletasks()
+
+    def close(self):
+        self.flush()
+        if self.root is not None and self._flush_id is not None:
+            self.root.after_cancel(self._flush_id)
+        self._flush_id = None
+        super(ThrottledQVisualizer, self).close()
+
+
+class AsyncQVisualizer(QVisualizer):
+    """
+    El agente solo encola instantáneas (q_values, state, action) en una cola
+    acotada que descarta las más antiguas; un hilo aparte es dueño de Tk y
+    consume la cola a max_fps. Si Tk no se puede inicializar en ese hilo, el
+    error se relanza en setup() (y en update(), que llama a setup()).
+    """
+
+    def __init__(self, title="Q-Values", max_fps=20.0, queue_size=8):
+        super(AsyncQVisualizer, self).__init__(title)
+        self.interval_ms = max(1, int(1000.0 / max_fps))
+        self._queue = collections.deque(maxlen=queue_size)
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._error = None
+        self.dropped = 0
+
+    def setup(self, actions):
+        self.actions = actions
+        self._error = None
+        self._ready.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._render_loop, name="QVisualizer", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(5.0):
+            self._stop.set()
+            self._thread = None
+            raise RuntimeError("El hilo de QVisualizer no inicializó Tk en 5 s")
+        if self._error is not None:
+            self._thread.join(1.0)
+            self._thread = None
+            raise RuntimeError(f"QVisualizer no pudo inicializar Tk: {self._error}") from self._error
+
+    def _render_loop(self):
+        try:
+            super(AsyncQVisualizer, self).setup(self.actions)
+        except Exception as e:
+            self._error = e
+            self.root = None
+            self._ready.set()
+            return
+        self.root.protocol("WM_DELETE_WINDOW", self._stop.set)
+        self._ready.set()
+        self.root.after(self.interval_ms, self._drain)
+        self.root.mainloop()
+        self.root = None
+
+    def _drain(self):
+        if self._stop.is_set():
+            self.root.quit()
+            self.root.destroy()
+            return
+        snapshot = None
+        while self._queue:
+            snapshot = self._queue.popleft()
+        if snapshot is not None:
+            self.draw(*snapshot)
+        self.root.after(self.interval_ms, self._drain)
+
+    def update(self, q_values, current_state, chosen_action_idx):
+        if self._thread is None:
+            self.setup(self.actions)
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        # Copia: la fila de la tabla Q se sigue modificando mientras se dibuja
+        self._queue.append((list(q_values), current_state, chosen_action_idx))
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+
+
+def make_visualizer(mode="sync", title="Q-Values", max_fps=10.0):
+    if mode not in VISUALIZER_MODES:
+        raise ValueError(f"Modo de visualización desconocido: {mode} (use uno de {', '.join(VISUALIZER_MODES)})")
+    if mode != "headless" and not display_available():
+        mode = "headless"
+    if mode == "headless":
+        return HeadlessVisualizer(title)
+    if mode == "sync":
+        return QVisualizer(title)
+    if mode == "throttled":
+        return ThrottledQVisualizer(title, max_fps=max_fps)
+    return AsyncQVisualizer(title, max_fps=max_fps)
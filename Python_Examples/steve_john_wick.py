@@ -3,15 +3,16 @@
 from __future__ import print_function
 from future import standard_library
 import MalmoPython
-import json
 import logging
 import os
 import random
 import sys
 import time
-import math
 
-import tkinter as tk
+from q_table import QTable
+from combat_observation import decode_observation
+from q_visualizer import VISUALIZER_MODES, make_visualizer
+from mission_launcher import MissionStartError, launch_mission
 
 standard_library.install_aliases()
 
@@ -75,57 +76,6 @@ def get_mission_xml(agent_name):
 </Mission>'''
 
 
-# CORRECCIÓN 2: Clase para manejar la ventana de visualización
-class QVisualizer:
-    def __init__(self, title="Q-Values"):
-        self.root = None
-        self.canvas = None
-        self.title = title
-
-    def setup(self, actions):
-        self.root = tk.Tk()
-        self.root.wm_title(self.title)
-        self.actions = actions
-        canvas_width = 400
-        canvas_height = 50 + len(actions) * 40
-        self.canvas = tk.Canvas(self.root, width=canvas_width, height=canvas_height, borderwidth=0, highlightthickness=0, bg="black")
-        self.canvas.pack()
-        self.root.update()
-
-    def update(self, q_values, current_state, chosen_action_idx):
-        if self.root is None:
-            self.setup(self.actions)
-
-        self.canvas.delete("all")
-        
-        # Dibuja el estado actual
-        self.canvas.create_text(200, 20, text=f"State: {current_state}", fill="white", font=("Helvetica", 12))
-
-        bar_width = 300
-        max_q = max(q_values) if any(q != 0 for q in q_values) else 1.0
-        min_q = min(q_values) if any(q != 0 for q in q_values) else -1.0
-
-        for i, q in enumerate(q_values):
-            y_pos = 50 + i * 40
-            
-            # Normalizar valor para el color y la longitud de la barra
-            if q >= 0:
-                color = '#%02x%02x%02x' % (0, int(255 * (q / max_q if max_q > 0 else 1)), 0) # Verde para positivo
-                bar_len = q / max_q if max_q > 0 else 0
-            else:
-                color = '#%02x%02x%02x' % (int(255 * (q / min_q if min_q < 0 else 1)), 0, 0) # Rojo para negativo
-                bar_len = -q / min_q if min_q < 0 else 0
-
-            # Dibuja la barra
-            self.canvas.create_rectangle(100, y_pos, 100 + bar_len * bar_width, y_pos + 20, fill=color)
-            
-            # Dibuja el texto
-            action_text = self.actions[i]
-            marker = "  <-- CHOSEN" if i == chosen_action_idx else ""
-            self.canvas.create_text(10, y_pos + 10, text=f"{action_text}: {q:.2f}{marker}", anchor='w', fill="white")
-
-        self.root.update()
-
 class CombatAgent(object):
     def __init__(self, agent_host, actions, logger, visualizer):
         self.agent_host = agent_host
@@ -145,40 +95,20 @@ class CombatAgent(object):
         self.facing_bonus = 0.2           # recompensa por tick mirando
         self.not_facing_penalty_max = 0.1 # penalización máxima por tick
         
-    def get_state(self, world_state):
-        if not world_state.observations: return None
-        obs = json.loads(world_state.observations[-1].text)
-        agent_health = obs.get('Life', 0)
-        agent_yaw = obs.get('Yaw', 0)
-        enemy_info = next((e for e in obs.get('entities', []) if e['name'] == 'Zombie'), None)
-        if not enemy_info: return "enemy_dead"
-        dx = enemy_info['x'] - obs['XPos']
-        dz = enemy_info['z'] - obs['ZPos']
-        enemy_yaw = -180 * math.atan2(dx, dz) / math.pi
-        yaw_diff = enemy_yaw - agent_yaw
-        while yaw_diff < -180: yaw_diff += 360
-        while yaw_diff > 180: yaw_diff -= 360
-        dist = enemy_info.get('distance', 100)
-        health_bin = int(agent_health / 5)
-        dist_bin = int(dist / 3)
-        yaw_bin = int(yaw_diff / 45) 
-        state_str = f"h:{health_bin}_d:{dist_bin}_y:{yaw_bin}"
-        self.logger.debug(f"STATE: {state_str}")
+    def get_state(self, obs):
+        if obs is None: return None
+        state_str = obs.state()
+        self.logger.debug(f"STATE: {state_str} ({obs!r})")
         return state_str
     
     def _q_values_for_state(self, q_table, state):
-        return [q_table.get((state, a_idx), 0.0) for a_idx in range(len(self.actions))]
+        return q_table.q_values(state)
 
     def update_q_table(self, q_table, reward, current_state):
         if self.prev_s is None or self.prev_a is None:
             return
-        old_q = q_table.get((self.prev_s, self.prev_a), 0.0)
-        next_max_q = 0.0
-        if current_state != "terminal":
-            q_next = self._q_values_for_state(q_table, current_state)
-            next_max_q = max(q_next) if q_next else 0.0
-        new_q = old_q + self.alpha * (reward + self.gamma * next_max_q - old_q)
-        q_table[(self.prev_s, self.prev_a)] = new_q
+        old_q, new_q = q_table.update(self.prev_s, self.prev_a, reward, current_state,
+                                      self.alpha, self.gamma, terminal=(current_state == "terminal"))
         self.logger.debug(f"Q_UPDATE: s={self.prev_s}, a={self.actions[self.prev_a]}, r={reward:.2f}, old_q={old_q:.4f} -> new_q={new_q:.4f}")
 
     def choose_action(self, q_table, current_s):
@@ -188,8 +118,7 @@ class CombatAgent(object):
         if is_random:
             action_idx = random.randint(0, len(self.actions) - 1)
         else:
-            max_q = max(q_vals) if q_vals else 0.0
-            action_idx = q_vals.index(max_q)
+            action_idx = int(q_vals.argmax())
 
         self.visualizer.update(q_vals, current_s, action_idx)
         self.logger.info(f"Q-VALUES for state '{current_s}':")
@@ -202,8 +131,8 @@ class CombatAgent(object):
 
         return action_idx
 
-    def act(self, q_table, world_state, current_r):
-        current_s = self.get_state(world_state)
+    def act(self, q_table, obs, current_r):
+        current_s = self.get_state(obs)
         if current_s is None:
             return 0
         self.update_q_table(q_table, current_r, current_s)
@@ -250,17 +179,10 @@ class CombatAgent(object):
                 current_r += penalty
 
             if world_state.number_of_observations_since_last_state > 0 and len(world_state.observations) > 0:
-                obs = json.loads(world_state.observations[-1].text)
-
-                enemy_info = next((e for e in obs.get('entities', []) if e['name'] == 'Zombie'), None)
-                if enemy_info:
-                    dx, dz = enemy_info['x'] - obs['XPos'], enemy_info['z'] - obs['ZPos']
-                    enemy_yaw = -180 * math.atan2(dx, dz) / math.pi
-                    agent_yaw = obs.get('Yaw', 0)
-                    yaw_diff = enemy_yaw - agent_yaw
-                    while yaw_diff < -180: yaw_diff += 360
-                    while yaw_diff > 180: yaw_diff -= 360
-                    abs_yaw = abs(yaw_diff)
+                obs = decode_observation(world_state.observations[-1].text)
+
+                if obs.has_enemy:
+                    abs_yaw = obs.abs_yaw
 
                     is_facing_now = abs_yaw < self.angle_thresh
                     if is_facing_now:
@@ -276,7 +198,7 @@ class CombatAgent(object):
                 else:
                     self.was_facing_enemy = False
 
-                total_reward += self.act(q_table, world_state, current_r)
+                total_reward += self.act(q_table, obs, current_r)
 
             time.sleep(0.1)
 
@@ -289,14 +211,24 @@ class CombatAgent(object):
 
 def main():
     agent_host = MalmoPython.AgentHost()
+    agent_host.addOptionalStringArgument("visualizer", "Modo de visualizacion de Q: " + "|".join(VISUALIZER_MODES), "sync")
+    agent_host.addOptionalFloatArgument("visualizer_fps", "FPS maximos para los modos throttled/async", 10.0)
+    agent_host.addOptionalStringArgument("checkpoint", "Directorio del checkpoint de la tabla Q (vacio = solo en memoria)", "")
+    agent_host.addOptionalIntArgument("checkpoint_every", "Guardar el checkpoint cada N episodios", 1)
     try:
         agent_host.parse(sys.argv)
     except RuntimeError as e:
         print('ERROR:', e); print(agent_host.getUsage()); exit(1)
 
     NUM_EPISODES = 10
-    q_table = {}
     actions = ["attack 1", "move 1", "turn 1", "turn -1"]
+    checkpoint = agent_host.getStringArgument("checkpoint")
+    checkpoint_every = max(1, agent_host.getIntArgument("checkpoint_every"))
+    if checkpoint and os.path.exists(os.path.join(checkpoint, "meta.json")):
+        q_table = QTable.load_checkpoint(checkpoint)
+        print(f"Tabla Q cargada desde {checkpoint}: {len(q_table)} estados")
+    else:
+        q_table = QTable(len(actions))
 
     logger = logging.getLogger(__name__)
     if not logger.handlers:
@@ -305,7 +237,8 @@ def main():
         handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
         logger.addHandler(handler)
 
-    visualizer = QVisualizer()
+    visualizer = make_visualizer(agent_host.getStringArgument("visualizer"),
+                                 max_fps=agent_host.getFloatArgument("visualizer_fps"))
     visualizer.setup(actions)
 
     for i in range(NUM_EPISODES):
@@ -313,29 +246,25 @@ def main():
         mission_xml = get_mission_xml("SteveJohnWick")
         my_mission = MalmoPython.MissionSpec(mission_xml, True)
         
-        max_retries = 3
-        for retry in range(max_retries):
-            try:
-                agent_host.startMission(my_mission, MalmoPython.MissionRecordSpec())
-                break
-            except RuntimeError as e:
-                if retry == max_retries - 1: print("Error starting mission:", e); exit(1)
-                else: time.sleep(2.5)
-
-        print("Waiting for the mission to start", end=' ')
-        world_state = agent_host.getWorldState()
-        while not world_state.has_mission_begun:
-            print(".", end=""); time.sleep(0.1); world_state = agent_host.getWorldState()
-            for error in world_state.errors: print("Error:", error.text)
-        print("\nMission started!")
+        try:
+            metrics = launch_mission([agent_host], my_mission, recordings=[MalmoPython.MissionRecordSpec()],
+                                     log=logger.info)
+        except MissionStartError as e:
+            print("Error starting mission:", e); exit(1)
+        logger.info("Arranque:\n" + metrics.summary())
+        print("Mission started!")
 
         combat_agent = CombatAgent(agent_host, actions, logger, visualizer)
         
         cumulative_reward = combat_agent.run_episode(q_table)
         print(f'Recompensa acumulada del episodio {i+1}: {cumulative_reward}')
+        if checkpoint and ((i + 1) % checkpoint_every == 0 or i + 1 == NUM_EPISODES):
+            rows = q_table.save_checkpoint(checkpoint)
+            logger.info(f"Checkpoint guardado en {checkpoint} ({rows} filas escritas)")
         
         time.sleep(1)
 
+    visualizer.close()
     print("\n--- ENTRENAMIENTO FINALIZADO ---")
 
 if __name__ == '__main__':
@@ -1,11 +1,13 @@
-import random
-
 import sys
 
 import time
 
 from malmo import MalmoPython
 
+from generador_laberintos import generar_laberinto_dfs
+
+from compilador_xml import compilar_ocupacion
+
 
 # Configuración del laberinto (DEBE ser impar para el DFS)
 
@@ -33,82 +35,7 @@ END_X, END_Z = SIZE - 2, SIZE - 2
 # ----------------------------------------------------------------------
 
 
-def generar_laberinto_dfs(size):
-
-    """Crea un laberinto usando el algoritmo de Búsqueda en Profundidad (DFS)."""
-
-   
-
-    # Inicializa la cuadrícula: 1 = Pared, 0 = Pasillo
-
-    laberinto = [[1] * size for _ in range(size)]
-
-   
-
-    # Pila para el DFS
-
-    pila = [(START_X, START_Z)]
-
-    laberinto[START_Z][START_X] = 0  # Marca la celda de inicio como pasillo
-
-   
-
-    # Vecinos (direcciones: (dx, dz))
-
-    direcciones = [(0, 2), (0, -2), (2, 0), (-2, 0)]
-
-
-    while pila:
-
-        cx, cz = pila[-1] # Celda actual
-
-       
-
-        vecinos_no_visitados = []
-
-        for dx, dz in direcciones:
-
-            nx, nz = cx + dx, cz + dz # Vecino (a dos pasos)
-
-           
-
-            # Comprueba límites y si la celda vecina es una pared (no visitada)
-
-            if 1 <= nx < size - 1 and 1 <= nz < size - 1 and laberinto[nz][nx] == 1:
-
-                vecinos_no_visitados.append((nx, nz, dx, dz))
-
-       
-
-        if vecinos_no_visitados:
-
-            # Elije un vecino al azar
-
-            nx, nz, dx, dz = random.choice(vecinos_no_visitados)
-
-           
-
-            # Cava el pasaje (rompe la pared a medio camino)
-
-            laberinto[nz][nx] = 0
-
-            laberinto[cz + dz // 2][cx + dx // 2] = 0
-
-           
-
-            # Avanza: empuja la nueva celda a la pila
-
-            pila.append((nx, nz))
-
-        else:
-
-            # Backtrack: es un callejón sin salida
-
-            pila.pop()
-
-           
-
-    return laberinto
+# La implementación (DFS iterativo, Kruskal y Wilson) está en generador_laberintos.py
 
 
 # ----------------------------------------------------------------------
@@ -120,7 +47,7 @@ def generar_laberinto_dfs(size):
 
 def generar_xml_laberinto(laberinto):
 
-    """Convierte la matriz del laberinto en comandos DrawBlock XML y garantiza espacio de movimiento."""
+    """Convierte la matriz del laberinto en comandos DrawCuboid/DrawBlock XML y garantiza espacio de movimiento."""
 
    
 
@@ -128,19 +55,9 @@ def generar_xml_laberinto(laberinto):
 
    
 
-    # 1. Dibuja las paredes (2 bloques de alto: Y_LEVEL y Y_LEVEL + 1)
-
-    for z in range(SIZE):
-
-        for x in range(SIZE):
-
-            if laberinto[z][x] == 1:  # 1 es pared
-
-                # Dibuja la pared de 2 bloques de alto
-
-                dibujo_xml += f'<DrawBlock x="{x}" y="{Y_LEVEL}" z="{z}" type="stonebrick"/>\n'
+    # 1. Dibuja las paredes (2 bloques de alto: Y_LEVEL y Y_LEVEL + 1), fusionadas en DrawCuboid
 
-                dibujo_xml += f'<DrawBlock x="{x}" y="{Y_LEVEL + 1}" z="{z}" type="stonebrick"/>\n'
+    dibujo_xml += compilar_ocupacion(laberinto[:SIZE, :SIZE] == 1, "stonebrick", y=Y_LEVEL, alto=2)
 
    
 
@@ -289,7 +206,7 @@ if __name__ == '__main__':
 
     # 1. Genera el laberinto con DFS
 
-    laberinto_matrix = generar_laberinto_dfs(SIZE)
+    laberinto_matrix = generar_laberinto_dfs(SIZE, inicio=(START_X, START_Z))
 
    
 
@@ -25,73 +25,197 @@
 # anyone who wants to do data processing on the saved depthmap data.
 
 import numpy as np
-from matplotlib import cm
 import tarfile
-from io import BytesIO
-from PIL import Image
 import argparse
+import ast
 import errno
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-parser = argparse.ArgumentParser(description='Script for converting floating point numpy depthmaps into coloured images.')
-parser.add_argument("--recording", help="specifies the Malmo mission recording tar.gz file to parse for data")
-parser.add_argument("--near_clip", help="near clipping plane", default=0, type=float)
-parser.add_argument("--far_clip", help="far clipping plane", default=64, type=float)
-parser.add_argument("--colourmap", help="name of colourmap to use (see https://matplotlib.org/users/colormaps.html)", default="viridis")
-args = parser.parse_args()
-
-near_val = args.near_clip
-far_val = args.far_clip
-tarpath = args.recording
-
-global_min, global_max = None, None
-frames_processed = 0
-
-cmap = cm.get_cmap(args.colourmap)
-
-# Open the gzipped tarfile:
-print("Loading tarfile...")
-tar = tarfile.open(tarpath)
-missionname = os.path.splitext(os.path.basename(tarpath))[0]
-output_destination = os.path.join(os.path.dirname(tarpath), missionname + "_depthmaps")
-try:
-    os.makedirs(output_destination)
-except OSError as exception:
-    if exception.errno != errno.EEXIST: # ignore error if already existed
-        raise
-
-# Depthmaps are stored in a series of gzipped tars, within the main tarfile.
-# These tars will be within a folder named "depth_frames":
-bmparchive_filenames = [t for t in tar.getnames() if "/depth_frames/" in t and t.endswith("tar.gz")]
-# Now iterate through each of these files, extracting the actual frames:
-for bmparchive_filename in bmparchive_filenames:
-    print("--->Loading ", bmparchive_filename)
-    bmparchive = tar.extractfile(bmparchive_filename)
-    bmptar = tarfile.open(fileobj=bmparchive)
-    for bmp_filename in bmptar.getnames():
-        print("------->Converting ", bmp_filename)
-        # Can't pass the file straight from the tar to numpy -
-        # need to write it into a BytesIO object first.
-        array_file = BytesIO()
-        array_file.write(bmptar.extractfile(bmp_filename).read())
-        array_file.seek(0)
-        bmp = np.load(array_file)
-        # Update our global min/max values, for information's sake:
-        mindist = bmp.min()
-        maxdist = bmp.max()
-        if global_min == None or global_min > mindist:
-            global_min = mindist
-        if global_max == None or global_max < maxdist:
-            global_max = maxdist
-        # Do some normalisation. First clip to our near/far values:
-        bmp = bmp.clip(near_val, far_val)
-        # Now normalise to values between 0 and 1:
-        bmp = (bmp - near_val) / (far_val - near_val)
-        # Use matplotlib colourmap to convert to RGB:
-        im = Image.fromarray(np.uint8(cmap(bmp)*255))
-        # And save:
-        im.save(os.path.join(output_destination, bmp_filename.split(".")[0] + "_" + args.colourmap + ".png"))
+# The recording is read as a stream: the outer tar and each inner depth_frames tar.gz are walked
+# member by member, and each .npy member is parsed straight from its bytes (no BytesIO copy).
+# Frames are then fanned out to a pool of worker processes, which normalise them, map them through
+# a precomputed colourmap lookup table and encode the output (PNG or npz).
+
+NPY_MAGIC = b"\x93NUMPY"
+
+
+def parse_npy(data):
+    """Array view over the bytes of a .npy file (versions 1.0 to 3.0)."""
+    if data[:6] != NPY_MAGIC:
+        raise ValueError("Not a numpy array file")
+    major = data[6]
+    if major == 1:
+        header_len = int.from_bytes(data[8:10], "little")
+        start = 10
+    else:
+        header_len = int.from_bytes(data[8:12], "little")
+        start = 12
+    header = ast.literal_eval(data[start:start + header_len].decode("latin1"))
+    dtype = np.dtype(header["descr"])
+    shape = header["shape"]
+    count = int(np.prod(shape)) if shape else 1
+    array = np.frombuffer(data, dtype=dtype, count=count, offset=start + header_len)
+    order = "F" if header["fortran_order"] else "C"
+    return array.reshape(shape, order=order)
+
+
+def iter_depth_frames(tarpath):
+    """Yield (name, npy bytes) for every depth frame in a Malmo mission recording, streaming."""
+    with tarfile.open(tarpath, "r|*") as tar:
+        for member in tar:
+            if "/depth_frames/" not in member.name or not member.name.endswith("tar.gz"):
+                continue
+            print("--->Loading ", member.name)
+            with tarfile.open(fileobj=tar.extractfile(member), mode="r|gz") as bmptar:
+                for bmp_member in bmptar:
+                    if bmp_member.isfile():
+                        yield bmp_member.name, bmptar.extractfile(bmp_member).read()
+
+
+def finite_range(bmp):
+    """(min, max) of the finite depths in a frame, or (None, None) if it has none (NaN / inf are skipped)."""
+    finite = bmp[np.isfinite(bmp)]
+    if not finite.size:
+        return None, None
+    return float(finite.min()), float(finite.max())
+
+
+def _merge_range(current, frame_range):
+    (low, high), (mindist, maxdist) = current, frame_range
+    if mindist is None:
+        return low, high
+    return (mindist if low is None else min(low, mindist)), (maxdist if high is None else max(high, maxdist))
+
+
+def depth_range(tarpath):
+    """Pre-pass: global (min, max) of the finite depths over the whole recording."""
+    global_range = (None, None)
+    for name, data in iter_depth_frames(tarpath):
+        global_range = _merge_range(global_range, finite_range(parse_npy(data)))
+    return global_range
+
+
+def build_lut(colourmap, size=256):
+    """(size, 3) uint8 RGB lookup table sampled from a matplotlib colourmap."""
+    from matplotlib import cm
+    cmap = cm.get_cmap(colourmap, size)
+    return np.uint8(cmap(np.arange(size))[:, :3] * 255)
+
+
+def colourise(bmp, near_val, far_val, lut):
+    """
+    Clip to [near, far], normalise to [0, 1] and look each pixel up in the LUT.
+    NaN depths are drawn black, as matplotlib draws "bad" values by default.
+    """
+    # Same steps as matplotlib's Colormap.__call__: scale by the LUT size, truncate, and map 1.0 to the last entry.
+    # NaN is masked before scaling (it would cast to an invalid index); +/-inf clip to far/near.
+    bad = np.isnan(bmp)
+    bmp = np.where(bad, near_val, bmp).clip(near_val, far_val)
+    bmp = (bmp - near_val) / (far_val - near_val)
+    index = (bmp * len(lut)).astype(np.intp)
+    np.minimum(index, len(lut) - 1, out=index)
+    rgb = lut[index]
+    rgb[bad] = 0
+    return rgb
+
+
+# Per-process state, set once by the pool initialiser instead of being pickled with every frame:
+_worker = {}
+
+
+def _init_worker(lut, near_val, far_val, output_format):
+    _worker.update(lut=lut, near=near_val, far=far_val, format=output_format)
+
+
+def convert_frame(data, output_base):
+    """Worker: parse, colourise and save one frame; returns its (min, max) depth."""
+    bmp = parse_npy(data)
+    rgb = colourise(bmp, _worker["near"], _worker["far"], _worker["lut"])
+    if _worker["format"] == "png":
+        from PIL import Image
+        Image.fromarray(rgb).save(output_base + ".png")
+    else:
+        np.savez_compressed(output_base + ".npz", rgb=rgb)
+    return finite_range(bmp)
+
+
+def convert_recording(tarpath, output_destination, colourmap="viridis", near_val=0.0, far_val=64.0,
+                      lut_size=256, output_format="png", workers=None, global_range=False):
+    """Convert every depth frame of a recording; returns (frames processed, overall min, overall max)."""
+    if global_range:
+        print("Finding global depth range...")
+        low, high = depth_range(tarpath)
+        if low is None:
+            print("No finite depths in the recording - keeping the near/far clip")
+        else:
+            near_val, far_val = low, high
+        if far_val <= near_val:
+            far_val = near_val + 1.0
+        print("Normalising to ", near_val, " to ", far_val)
+    lut = build_lut(colourmap, lut_size)
+    initargs = (lut, near_val, far_val, output_format)
+
+    overall = (None, None)
+    frames_processed = 0
+
+    def collect(result):
+        nonlocal overall, frames_processed
+        overall = _merge_range(overall, result)
         frames_processed += 1
 
-print("Frames processed: ", frames_processed)
-print("Overall depth range: ", global_min, " to ", global_max)
\ No newline at end of file
+    def output_base(bmp_filename):
+        return os.path.join(output_destination, os.path.basename(bmp_filename).split(".")[0] + "_" + colourmap)
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        _init_worker(*initargs)
+        for name, data in iter_depth_frames(tarpath):
+            collect(convert_frame(data, output_base(name)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+            # Keep a bounded number of frames in flight so a long recording doesn't end up in memory:
+            max_pending = 4 * workers
+            pending = deque()
+            for name, data in iter_depth_frames(tarpath):
+                pending.append(pool.submit(convert_frame, data, output_base(name)))
+                if len(pending) >= max_pending:
+                    collect(pending.popleft().result())
+            for future in pending:
+                collect(future.result())
+    return frames_processed, overall[0], overall[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Script for converting floating point numpy depthmaps into coloured images.')
+    parser.add_argument("--recording", help="specifies the Malmo mission recording tar.gz file to parse for data")
+    parser.add_argument("--near_clip", help="near clipping plane", default=0, type=float)
+    parser.add_argument("--far_clip", help="far clipping plane", default=64, type=float)
+    parser.add_argument("--colourmap", help="name of colourmap to use (see https://matplotlib.org/users/colormaps.html)", default="viridis")
+    parser.add_argument("--lut_size", help="number of colourmap entries to precompute", default=256, type=int, choices=[256, 4096])
+    parser.add_argument("--format", help="output format: one png image or one compressed npz (rgb array) per frame", default="png", choices=["png", "npz"])
+    parser.add_argument("--workers", help="number of worker processes (default: one per CPU; 1 = no pool)", default=None, type=int)
+    parser.add_argument("--global_range", help="normalise with the recording's global min/max (extra pass) instead of near/far clip", action="store_true")
+    args = parser.parse_args()
+
+    tarpath = args.recording
+    missionname = os.path.splitext(os.path.basename(tarpath))[0]
+    output_destination = os.path.join(os.path.dirname(tarpath), missionname + "_depthmaps")
+    try:
+        os.makedirs(output_destination)
+    except OSError as exception:
+        if exception.errno != errno.EEXIST: # ignore error if already existed
+            raise
+
+    start = time.time()
+    frames_processed, global_min, global_max = convert_recording(
+        tarpath, output_destination, args.colourmap, args.near_clip, args.far_clip,
+        args.lut_size, args.format, args.workers, args.global_range)
+    print("Frames processed: ", frames_processed, " in {:.1f}s".format(time.time() - start))
+    print("Overall depth range: ", global_min, " to ", global_max)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,19 +17,19 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 # ------------------------------------------------------------------------------------------------
 
-import os
+import argparse
+import calendar
+import csv
+import datetime
+import json
 import sys
-import time
-import errno
-import matplotlib
+from array import array
+
 import numpy
-import pylab
-import argparse
-from dateutil.parser import parse
 
 # Frame rate plotter.
-# Parses a Malmo platform-side log file, extracting information about frame writing, and plots a graph
-# of frames written vs frames received.
+# Parses a Malmo platform-side log file, extracting information about frame writing, and summarises
+# (and optionally plots) frames queued, written and dropped for each mission.
 # Originally created as a tool for diagnosing performance problems with Malmo's frame recording code,
 # tracking write speeds, spotting client-side rendering glitches etc - but
 # also provides a helpful starting point for other log-parsing scripts.
@@ -42,84 +42,252 @@ from dateutil.parser import parse
 # This will produce a log file which contains lines like this:
 # 2018-Jan-24 12:24:51.172127 P TRACE   Writing frame 69, 432x240x3
 
+# The log is read in large binary chunks and only lines containing one of the terms of interest are
+# split. Timestamps are parsed with a fast path for this fixed format (the date part is converted once
+# per distinct day and cached), and events are stored as columns which become NumPy arrays for the
+# analysis. Multi-GB TRACE logs are fine: memory use is a few bytes per frame event.
+
 COL_DATE, COL_TIME, COL_SIDE, COL_SEVERITY, COL_ACTION, COL_FRAME, COL_FRAMENO = range(7)
 
-parser = argparse.ArgumentParser(description='Script for extracting frame rate data from malmo log file.')
-parser.add_argument("logfile", help="specifies the log file to parse for data")
-
-args = parser.parse_args()
-print("Parsing {}:".format(args.logfile))
-queue_times = []
-queue_values = []
-write_times = []
-write_values = []
-drop_times = []
-drop_values = []
-mission_split_points = []
-frames_dropped = 0
-line_number = 0
-mission_count = -1
-terms_of_interest=["BmpFrameWriter dropping frame - buffer is full", "Writing frame", "Pushing frame", "Tarring frame"]
-with open(args.logfile) as file:
-    for line in file:
-        line_number += 1
-        if "Initialising servers..." in line:
-            frames_dropped = 0
-            mission_count += 1
-            if mission_count > 0:
-                mission_split_points.append((len(queue_values), len(write_values), len(drop_values)))
-        if not any(term in line for term in terms_of_interest):
+QUEUED, WRITTEN, DROPPED = range(3)
+
+MISSION_START = b"Initialising servers..."
+DROP_TERM = b"BmpFrameWriter dropping frame - buffer is full"
+FRAME_ACTIONS = {b"Writing": WRITTEN, b"Tarring": WRITTEN, b"Pushing": QUEUED}
+MONTHS = {calendar.month_abbr[m].encode(): m for m in range(1, 13)}
+
+
+class TimestampParser(object):
+    """Seconds since the start of the first day seen, for "2018-Jan-24 12:24:51.172127" timestamps."""
+
+    def __init__(self):
+        self.base = None        # epoch seconds of the first day seen
+        self._days = {}
+
+    def _day(self, date):
+        offset = self._days.get(date)
+        if offset is None:
+            year, month, day = date.split(b"-")
+            epoch = calendar.timegm((int(year), MONTHS[month], int(day), 0, 0, 0))
+            if self.base is None:
+                self.base = epoch
+            offset = self._days[date] = epoch - self.base
+        return offset
+
+    def __call__(self, date, clock):
+        try:
+            return self._day(date) + int(clock[0:2]) * 3600 + int(clock[3:5]) * 60 + float(clock[6:])
+        except (KeyError, ValueError):
+            # Anything unexpected goes through the slow, general parser:
+            from dateutil.parser import parse
+            dt = parse((date + b" " + clock).decode())
+            epoch = calendar.timegm(dt.timetuple()) + dt.microsecond / 1e6
+            if self.base is None:
+                self.base = epoch - epoch % 86400
+            return epoch - self.base
+
+    def to_datetime(self, seconds):
+        return datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=self.base + seconds)
+
+
+def iter_lines(path, chunk_size=1 << 24):
+    """Lines of a (possibly huge) file, read in binary chunks."""
+    with open(path, "rb") as f:
+        rest = b""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            lines = (rest + chunk).split(b"\n")
+            rest = lines.pop()
+            yield lines
+        if rest:
+            yield [rest]
+
+
+class FrameLog(object):
+    """Frame events of a log as NumPy columns: time (s), kind, frame number, mission index."""
+
+    def __init__(self, times, kinds, frames, missions, timestamps):
+        self.times = times
+        self.kinds = kinds
+        self.frames = frames
+        self.missions = missions
+        self.timestamps = timestamps
+
+    @property
+    def mission_count(self):
+        return int(self.missions.max()) + 1 if len(self.missions) else 0
+
+    def select(self, mission, kind):
+        mask = (self.missions == mission) & (self.kinds == kind)
+        return self.times[mask], self.frames[mask]
+
+
+def parse_log(path, chunk_size=1 << 24):
+    parse_time = TimestampParser()
+    times, kinds, frames, missions = array("d"), array("b"), array("q"), array("q")
+    mission = 0
+    missions_seen = 0
+    line_number = 0
+    for lines in iter_lines(path, chunk_size):
+        for line in lines:
+            line_number += 1
+            if b" frame" not in line:
+                if MISSION_START in line:
+                    # Events before the first mission start are counted with the first mission:
+                    mission = missions_seen
+                    missions_seen += 1
+                continue
+            if DROP_TERM in line:
+                kind, fn = DROPPED, -1
+                cols = line.split(None, 2)
+            else:
+                cols = line.split()
+                kind = FRAME_ACTIONS.get(cols[COL_ACTION]) if len(cols) > COL_FRAMENO else None
+                if kind is None or cols[COL_FRAME] != b"frame":
+                    continue
+                try:
+                    fn = int(cols[COL_FRAMENO].rstrip(b","))
+                except ValueError:
+                    print("Incomprehensible frame action in line ", line_number, file=sys.stderr)
+                    continue
+            times.append(parse_time(cols[COL_DATE], cols[COL_TIME]))
+            kinds.append(kind)
+            frames.append(fn)
+            missions.append(mission)
+    return FrameLog(numpy.frombuffer(times, dtype=numpy.float64), numpy.frombuffer(kinds, dtype=numpy.int8),
+                    numpy.frombuffer(frames, dtype=numpy.int64), numpy.frombuffer(missions, dtype=numpy.int64),
+                    parse_time)
+
+
+def rolling_fps(times, window):
+    """Events per second over the trailing `window` seconds, at each event (NaN until two events are in range)."""
+    first = numpy.searchsorted(times, times - window, side="left")
+    span = times - times[first] if len(times) else numpy.empty(0)
+    intervals = numpy.arange(len(times)) - first
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.where(intervals > 0, intervals / span, numpy.nan)
+
+
+def queue_write_lag(queue_times, queue_frames, write_times, write_frames):
+    """Seconds from each written frame being queued to it being written (NaN if it was never queued)."""
+    lag = numpy.full(len(write_frames), numpy.nan)
+    if len(queue_frames) == 0:
+        return lag
+    order = numpy.argsort(queue_frames, kind="stable")
+    sorted_frames = queue_frames[order]
+    pos = numpy.minimum(numpy.searchsorted(sorted_frames, write_frames), len(sorted_frames) - 1)
+    matched = sorted_frames[pos] == write_frames
+    lag[matched] = write_times[matched] - queue_times[order[pos[matched]]]
+    return lag
+
+
+def _stats(prefix, values):
+    values = values[numpy.isfinite(values)]
+    if len(values) == 0:
+        return {prefix + "_mean": None, prefix + "_median": None, prefix + "_p95": None, prefix + "_max": None}
+    return {prefix + "_mean": float(values.mean()), prefix + "_median": float(numpy.median(values)),
+            prefix + "_p95": float(numpy.percentile(values, 95)), prefix + "_max": float(values.max())}
+
+
+def _mean_rate(times):
+    if len(times) < 2 or times[-1] <= times[0]:
+        return None
+    return (len(times) - 1) / float(times[-1] - times[0])
+
+
+def summarise(log, window=1.0):
+    """One summary dict per mission."""
+    summary = []
+    for mission in range(log.mission_count):
+        qt, qf = log.select(mission, QUEUED)
+        wt, wf = log.select(mission, WRITTEN)
+        dt, _ = log.select(mission, DROPPED)
+        all_times = log.times[log.missions == mission]
+        if len(all_times) == 0:
             continue
-        cols = line.split()
-        dt = parse(cols[COL_DATE] + " " + cols[COL_TIME])
-        if "dropping frame" in line:
-            # (This log line only happens when recording as bitmaps, rather than video.)
-            drop_times.append(dt)
-            drop_values.append(frames_dropped)
-            frames_dropped += 1
+        lag = queue_write_lag(qt, qf, wt, wf)
+        row = {
+            "mission": mission,
+            "start": log.timestamps.to_datetime(float(all_times[0])).isoformat(),
+            "duration_s": float(all_times[-1] - all_times[0]),
+            "frames_queued": len(qt),
+            "frames_written": len(wt),
+            "frames_dropped": len(dt),
+            "drop_rate": len(dt) / float(len(qt) + len(dt)) if len(qt) + len(dt) else 0.0,
+            "queue_fps": _mean_rate(qt),
+            "write_fps": _mean_rate(wt),
+            "writes_without_queue": int(numpy.count_nonzero(numpy.isnan(lag))),
+        }
+        row.update(_stats("queue_fps_rolling", rolling_fps(qt, window)))
+        row.update(_stats("write_fps_rolling", rolling_fps(wt, window)))
+        row.update(_stats("lag_s", lag))
+        summary.append(row)
+    return summary
+
+
+def write_csv(summary, out):
+    if not summary:
+        return
+    writer = csv.DictWriter(out, fieldnames=list(summary[0].keys()))
+    writer.writeheader()
+    writer.writerows(summary)
+
+
+def plot(log, window=1.0):
+    import matplotlib.pyplot as plt
+    base = numpy.datetime64(log.timestamps.to_datetime(0.0))
+    as_dates = lambda t: base + (t * 1e6).astype("timedelta64[us]")
+    fig, (ax1, ax2, ax3) = plt.subplots(nrows=3, sharex=True)
+    ax1.set_title('Frame write data')
+    for mission in range(log.mission_count):
+        label = lambda text: text if mission == 0 else None
+        qt, qf = log.select(mission, QUEUED)
+        wt, wf = log.select(mission, WRITTEN)
+        dt, _ = log.select(mission, DROPPED)
+        ax1.plot(as_dates(qt), qf, 'r-', label=label('Frames queued'))
+        ax1.plot(as_dates(wt), wf, 'g-', label=label('Frames written'))
+        ax1.plot(as_dates(dt), numpy.arange(len(dt)), 'b-', label=label('Frames dropped'))
+        ax2.plot(as_dates(qt), rolling_fps(qt, window), 'r-')
+        ax2.plot(as_dates(wt), rolling_fps(wt, window), 'g-')
+        ax3.plot(as_dates(wt), queue_write_lag(qt, qf, wt, wf), 'k-')
+    ax1.set_ylabel('Frame number')
+    ax2.set_ylabel('Frames per second\n(%gs window)' % window)
+    ax3.set_ylabel('Queue to write lag (s)')
+    ax3.set_xlabel('Event time')
+    fig.legend(fontsize='x-small')
+    plt.tight_layout()
+    plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Script for extracting frame rate data from malmo log file.')
+    parser.add_argument("logfile", help="specifies the log file to parse for data")
+    parser.add_argument("--window", type=float, default=1.0, help="rolling window for the FPS figures, in seconds")
+    parser.add_argument("--json", help="write the per-mission summary as JSON to this file ('-' for stdout)")
+    parser.add_argument("--csv", help="write the per-mission summary as CSV to this file ('-' for stdout)")
+    parser.add_argument("--plot", action="store_true", help="plot frames, rolling FPS and lag per mission")
+    args = parser.parse_args()
+
+    print("Parsing {}:".format(args.logfile), file=sys.stderr)
+    log = parse_log(args.logfile)
+    summary = summarise(log, args.window)
+    if args.csv == "-":
+        write_csv(summary, sys.stdout)
+    elif args.csv:
+        with open(args.csv, "w", newline="") as out:
+            write_csv(summary, out)
+    if args.json or not args.csv:
+        text = json.dumps(summary, indent=2)
+        if args.json and args.json != "-":
+            with open(args.json, "w") as out:
+                out.write(text)
         else:
-            fn = int(cols[COL_FRAMENO][:-1])
-            if cols[COL_ACTION] in ["Writing", "Tarring"]:
-                write_times.append(dt)
-                write_values.append(fn)
-            elif cols[COL_ACTION] == "Pushing":
-                queue_times.append(dt)
-                queue_values.append(fn)
-            else:
-                print("Incomprehensible frame action in line ", line_number)
-
-# Done parsing the log file - now plot some graphs:
-queue_speeds = []
-write_speeds = []
-# The following is very noisy - could be useful to apply some smoothing.
-# Left an as exercise for the reader...
-for i, qt in enumerate(queue_times):
-    if i > 0:
-        speed = queue_times[i] - queue_times[i - 1]
-        fps = 1.0 / speed.total_seconds()
-        queue_speeds.append(fps)
-
-for i, wt in enumerate(write_times):
-    if i > 0:
-        speed = write_times[i] - write_times[i - 1]
-        fps = 1.0 / speed.total_seconds()
-        write_speeds.append(fps)
-
-fig, (ax1, ax2) = pylab.subplots(nrows=2, sharex=True)
-ax1.set_title('Frame write data')
-qa, wa, da = 0, 0, 0
-for i, mission in enumerate(mission_split_points):
-    qb, wb, db = mission
-    plot_queues = ax1.plot(queue_times[qa:qb], queue_values[qa:qb], 'r-', label='Frames queued')
-    plot_writes = ax1.plot(write_times[wa:wb], write_values[wa:wb], 'g-', label='Frames written')
-    plot_drops = ax1.plot(drop_times[da:db], drop_values[da:db], 'b-', label='Frames dropped')
-    plot_queue_rate = ax2.plot(queue_times[qa:qb-1], queue_speeds[qa:qb-1], 'r-', label='Frames queued')
-    plot_write_rate = ax2.plot(write_times[qa:qb-1], write_speeds[qa:qb-1], 'g-', label='Frames written')
-    qa, wa, da = qb, wb, db
-
-ax1.set_ylabel('Frame number')
-ax2.set_ylabel('Frames per second')
-ax2.set_xlabel('Event time')
-legend = fig.legend(fontsize='x-small')
-pylab.tight_layout()
-pylab.show()
+            print(text)
+    if args.plot:
+        plot(log, args.window)
+
+
+if __name__ == '__main__':
+    main()